@@ -0,0 +1,51 @@
+"""Compare the fast JSON island extractor against a full BeautifulSoup parse.
+
+Run with ``python -m benchmarks.extract`` from the repository root.
+"""
+
+import codecs
+import os
+import timeit
+import tracemalloc
+
+from sfpl.extract import _soup_extract_data, extract_data
+
+ASSETS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "assets"
+)
+FIXTURES = ("holds.html", "checkouts.html")
+
+
+def _peak_memory(func, page):
+    tracemalloc.start()
+    try:
+        func(page)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _measure(func, page, number):
+    seconds = min(timeit.repeat(lambda: func(page), number=number, repeat=3))
+    return seconds / number, _peak_memory(func, page)
+
+
+def main(number=10):
+    print(f"{'fixture':<16}{'engine':<8}{'ms/parse':>10}{'peak KiB':>12}")
+    for name in FIXTURES:
+        with codecs.open(os.path.join(ASSETS, name), encoding="utf-8") as mockup:
+            page = mockup.read()
+
+        results = {}
+        for engine, func in (("soup", _soup_extract_data), ("fast", extract_data)):
+            results[engine] = _measure(func, page, number)
+            seconds, peak = results[engine]
+            print(f"{name:<16}{engine:<8}{seconds * 1000:>10.2f}{peak / 1024:>12.0f}")
+
+        speedup = results["soup"][0] / results["fast"][0]
+        memory = results["soup"][1] / results["fast"][1]
+        print(f"{name:<16}{'gain':<8}{speedup:>9.1f}x{memory:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
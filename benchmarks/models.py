@@ -0,0 +1,93 @@
+"""Measure the memory held by each Book object.
+
+Compares the slotted, interned :class:`sfpl.sfpl.Book` against an
+equivalent plain class with a ``__dict__``, as Book was before. Run with
+``python -m benchmarks.models`` from the repository root.
+"""
+
+import tracemalloc
+
+from sfpl.client import Client
+from sfpl.sfpl import Book
+
+AUTHORS = [f"Author {n}" for n in range(50)]
+STATUSES = ("Due 2025-05-16", "IN_TRANSIT: IN TRANSIT", None)
+
+
+class DictBook:
+    def __init__(self, data_dict, status=None, client=None):
+        self.title = data_dict["title"]
+        self.author = data_dict["author"]
+        self.subtitle = data_dict["subtitle"]
+        self._id = data_dict["_id"]
+
+        self.status = status
+        self.client = client
+
+
+def _copy(value):
+    return (value + ".")[:-1]
+
+
+def _bib(n):
+    # Fresh copies of each string, as json.loads makes for every page.
+    return {
+        "id": f"S93C{n}",
+        "briefInfo": {
+            "title": f"Title {n}",
+            "subtitle": _copy(""),
+            "authors": [_copy(AUTHORS[n % len(AUTHORS)])],
+        },
+    }
+
+
+def _status(n):
+    status = STATUSES[n % len(STATUSES)]
+    return _copy(status) if status else None
+
+
+def _dict_book(n, client):
+    bib = _bib(n)
+    return DictBook(
+        {
+            "title": bib["briefInfo"]["title"],
+            "author": bib["briefInfo"]["authors"][0],
+            "subtitle": bib["briefInfo"]["subtitle"],
+            "_id": Book.metaDataIdToId(bib["id"]),
+        },
+        status=_status(n),
+        client=client,
+    )
+
+
+def _slotted_book(n, client):
+    return Book.fromBib(_bib(n), status=_status(n), client=client)
+
+
+def _bytes_per_object(make, count, client):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        books = [make(n, client) for n in range(count)]
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    del books
+    return held / count
+
+
+def main(count=100_000):
+    client = Client()
+    print(f"{'model':<10}{'bytes/book':>12}")
+
+    results = {}
+    for name, make in (("dict", _dict_book), ("slots", _slotted_book)):
+        results[name] = _bytes_per_object(make, count, client)
+        print(f"{name:<10}{results[name]:>12.0f}")
+
+    print(f"{'gain':<10}{results['dict'] / results['slots']:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
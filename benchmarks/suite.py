@@ -0,0 +1,262 @@
+"""Measure parser and render throughput against stored baselines.
+
+Each case runs over the fixtures in ``tests/assets`` for a fixed time and
+reports operations per second and latency percentiles. Every run also times
+a ``reference`` case that uses only the standard library, and each case's
+throughput is compared with ``benchmarks/baseline.json`` relative to that
+reference, so a faster or slower machine does not shift the comparison. The
+run fails if any case's relative throughput has fallen by more than the
+threshold. Run with ``python -m benchmarks.suite`` from the repository root;
+pass ``--save`` to record new baselines after a deliberate change.
+"""
+
+import argparse
+import codecs
+import io
+import json
+import os
+import sys
+import time
+
+from sfpl.cli import _Pages, _render
+from sfpl.client import Client
+from sfpl.sfpl import Account, Book, Search, _extract_data
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ASSETS = os.path.join(os.path.dirname(HERE), "tests", "assets")
+BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_THRESHOLD = 0.2
+REFERENCE = "reference"
+
+
+def _fixture(name):
+    with codecs.open(os.path.join(ASSETS, name), encoding="utf-8") as mockup:
+        return mockup.read()
+
+
+def _search_page(bibs, total=1234):
+    # A search page shaped like the live one, built from real bib records.
+    island = json.dumps({"entities": {"bibs": bibs}})
+    return (
+        f"<html><body><span>1 to {len(bibs)} of {total:,} results</span>"
+        f'<script type="application/json" data-iso-key="_0">{island}</script>'
+        "</body></html>"
+    )
+
+
+def _reference(data):
+    # Work of the same kind as the parsers that sfpl's code plays no part in.
+    def reference():
+        json.loads(json.dumps(data))
+
+    return reference
+
+
+def _render_books(books, output):
+    def render():
+        _render(_Pages(iter([books])), io.StringIO(), output)
+
+    return render
+
+
+def cases():
+    """Builds the benchmark cases.
+
+    Returns:
+        dict: Maps each case's name to a function that runs it once.
+    """
+    client = Client()
+    holds = _fixture("holds.html")
+    checkouts = _fixture("checkouts.html")
+    bibs = _extract_data(holds)["entities"]["bibs"]
+    search_page = _search_page(bibs)
+    search = Search("python", client=client)
+    metadata_ids = list(bibs)
+    books = Account.parseHolds(holds, client=client) * 10
+
+    return {
+        REFERENCE: _reference(bibs),
+        "parse_holds": lambda: Account.parseHolds(holds, client=client),
+        "parse_checkouts": lambda: Account.parseCheckouts(checkouts, client=client),
+        "extract_data": lambda: _extract_data(holds),
+        "search_page": lambda: search._parsePage(search_page),
+        "metadata_id_to_id": lambda: [
+            Book.metaDataIdToId(metadata_id) for metadata_id in metadata_ids
+        ],
+        "render_text": _render_books(books, "text"),
+        "render_ndjson": _render_books(books, "ndjson"),
+    }
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(func, duration=1.0, warmup=3):
+    """Runs a case repeatedly for a while and times each run.
+
+    Args:
+        func (callable): The case.
+        duration (float, optional): How long to run it for, in seconds.
+        warmup (int, optional): Untimed runs beforehand.
+
+    Returns:
+        dict: Operations per second and the 50th, 95th and 99th percentile
+            latencies in microseconds.
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    clock = time.perf_counter
+    deadline = clock() + duration
+
+    while clock() < deadline or len(timings) < 5:
+        start = clock()
+        func()
+        timings.append(clock() - start)
+
+    timings.sort()
+    return {
+        "ops_per_sec": len(timings) / sum(timings),
+        "p50_us": _percentile(timings, 0.50) * 1e6,
+        "p95_us": _percentile(timings, 0.95) * 1e6,
+        "p99_us": _percentile(timings, 0.99) * 1e6,
+    }
+
+
+def change(name, results, baseline):
+    """Compares a case's throughput with its baseline, relative to the reference.
+
+    Args:
+        name (str): The case.
+        results (dict): Measurements by case name, including the reference.
+        baseline (dict): Baseline measurements by case name.
+
+    Returns:
+        float: The change in relative throughput as a fraction, or ``None`` if
+            the case or the reference is missing from either side.
+    """
+    if name == REFERENCE:
+        return None
+
+    try:
+        now = results[name]["ops_per_sec"] / results[REFERENCE]["ops_per_sec"]
+        then = baseline[name]["ops_per_sec"] / baseline[REFERENCE]["ops_per_sec"]
+    except KeyError:
+        return None
+
+    return now / then - 1
+
+
+def regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Finds cases whose relative throughput fell below their baseline.
+
+    Args:
+        results (dict): Measurements by case name, including the reference.
+        baseline (dict): Baseline measurements by case name.
+        threshold (float, optional): The fraction of baseline throughput a case
+            may lose before it counts as a regression.
+
+    Returns:
+        dict: Maps each regressed case to its change in throughput, as a fraction.
+    """
+    found = {}
+
+    for name in results:
+        difference = change(name, results, baseline)
+        if difference is not None and difference < -threshold:
+            found[name] = difference
+
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument(
+        "cases", nargs="*", metavar="CASE", help="cases to run (default: all)"
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=1.0,
+        help="seconds to run each case for (default: 1)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="allowed fractional drop in ops/sec (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--baseline", default=BASELINE, help="baseline file (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="store these results as the baseline"
+    )
+    args = parser.parse_args(argv)
+
+    available = cases()
+    unknown = set(args.cases) - set(available)
+    if unknown:
+        parser.error("unknown cases: {}".format(", ".join(sorted(unknown))))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print(
+        f"{'case':<20}{'ops/sec':>12}{'p50 us':>10}{'p95 us':>10}"
+        f"{'p99 us':>10}{'change':>10}"
+    )
+
+    names = [REFERENCE] + [
+        name for name in args.cases or available if name != REFERENCE
+    ]
+    results = {}
+    for name in names:
+        result = results[name] = measure(available[name], duration=args.duration)
+        difference = change(name, results, baseline)
+        shown = "" if difference is None else f"{difference:+.1%}"
+        print(
+            f"{name:<20}{result['ops_per_sec']:>12.1f}{result['p50_us']:>10.1f}"
+            f"{result['p95_us']:>10.1f}{result['p99_us']:>10.1f}{shown:>10}"
+        )
+
+    if args.save:
+        if REFERENCE in baseline:
+            # Cases that were not run keep their throughput relative to the new
+            # reference.
+            scale = (
+                results[REFERENCE]["ops_per_sec"] / baseline[REFERENCE]["ops_per_sec"]
+            )
+            baseline = {
+                name: {
+                    key: value * scale if key == "ops_per_sec" else value / scale
+                    for key, value in result.items()
+                }
+                for name, result in baseline.items()
+            }
+        with open(args.baseline, "w") as baseline_file:
+            rounded = {
+                name: {key: round(value, 1) for key, value in result.items()}
+                for name, result in {**baseline, **results}.items()
+            }
+            json.dump(rounded, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"saved baseline to {args.baseline}")
+        return 0
+
+    regressed = regressions(results, baseline, args.threshold)
+    for name, difference in sorted(regressed.items()):
+        print(
+            f"regression: {name} is {-difference:.1%} slower than its baseline",
+            file=sys.stderr,
+        )
+
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,5 +22,10 @@ setup(
     long_description_content_type="text/markdown",
     long_description=long_description,
     install_requires=install_requires,
+    extras_require={
+        "async": ["aiohttp~=3.9"],
+        "numpy": ["numpy"],
+        "arrow": ["pyarrow"],
+    },
     entry_points={"console_scripts": ["sfpl=sfpl.cli:main"]},
 )
@@ -6,6 +6,44 @@ With this module, you can check your holds and checked out books, as well as req
 Additionally, you can get the operating times of different SFPL library branches.
 """
 
-from .sfpl import Account, AdvancedSearch, Branch, Search, User
+from .cache import ResponseCache
+from .cassette import Cassette
+from .client import Client
+from .crawl import CatalogStore, Crawler
+from .index import LocalIndex
+from .memo import Memo
+from .ratelimit import RateLimiter
+from .retry import CircuitBreaker, RetryPolicy
+from .session import SessionStore
+from .sfpl import (
+    Account,
+    AccountSnapshot,
+    AccountSummary,
+    AdvancedSearch,
+    Branch,
+    Search,
+    User,
+)
+from .trace import Tracer
 
-__all__ = ["Account", "AdvancedSearch", "Branch", "Search", "User"]
+__all__ = [
+    "Account",
+    "AccountSnapshot",
+    "AccountSummary",
+    "AdvancedSearch",
+    "Branch",
+    "Cassette",
+    "CatalogStore",
+    "CircuitBreaker",
+    "Client",
+    "Crawler",
+    "LocalIndex",
+    "Memo",
+    "RateLimiter",
+    "ResponseCache",
+    "RetryPolicy",
+    "Search",
+    "SessionStore",
+    "Tracer",
+    "User",
+]
@@ -0,0 +1,843 @@
+"""An asyncio API for the SFPL website, built on aiohttp.
+
+The classes here mirror the blocking classes in :mod:`sfpl.sfpl` and reuse
+their parsing code, but send their requests with aiohttp so they can be awaited
+from an event loop without tying up a thread. Install the optional dependency
+with ``pip install sfpl[async]``.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from collections.abc import AsyncGenerator
+from typing import ClassVar
+
+from . import exceptions
+from .client import _rewrite_url
+from .frame import BookFrame
+from .sfpl import (
+    _MISSING,
+    CIRCULATION_PAGES,
+    DETAILS_ERRORS,
+    Account,
+    AccountSnapshot,
+    AdvancedSearch,
+    Book,
+    Branch,
+    Outcome,
+    Search,
+    _last_page,
+    _parse_list_page,
+    _parse_search_frame,
+    _parse_search_page,
+    _parseCirculation,
+)
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - exercised only without the extra
+    aiohttp = None
+    RETRY_ERRORS = ()
+else:
+    RETRY_ERRORS = (aiohttp.ClientConnectionError, TimeoutError)
+
+
+class Response:
+    """A fully read response.
+
+    Only the parts of ``requests.Response`` that sfpl's parsing code uses are
+    provided, so the same code can handle responses from either client.
+
+    Attributes:
+        url (str): The final URL, after redirects.
+        status_code (int): The HTTP status code.
+        headers (Mapping): The response headers.
+        text (str): The decoded body.
+        history (tuple): The redirect responses that led here.
+    """
+
+    def __init__(
+        self,
+        url,
+        status_code,
+        headers,
+        text,
+        history=(),
+        reason=None,
+        request_info=None,
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.history = history
+        self.reason = reason
+        self.request_info = request_info
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise aiohttp.ClientResponseError(
+                self.request_info,
+                self.history,
+                status=self.status_code,
+                message=self.reason or "",
+                headers=self.headers,
+            )
+
+
+class AsyncClient:
+    """An asyncio HTTP client that owns a pool of keep-alive connections.
+
+    The pool is created on first use inside a running event loop, and is
+    closed and recreated if the client is later used from a different loop.
+    Close the client before its loop finishes to close the pool's sockets too,
+    since a finished loop can no longer close them.
+
+    Attributes:
+        timeout (float): Default timeout for each request, in seconds.
+        hosts (dict): Maps host names to the base URL their requests are sent to instead.
+        rate_limiter (RateLimiter): Paces the requests sent to each host, if any.
+        retry (RetryPolicy): When failed requests are sent again, if ever.
+        breaker (CircuitBreaker): Fails fast for hosts that keep failing, if any.
+    """
+
+    def __init__(
+        self,
+        pool_size=10,
+        timeout=30,
+        headers=None,
+        hosts=None,
+        rate_limiter=None,
+        retry=None,
+        breaker=None,
+    ):
+        """
+        Args:
+            pool_size (int, optional): Maximum number of connections kept open per host.
+            timeout (float, optional): Default timeout for each request, in seconds.
+            headers (dict, optional): Headers sent with every request.
+            hosts (dict, optional): Maps host names such as ``"sfpl.bibliocommons.com"``
+                to the base URL requests for them are sent to instead, e.g. a proxy or
+                a local test server.
+            rate_limiter (RateLimiter, optional): Paces the requests sent to
+                each host. It can be shared with blocking clients.
+            retry (RetryPolicy, optional): Sends idempotent requests again after
+                connection errors, timeouts and server errors.
+            breaker (CircuitBreaker, optional): Rejects requests to a host that
+                keeps failing, without sending them. It can be shared with
+                blocking clients.
+
+        Raises:
+            ImportError: If aiohttp isn't installed.
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "The sfpl asyncio API requires aiohttp: pip install sfpl[async]"
+            )
+
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.hosts = dict(hosts or {})
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.breaker = breaker
+
+        self._loop = None
+        self._connector = None
+        self._session = None
+        self._closing = set()
+
+    def _getConnector(self):
+        loop = asyncio.get_running_loop()
+
+        if self._connector is None or self._connector.closed or self._loop is not loop:
+            if self._connector is not None and self._loop is not loop:
+                self._detach()
+            self._loop = loop
+            self._connector = aiohttp.TCPConnector(limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(
+                connector=self._connector,
+                connector_owner=False,
+                headers=self.headers,
+            )
+
+        return self._connector
+
+    def _detach(self):
+        # Closes the pool made on another event loop, on that loop if it's
+        # still running. The connections of a loop that has been closed went
+        # with it, so closing the pool there only marks it closed.
+        closing = _close(self._session, self._connector)
+
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(closing, self._loop)
+        else:
+            task = asyncio.ensure_future(closing)
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    def new_session(self):
+        """Creates a session with its own cookies that shares the connection pool.
+
+        Must be called from a running event loop.
+
+        Returns:
+            aiohttp.ClientSession: The new session.
+        """
+        return aiohttp.ClientSession(
+            connector=self._getConnector(),
+            connector_owner=False,
+            headers=self.headers,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+        )
+
+    async def request(self, method, url, session=None, **kwargs):
+        """Sends a request and reads the whole response.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to request.
+            session (aiohttp.ClientSession, optional): The session to send the
+                request with, for requests that need its cookies. Defaults to the
+                client's anonymous session.
+            **kwargs: Passed on to ``aiohttp.ClientSession.request``.
+
+        Returns:
+            Response: The response.
+        """
+        timeout = kwargs.pop("timeout", self.timeout)
+        if timeout is not None and not isinstance(timeout, aiohttp.ClientTimeout):
+            timeout = aiohttp.ClientTimeout(total=timeout)
+
+        if session is None:
+            self._getConnector()
+            session = self._session
+
+        if self.retry is None and self.breaker is None:
+            return await self._attempt(method, url, session, timeout, **kwargs)
+
+        attempt = 0
+        while True:
+            attempt += 1
+
+            if self.breaker is not None:
+                self.breaker.before(url)
+
+            try:
+                response = await self._attempt(method, url, session, timeout, **kwargs)
+            except (TimeoutError, aiohttp.ClientError) as exc:
+                transient = isinstance(exc, RETRY_ERRORS)
+                if self.breaker is not None:
+                    if transient:
+                        self.breaker.failure(url)
+                    else:
+                        self.breaker.cancel(url)
+                if not (
+                    transient
+                    and self.retry is not None
+                    and self.retry.retries(method, url, attempt)
+                ):
+                    raise
+                await asyncio.sleep(self.retry.delay(attempt))
+                continue
+
+            if self.breaker is not None:
+                self.breaker.observe(url, response.status_code)
+
+            if self.retry is None or not self.retry.retries(
+                method, url, attempt, response.status_code
+            ):
+                return response
+
+            await asyncio.sleep(self.retry.delay(attempt, response))
+
+    async def _attempt(self, method, url, session, timeout, **kwargs):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(url)
+
+        async with session.request(
+            method, _rewrite_url(url, self.hosts), timeout=timeout, **kwargs
+        ) as resp:
+            response = Response(
+                str(resp.url),
+                resp.status,
+                resp.headers,
+                await resp.text(errors="replace"),
+                tuple(resp.history),
+                resp.reason,
+                resp.request_info,
+            )
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe(url, response)
+
+        return response
+
+    async def get(self, url, session=None, **kwargs):
+        return await self.request("GET", url, session=session, **kwargs)
+
+    async def post(self, url, session=None, **kwargs):
+        return await self.request("POST", url, session=session, **kwargs)
+
+    async def close(self):
+        """Closes every pooled connection."""
+        await _close(self._session, self._connector)
+        if self._closing:
+            await asyncio.gather(*self._closing)
+
+        self._loop = self._connector = self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+async def _close(session, connector):
+    if session is not None:
+        await session.close()
+    if connector is not None:
+        await connector.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_async_client():
+    """Gets the process-wide asyncio client used when a class isn't given one.
+
+    Returns:
+        AsyncClient: The shared client.
+    """
+    global _default_client
+
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = AsyncClient()
+        return _default_client
+
+
+def set_default_async_client(client):
+    """Replaces the process-wide asyncio client.
+
+    Args:
+        client (AsyncClient): The client to share, or None to create a new one on next use.
+    """
+    global _default_client
+
+    with _default_client_lock:
+        _default_client = client
+
+
+async def _aiter_pages(
+    get_page, pages, start_page, concurrency
+) -> AsyncGenerator[list, None]:
+    """The asyncio counterpart of :func:`sfpl.sfpl._iter_pages`."""
+    if pages != "all" and pages < 1:
+        return
+
+    last_page, results = await get_page(start_page)
+
+    if last_page is None or last_page < start_page:
+        return
+
+    yield results
+
+    end = last_page if pages == "all" else min(start_page + pages - 1, last_page)
+    remaining = iter(range(start_page + 1, end + 1))
+
+    if concurrency <= 1:
+        for page in remaining:
+            last_page, results = await get_page(page)
+
+            if last_page is None or last_page < page:
+                return
+
+            yield results
+
+        return
+
+    pending = deque(
+        (page, asyncio.ensure_future(get_page(page)))
+        for page in itertools.islice(remaining, concurrency)
+    )
+
+    try:
+        while pending:
+            page, task = pending.popleft()
+            last_page, results = await task
+
+            if last_page is None or last_page < page:
+                return
+
+            for next_page in itertools.islice(remaining, 1):
+                pending.append((next_page, asyncio.ensure_future(get_page(next_page))))
+
+            yield results
+
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+class AsyncBook(Book):
+    """A book whose details are fetched with an :class:`AsyncClient`."""
+
+    __slots__ = ()
+
+    def __init__(self, data_dict, status=None, client=None):
+        super().__init__(
+            data_dict, status=status, client=client or get_default_async_client()
+        )
+
+    @classmethod
+    def fromBib(cls, bib, status=None, client=None, **kwargs):
+        return super().fromBib(
+            bib, status=status, client=client or get_default_async_client(), **kwargs
+        )
+
+    async def getDetails(self):
+        """Get the book's details.
+
+        Returns:
+            dict: Book details.
+        """
+        resp = await self.client.get(
+            f"https://sfpl.bibliocommons.com/item/show/{self._id}"
+        )
+        return self.parseDetails(resp.text)
+
+    @staticmethod
+    async def getDetailsMany(books, concurrency=4) -> list[Outcome]:
+        """Gets the details of many books at once.
+
+        Args:
+            books (iterable): AsyncBook objects to get the details of.
+            concurrency (int, optional): Number of detail pages to fetch at once.
+
+        Returns:
+            list: An Outcome for each book, in the order given, whose value is
+                the book's details or whose error is why they couldn't be fetched.
+        """
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def getDetails(book):
+            async with semaphore:
+                try:
+                    return Outcome(book, value=await book.getDetails())
+                except (*DETAILS_ERRORS, aiohttp.ClientError, TimeoutError) as exc:
+                    return Outcome(book, error=exc)
+
+        return list(await asyncio.gather(*(getDetails(book) for book in books)))
+
+
+class AsyncSearch(Search):
+    """A search whose results are fetched with an :class:`AsyncClient`.
+
+    Book results are :class:`AsyncBook` objects. List results are regular
+    :class:`sfpl.sfpl.List` objects that use the shared blocking client.
+    """
+
+    def __init__(
+        self,
+        term,
+        _type="keyword",
+        format=None,
+        sort=None,
+        on_order=None,
+        client=None,
+    ):
+        super().__init__(
+            term,
+            _type=_type,
+            format=format,
+            sort=sort,
+            on_order=on_order,
+            client=client or get_default_async_client(),
+        )
+
+    def getResults(
+        self, pages=1, start_page=1, concurrency=1
+    ) -> AsyncGenerator[list[Book], None]:
+        """Gets the results of the search.
+
+        Args:
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from, for resuming a crawl.
+            concurrency(int): Number of pages to fetch at once.
+
+        Yields:
+            list: A list of books or lists on the page.
+
+        Examples:
+            >>> async for page in AsyncSearch('Python').getResults(pages=2):
+            ...     print(page)
+        """
+        return _aiter_pages(self._getPage, pages, start_page, concurrency)
+
+    async def getFrame(self, pages=1, start_page=1, concurrency=1) -> BookFrame:
+        """Gets the results by column, without a Book object per result.
+
+        Args:
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from, for resuming a crawl.
+            concurrency(int): Number of pages to fetch at once.
+
+        Returns:
+            BookFrame: The books on every page, in order.
+        """
+        if self._type == "list":
+            raise ValueError("getFrame only supports book searches")
+
+        return BookFrame.concat(
+            [
+                frame
+                async for frame in _aiter_pages(
+                    self._getFramePage, pages, start_page, concurrency
+                )
+            ]
+        )
+
+    async def _getFramePage(self, page):
+        resp = await self.client.get(self._pageUrl(page))
+        total, frame = _parse_search_frame(resp.text)
+        return _last_page(total, 10), frame
+
+    async def _getPage(self, page):
+        resp = await self.client.get(self._pageUrl(page))
+        return self._parsePage(resp.text)
+
+    def _parsePage(self, response_text):
+        if self._type == "list":
+            total, lists = _parse_list_page(response_text)
+            return _last_page(total, 25), lists
+
+        total, books = _parse_search_page(
+            response_text, client=self.client, book_class=AsyncBook
+        )
+        return _last_page(total, 10), books
+
+
+class AsyncAdvancedSearch(AdvancedSearch):
+    """An advanced search whose results are fetched with an :class:`AsyncClient`."""
+
+    def __init__(
+        self,
+        exclusive=True,
+        format=None,
+        sort=None,
+        on_order=None,
+        client=None,
+        **kwargs,
+    ):
+        super().__init__(
+            exclusive=exclusive,
+            format=format,
+            sort=sort,
+            on_order=on_order,
+            client=client or get_default_async_client(),
+            **kwargs,
+        )
+
+    def getResults(
+        self, pages=1, start_page=1, concurrency=1
+    ) -> AsyncGenerator[list[Book], None]:
+        """Gets the results of the search.
+
+        Args:
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from, for resuming a crawl.
+            concurrency(int): Number of pages to fetch at once.
+
+        Yields:
+            list: A list of books on the page.
+        """
+        return _aiter_pages(self._getPage, pages, start_page, concurrency)
+
+    async def getFrame(self, pages=1, start_page=1, concurrency=1) -> BookFrame:
+        """Gets the results by column, without a Book object per result.
+
+        Args:
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from, for resuming a crawl.
+            concurrency(int): Number of pages to fetch at once.
+
+        Returns:
+            BookFrame: The books on every page, in order.
+        """
+        return BookFrame.concat(
+            [
+                frame
+                async for frame in _aiter_pages(
+                    self._getFramePage, pages, start_page, concurrency
+                )
+            ]
+        )
+
+    async def _getFramePage(self, page):
+        resp = await self.client.get(self._pageUrl(page))
+        total, frame = _parse_search_frame(resp.text)
+        return _last_page(total, 10), frame
+
+    async def _getPage(self, page):
+        resp = await self.client.get(self._pageUrl(page))
+        return self._parsePage(resp.text)
+
+    def _parsePage(self, response_text):
+        total, books = _parse_search_page(
+            response_text, client=self.client, book_class=AsyncBook
+        )
+        return _last_page(total, 10), books
+
+
+class AsyncBranch(Branch):
+    """A library branch whose hours are fetched with an :class:`AsyncClient`."""
+
+    __slots__ = ()
+
+    def __init__(self, name, client=None):
+        super().__init__(name, client=client or get_default_async_client())
+
+    async def getHours(self):
+        """Get the operating hours of the library.
+
+        Returns:
+            dict: A dictionary mapping days of the week to operating hours.
+        """
+        response = await self.client.get(self._hoursUrl())
+        response.raise_for_status()
+        return self.parseHours(response.text)
+
+
+class AsyncAccount:
+    """An SFPL account used from asyncio code.
+
+    Log in with :meth:`AsyncAccount.login` rather than calling the constructor.
+
+    Attributes:
+        session (aiohttp.ClientSession): The session with the account's cookies.
+        name (str): the account's username.
+        _id (str): the account's id.
+        client (AsyncClient): The client requests are sent with.
+        SNAPSHOT_TTL (float): Seconds the checkouts page is reused for by
+            renewals.
+    """
+
+    SNAPSHOT_TTL: ClassVar[float] = Account.SNAPSHOT_TTL
+
+    def __init__(self, session, name, _id, client):
+        self.session = session
+        self.name = name
+        self._id = _id
+        self.client = client
+        self._snapshot = AccountSnapshot()
+
+    @classmethod
+    async def login(cls, barcode, pin, client=None):
+        """Logs in to an account.
+
+        Args:
+            barcode (str): The library card barcode.
+            pin (str): PIN/ password for library account.
+            client (AsyncClient, optional): The client to send requests with.
+                Defaults to the shared asyncio client.
+
+        Returns:
+            AsyncAccount: The logged in account.
+
+        Raises:
+            LoginError: If the barcode and pin are rejected.
+        """
+        client = client or get_default_async_client()
+        session = client.new_session()
+
+        try:
+            resp = await client.post(
+                "https://sfpl.bibliocommons.com/user/login",
+                session=session,
+                data={"name": barcode, "user_pin": pin},
+                headers={
+                    "X-Requested-With": "XMLHttpRequest",
+                    "Accept": "application/json",
+                },
+            )
+
+            if not resp.json()["logged_in"]:
+                raise exceptions.LoginError(resp.json()["messages"][0]["key"])
+
+            resp = await client.get(
+                "https://sfpl.bibliocommons.com/user_dashboard", session=session
+            )
+            name, _id = Account._parseUserCard(resp.text)
+
+        except BaseException:
+            await session.close()
+            raise
+
+        return cls(session, name, _id, client)
+
+    async def getCheckouts(self) -> list[AsyncBook]:
+        """Gets the user's checked out items.
+        Returns:
+            list: A list of AsyncBook objects.
+        """
+        return list((await self._circulation("checkouts", max_age=0)).requireBooks())
+
+    async def getHolds(self) -> list[AsyncBook]:
+        """Gets the user's held items.
+        Returns:
+            list: A list of AsyncBook objects.
+        """
+        return list((await self._circulation("holds", max_age=0)).requireBooks())
+
+    async def _circulation(self, kind, max_age=None):
+        if max_age is None:
+            max_age = self.SNAPSHOT_TTL
+
+        page = self._snapshot.page(kind)
+
+        if page is not None and page.age < max_age:
+            return page
+
+        url, _, _, _ = CIRCULATION_PAGES[kind]
+        resp = await self.client.get(url, session=self.session)
+
+        if resp.history:
+            raise exceptions.NotLoggedIn
+
+        page = _parseCirculation(kind, resp.text, self.client, AsyncBook)
+        self._snapshot.store(kind, page)
+        return page
+
+    async def hold(self, book, branch):
+        """Holds the book.
+
+        Args:
+            book (Book): Book object to hold.
+            branch (Branch): Branch to have book delivered to.
+
+        Raises:
+            HoldError: If the hold request is denied.
+            NotLoggedIn: If the server doesn't accept the token.
+        """
+        token = await self._fetchHoldToken(book)
+        self._snapshot.invalidate("holds")
+        data = await self._placeHold(book, branch, token)
+
+        if not data["logged_in"]:
+            # The token went stale between the two requests, so get another.
+            data = await self._placeHold(book, branch, await self._fetchHoldToken(book))
+
+        Account._checkHoldResponse(data)
+
+    async def _fetchHoldToken(self, book):
+        resp = await self.client.get(
+            f"https://sfpl.bibliocommons.com/item/show/{book._id}",
+            session=self.session,
+        )
+        return Account._parseAuthenticityToken(resp.text)
+
+    async def _placeHold(self, book, branch, token):
+        resp = await self.client.post(
+            f"https://sfpl.bibliocommons.com/holds/place_single_click_hold/{book._id}",
+            data={
+                "authenticity_token": token,
+                "bib": book._id,
+                "branch": branch._id,
+            },
+            headers={
+                "X-Requested-With": "XMLHttpRequest",
+                "Accept": "application/json",
+            },
+            session=self.session,
+        )
+
+        # Rails answers a rejected authenticity token with 422 and no JSON.
+        if resp.status_code == 422:
+            return {"logged_in": False}
+
+        return resp.json()
+
+    async def renew(self, book):
+        """Renews the book.
+
+        Args:
+            book (Book): Book to renew.
+
+        Raises:
+            NotCheckedOut: If the user is trying to renew a book that they haven't checked out.
+            RenewError: If the renew request is denied.
+            NotLoggedIn: If the server doesn't accept the token.
+        """
+        page = await self._circulation("checkouts")
+        item = page.item(book)
+
+        if item is _MISSING:
+            raise exceptions.NotCheckedOut(book.title)
+        if item is None:
+            raise exceptions.RenewError(f"{book.title} can't be renewed.")
+
+        self._snapshot.invalidate("checkouts")
+        resp = await self.client.get(
+            f"https://sfpl.bibliocommons.com/checkedout/confirm/{item}",
+            headers={"X-CSRF-Token": page.requireToken()},
+            session=self.session,
+        )
+        confirmation = resp.json()
+
+        if not confirmation["logged_in"]:
+            raise exceptions.NotLoggedIn
+
+        resp = await self.client.post(
+            "https://sfpl.bibliocommons.com/checkedout/renew",
+            data=Account._parseRenewConfirmation(confirmation["html"]),
+            headers={
+                "X-Requested-With": "XMLHttpRequest",
+                "Accept": "application/json",
+                "Referer": "https://sfpl.bibliocommons.com/checkedout",
+            },
+            session=self.session,
+        )
+
+        Account._checkRenewResponse(resp.json())
+
+    async def logout(self):
+        """Logs out of the account and closes its session."""
+        try:
+            await self.client.get(
+                "https://sfpl.bibliocommons.com/user/logout", session=self.session
+            )
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Closes the account's session without logging out."""
+        await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return self.name
+
+    def __eq__(self, other):
+        if not isinstance(other, AsyncAccount):
+            return NotImplemented
+        return self._id == other._id
+
+    def __hash__(self):
+        return hash(self._id)
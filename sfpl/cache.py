@@ -0,0 +1,413 @@
+"""A persistent, SQLite-backed cache for anonymous GET responses.
+
+Catalog, search, user and branch pages change slowly, so a :class:`Client`
+given a :class:`ResponseCache` serves repeat requests for them from disk. Each
+kind of page has its own time to live; once an entry expires it is
+revalidated with ``If-None-Match``/``If-Modified-Since`` rather than
+downloaded again when the server supports it. Bodies are stored compressed.
+
+Requests sent with an account's session are never cached, and neither is any
+page that isn't one of the known public endpoints.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Endpoint classes, matched against the request URL in order.
+ENDPOINTS = (
+    ("item", re.compile(r"^https?://sfpl\.bibliocommons\.com/item/show/")),
+    ("search", re.compile(r"^https?://sfpl\.bibliocommons\.com/(v2/)?search\b")),
+    (
+        "user",
+        re.compile(
+            r"^https?://sfpl\.bibliocommons\.com/(user_profile|lists/show|list/share)/"
+        ),
+    ),
+    ("branch", re.compile(r"^https?://sfpl\.org/locations/")),
+)
+
+# Cache events counted in memory before they're written to the stats table.
+STATS_FLUSH_EVERY = 100
+
+# Default time to live of each endpoint class, in seconds.
+DEFAULT_TTLS = {
+    "item": 24 * 60 * 60,
+    "search": 60 * 60,
+    "user": 60 * 60,
+    "branch": 6 * 60 * 60,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    reason TEXT,
+    final_url TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    endpoint TEXT NOT NULL,
+    event TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (endpoint, event)
+);
+"""
+
+
+def endpoint_for(url):
+    """Gets the endpoint class of a URL.
+
+    Args:
+        url (str): The request URL.
+
+    Returns:
+        str: The endpoint class, or None if responses for the URL aren't cacheable.
+    """
+    for name, pattern in ENDPOINTS:
+        if pattern.match(url):
+            return name
+    return None
+
+
+class CacheEntry:
+    """A cached response.
+
+    Attributes:
+        url (str): The request URL.
+        endpoint (str): The endpoint class of the URL.
+        etag (str): The response's ETag, if it had one.
+        last_modified (str): The response's Last-Modified date, if it had one.
+        expires_at (float): When the entry needs revalidating, as a Unix timestamp.
+    """
+
+    def __init__(
+        self,
+        url,
+        endpoint,
+        status,
+        reason,
+        final_url,
+        headers,
+        encoding,
+        body,
+        etag,
+        last_modified,
+        expires_at,
+    ):
+        self.url = url
+        self.endpoint = endpoint
+        self.status = status
+        self.reason = reason
+        self.final_url = final_url
+        self.headers = headers
+        self.encoding = encoding
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self):
+        """bool: Whether the entry can be used without revalidating it."""
+        return time.time() < self.expires_at
+
+    def validators(self):
+        """Gets the headers that make a request conditional on this entry.
+
+        Returns:
+            dict: ``If-None-Match`` and ``If-Modified-Since`` headers, where known.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def response(self):
+        """Rebuilds the cached response.
+
+        Returns:
+            requests.Response: The response.
+        """
+        response = requests.Response()
+        response.status_code = self.status
+        response.reason = self.reason
+        response.url = self.final_url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = self.encoding
+        response._content = zlib.decompress(self.body)
+        return response
+
+
+class ResponseCache:
+    """A response cache stored in an SQLite database.
+
+    The database is opened in write-ahead-log mode with a busy timeout, so
+    several processes, such as overlapping cron jobs, can share one file.
+    Cache hits only read it: event counts are kept in memory and written in
+    batches, when a response is stored, every ``STATS_FLUSH_EVERY`` events
+    and on :meth:`close`.
+
+    Attributes:
+        path (str): The database file.
+        ttls (dict): Time to live of each endpoint class, in seconds.
+    """
+
+    def __init__(self, path, ttls=None, compression_level=6):
+        """
+        Args:
+            path (str): The database file, created if it doesn't exist.
+            ttls (dict, optional): Time to live of endpoint classes, in seconds,
+                overriding ``DEFAULT_TTLS``. A time to live of 0 disables caching
+                for that class.
+            compression_level (int, optional): zlib compression level of stored bodies.
+        """
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.compression_level = compression_level
+
+        self._local = threading.local()
+        self._connections_lock = threading.Lock()
+        self._connections = []
+        self._generation = 0
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+        self._pending = {}
+
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self):
+        # Each thread has its own connection. close() may close it from
+        # another thread, after which the thread opens a new one.
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None or self._local.generation != self._generation:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+
+            with self._connections_lock:
+                self._connections.append(connection)
+                self._local.generation = self._generation
+            self._local.connection = connection
+
+        return connection
+
+    def ttl(self, url):
+        """Gets how long responses for a URL are cached.
+
+        Args:
+            url (str): The request URL.
+
+        Returns:
+            int: The time to live in seconds, or 0 if the URL isn't cacheable.
+        """
+        endpoint = endpoint_for(url)
+        return self.ttls.get(endpoint, 0) if endpoint else 0
+
+    def get(self, url):
+        """Looks up a cached response, fresh or not.
+
+        Args:
+            url (str): The request URL.
+
+        Returns:
+            CacheEntry: The entry, or None if there isn't one.
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT url, endpoint, status, reason, final_url, headers, encoding,"
+                " body, etag, last_modified, expires_at FROM responses WHERE url = ?",
+                (url,),
+            )
+            .fetchone()
+        )
+
+        if row is None:
+            return None
+
+        entry = CacheEntry(*row)
+        entry.headers = json.loads(entry.headers)
+        return entry
+
+    def store(self, url, response):
+        """Stores a response, if it is cacheable.
+
+        Args:
+            url (str): The request URL.
+            response (requests.Response): The response.
+
+        Returns:
+            bool: Whether the response was stored.
+        """
+        ttl = self.ttl(url)
+
+        if (
+            not ttl
+            or response.status_code != 200
+            or "no-store" in response.headers.get("Cache-Control", "")
+        ):
+            return False
+
+        now = time.time()
+        self._count(url, "store")
+
+        with self._connection() as connection:
+            self._writeStats(connection)
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES"
+                " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    endpoint_for(url),
+                    response.status_code,
+                    response.reason,
+                    response.url,
+                    json.dumps(dict(response.headers)),
+                    response.encoding,
+                    zlib.compress(response.content, self.compression_level),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    now,
+                    now + ttl,
+                ),
+            )
+
+        return True
+
+    def refresh(self, entry):
+        """Marks an entry as fresh again after the server confirmed it is unchanged.
+
+        Args:
+            entry (CacheEntry): The revalidated entry.
+        """
+        now = time.time()
+        entry.expires_at = now + self.ttl(entry.url)
+
+        with self._connection() as connection:
+            connection.execute(
+                "UPDATE responses SET stored_at = ?, expires_at = ? WHERE url = ?",
+                (now, entry.expires_at, entry.url),
+            )
+
+    def record(self, url, event):
+        """Counts a cache event for a URL's endpoint class.
+
+        Args:
+            url (str): The request URL.
+            event (str): One of ``"hit"``, ``"miss"``, ``"revalidated"`` or ``"store"``.
+        """
+        if self._count(url, event) >= STATS_FLUSH_EVERY:
+            self.flush()
+
+    def _count(self, url, event):
+        key = (endpoint_for(url) or "other", event)
+
+        with self._stats_lock:
+            self._stats[key] = self._stats.get(key, 0) + 1
+            self._pending[key] = self._pending.get(key, 0) + 1
+            return sum(self._pending.values())
+
+    def _writeStats(self, connection):
+        with self._stats_lock:
+            pending, self._pending = self._pending, {}
+
+        if pending:
+            connection.executemany(
+                "INSERT INTO stats VALUES (?, ?, ?) ON CONFLICT (endpoint, event)"
+                " DO UPDATE SET count = count + excluded.count",
+                [
+                    (endpoint, event, count)
+                    for (endpoint, event), count in pending.items()
+                ],
+            )
+
+    def flush(self):
+        """Writes the cache events counted in memory to the stats table."""
+        with self._stats_lock:
+            if not self._pending:
+                return
+
+        with self._connection() as connection:
+            self._writeStats(connection)
+
+    @property
+    def stats(self):
+        """dict: Counts of cache events in this process, by event and then endpoint class."""
+        with self._stats_lock:
+            return _nest(self._stats.items())
+
+    def totals(self):
+        """Gets the counts of cache events across every process that used the cache.
+
+        Returns:
+            dict: Counts of cache events by event and then endpoint class.
+        """
+        self.flush()
+        return _nest(
+            ((endpoint, event), count)
+            for endpoint, event, count in self._connection().execute(
+                "SELECT endpoint, event, count FROM stats"
+            )
+        )
+
+    def prune(self, max_stale=7 * 24 * 60 * 60):
+        """Deletes entries that expired long ago.
+
+        Args:
+            max_stale (float, optional): How long after expiring, in seconds, an
+                entry is kept around for revalidation.
+
+        Returns:
+            int: The number of entries deleted.
+        """
+        with self._connection() as connection:
+            return connection.execute(
+                "DELETE FROM responses WHERE expires_at < ?",
+                (time.time() - max_stale,),
+            ).rowcount
+
+    def clear(self):
+        """Deletes every entry and statistic."""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM responses")
+            connection.execute("DELETE FROM stats")
+
+        with self._stats_lock:
+            self._stats.clear()
+            self._pending.clear()
+
+    def close(self):
+        """Writes pending event counts and closes every thread's database connection."""
+        self.flush()
+
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+
+        for connection in connections:
+            connection.close()
+
+
+def _nest(counts):
+    nested = {}
+    for (endpoint, event), count in counts:
+        nested.setdefault(event, {})[endpoint] = count
+    return nested
@@ -0,0 +1,269 @@
+"""Recording and replaying HTTP traffic, for working offline.
+
+A :class:`Client` given a :class:`Cassette` in ``"record"`` mode sends its
+requests as usual and saves each request and response to a JSON file, with
+credentials, tokens and cookies scrubbed. In ``"replay"`` mode it never
+touches the network: each request is answered with the next response
+recorded for its method, path and query, optionally after a simulated delay, so
+searches, logins and renewals run the same way on an isolated machine every
+time.
+"""
+
+import base64
+import json
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import exceptions
+
+MODES = ("record", "replay")
+SCRUBBED = "[scrubbed]"
+
+# Headers that carry credentials and are left out of cassettes.
+SCRUBBED_HEADERS = frozenset(("authorization", "cookie", "set-cookie", "x-csrf-token"))
+
+# Form fields whose values are replaced before a request body is saved.
+SCRUBBED_FIELDS = frozenset(
+    ("name", "user_pin", "pin", "barcode", "password", "authenticity_token")
+)
+
+
+def scrub_body(body, fields=SCRUBBED_FIELDS):
+    """Replaces the values of sensitive fields in a form-encoded request body.
+
+    Args:
+        body (str): The body.
+        fields (collection, optional): Names of the fields to scrub.
+
+    Returns:
+        str: The scrubbed body. Bodies that aren't form-encoded are returned as is.
+    """
+    if not body or "=" not in body or body.lstrip().startswith(("{", "[", "<")):
+        return body
+
+    pairs = parse_qsl(body, keep_blank_values=True)
+    return urlencode(
+        [(key, SCRUBBED if key in fields else value) for key, value in pairs]
+    )
+
+
+def _scrub_headers(headers):
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in SCRUBBED_HEADERS
+    }
+
+
+def _key(method, url):
+    # Requests match on their path and query only, so a cassette recorded
+    # through a proxy or test server replays against any host.
+    parts = urlsplit(url)
+    return method, parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def _encode_body(content):
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body": base64.b64encode(content).decode("ascii"), "base64": True}
+
+
+def _decode_body(recorded):
+    body = recorded.get("body", "")
+
+    if recorded.get("base64"):
+        return base64.b64decode(body)
+
+    return body.encode("utf-8")
+
+
+class Cassette:
+    """Requests and responses recorded to, or replayed from, a JSON file.
+
+    Attributes:
+        path (str): The cassette file.
+        mode (str): ``"record"`` or ``"replay"``.
+        latency (float or str): Seconds to wait before each replayed response,
+            or ``"recorded"`` to wait as long as the recorded response took.
+        interactions (list): The recorded requests and responses, in order.
+    """
+
+    def __init__(self, path, mode="replay", latency=0.0, scrub=None):
+        """
+        Args:
+            path (str): The cassette file. Recording replaces it.
+            mode (str, optional): ``"record"`` or ``"replay"``.
+            latency (float or str, optional): Seconds to wait before each
+                replayed response, or ``"recorded"`` to wait as long as the
+                recorded response took.
+            scrub (callable, optional): Takes each interaction as it is
+                recorded and returns it with anything else sensitive removed.
+
+        Raises:
+            ValueError: If the mode isn't valid.
+            FileNotFoundError: If a cassette to replay doesn't exist.
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}, not {mode!r}")
+
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.scrub = scrub
+        self.interactions = []
+
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._recorded = {}
+
+        if mode == "replay":
+            with open(path, encoding="utf-8") as cassette:
+                self.interactions = json.load(cassette)["interactions"]
+
+            for interaction in self.interactions:
+                request = interaction["request"]
+                key = _key(request["method"], request["url"])
+                self._recorded.setdefault(key, []).append(interaction)
+
+    def record(self, request, response, elapsed=0.0):
+        """Adds a request and its response to the cassette.
+
+        Args:
+            request (requests.PreparedRequest): The request sent.
+            response (requests.Response): The response received.
+            elapsed (float, optional): How long the response took, in seconds.
+        """
+        body = request.body
+
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", "replace")
+
+        interaction = {
+            "request": {
+                "method": request.method,
+                "url": request.url,
+                "headers": _scrub_headers(request.headers),
+                "body": scrub_body(body),
+            },
+            "response": {
+                "status": response.status_code,
+                "reason": response.reason,
+                "url": response.url,
+                "headers": _scrub_headers(response.headers),
+                "encoding": response.encoding,
+                "elapsed": elapsed,
+                **_encode_body(response.content),
+            },
+        }
+
+        if self.scrub is not None:
+            interaction = self.scrub(interaction)
+
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def play(self, request):
+        """Gets the next recorded response to a request.
+
+        Requests are matched by method, path and query string. Responses
+        recorded for the same request are served in the order they were
+        recorded, and the last one is repeated once they run out.
+
+        Args:
+            request (requests.PreparedRequest): The request.
+
+        Returns:
+            requests.Response: The recorded response.
+
+        Raises:
+            UnrecordedRequest: If no response was recorded for the request.
+        """
+        key = _key(request.method, request.url)
+
+        with self._lock:
+            recorded = self._recorded.get(key)
+
+            if not recorded:
+                raise exceptions.UnrecordedRequest(request.method, request.url)
+
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+
+        recorded = recorded[min(position, len(recorded) - 1)]["response"]
+        delay = (
+            recorded.get("elapsed", 0) if self.latency == "recorded" else self.latency
+        )
+
+        if delay:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.reason = recorded["reason"]
+        response.url = recorded["url"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response.encoding = recorded["encoding"]
+        response.request = request
+        response._content = _decode_body(recorded)
+        response._content_consumed = True
+        return response
+
+    def rewind(self):
+        """Replays every response from the start again."""
+        with self._lock:
+            self._positions.clear()
+
+    def save(self):
+        """Writes the recorded interactions to the cassette file."""
+        if self.mode != "record":
+            return
+
+        with self._lock:
+            interactions = list(self.interactions)
+
+        with open(self.path, "w", encoding="utf-8") as cassette:
+            json.dump({"version": 1, "interactions": interactions}, cassette, indent=1)
+            cassette.write("\n")
+
+
+class CassetteAdapter(BaseAdapter):
+    """A transport adapter that records through, or replays instead of, another adapter.
+
+    Attributes:
+        cassette (Cassette): The cassette requests are recorded to or replayed from.
+        adapter (requests.adapters.BaseAdapter): The adapter that sends
+            requests while recording.
+    """
+
+    def __init__(self, cassette, adapter):
+        """
+        Args:
+            cassette (Cassette): The cassette to record to or replay from.
+            adapter (requests.adapters.BaseAdapter): The adapter that sends
+                requests while recording.
+        """
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode == "replay":
+            return self.cassette.play(request)
+
+        start = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        # Reads the body, so the recorded time includes downloading it.
+        response.content  # noqa: B018
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        """Saves the cassette and closes the wrapped adapter."""
+        self.cassette.save()
+        self.adapter.close()
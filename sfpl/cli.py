@@ -2,13 +2,22 @@
 
 import argparse
 import getpass
+import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
-from . import exceptions
-from .sfpl import Account, AdvancedSearch, Book, Branch, List, Search
+from . import exceptions, trace
+from .cache import ResponseCache
+from .cassette import Cassette
+from .client import Client
+from .crawl import Crawler, sweep
+from .ratelimit import RateLimiter
+from .retry import CircuitBreaker, RetryPolicy
+from .session import SessionStore
+from .sfpl import DETAILS_ERRORS, Account, AdvancedSearch, Book, Branch, List, Search
 
 ADVANCED_FIELDS = (
     "keyword",
@@ -25,6 +34,8 @@ ADVANCED_FIELDS = (
 )
 SEARCH_TYPES = ("keyword", "title", "author", "subject", "tag", "list")
 WEEKDAYS = ("Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat")
+DEFAULT_CONCURRENCY = 4
+OUTPUT_FORMATS = ("text", "json", "ndjson")
 
 
 class CLIError(Exception):
@@ -38,11 +49,79 @@ def _positive_int(value):
     return number
 
 
+def _latency(value):
+    if value == "recorded":
+        return value
+    seconds = float(value)
+    if seconds < 0:
+        raise argparse.ArgumentTypeError("must not be negative")
+    return seconds
+
+
+def _rate(value):
+    rate = float(value)
+    if rate <= 0:
+        raise argparse.ArgumentTypeError("must be positive")
+    return rate
+
+
+def _non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError("must not be negative")
+    return number
+
+
+def _page_count(value):
+    if value == "all":
+        return value
+    return _positive_int(value)
+
+
+def _add_paging_options(parser):
+    parser.add_argument(
+        "--pages",
+        type=_page_count,
+        default=1,
+        help="number of result pages to request, or 'all' (default: 1)",
+    )
+    parser.add_argument(
+        "--start-page",
+        type=_positive_int,
+        default=1,
+        metavar="PAGE",
+        help="first result page to request (default: 1)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=_positive_int,
+        default=DEFAULT_CONCURRENCY,
+        metavar="N",
+        help=f"result pages to fetch at once (default: {DEFAULT_CONCURRENCY})",
+    )
+
+
 def _add_account_options(parser):
     parser.add_argument(
         "--barcode",
         help="library card barcode (default: SFPL_BARCODE)",
     )
+    parser.add_argument(
+        "--sessions",
+        metavar="PATH",
+        help="reuse logins saved in this file between runs (default: SFPL_SESSIONS)",
+    )
+    _add_output_option(parser)
+
+
+def _add_output_option(parser):
+    parser.add_argument(
+        "--output",
+        choices=OUTPUT_FORMATS,
+        default="text",
+        metavar="FORMAT",
+        help="output format: {} (default: text)".format(", ".join(OUTPUT_FORMATS)),
+    )
 
 
 def build_parser():
@@ -51,6 +130,53 @@ def build_parser():
         prog="sfpl",
         description="Search and inspect San Francisco Public Library data.",
     )
+    parser.add_argument(
+        "--cache",
+        metavar="PATH",
+        help="cache public pages in an SQLite database (default: SFPL_CACHE)",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record",
+        metavar="PATH",
+        help="record every request and response to a cassette file",
+    )
+    cassette.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="answer requests from a cassette file instead of the network",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=_latency,
+        default=0.0,
+        metavar="SECONDS",
+        help="delay before each replayed response, or 'recorded' (default: 0)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=_rate,
+        metavar="N",
+        help="send at most N requests per second to each host",
+    )
+    parser.add_argument(
+        "--retries",
+        type=_non_negative_int,
+        default=0,
+        metavar="N",
+        help="retry failed page loads up to N times, and stop calling a host "
+        "that keeps failing (default: 0)",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="print a timing breakdown of requests and parse stages to stderr",
+    )
+    parser.add_argument(
+        "--trace-json",
+        metavar="PATH",
+        help="write request and parse timings as a Chrome trace-event file",
+    )
     commands = parser.add_subparsers(
         dest="command", required=True, title="commands", metavar="COMMAND"
     )
@@ -86,12 +212,8 @@ def build_parser():
         action="store_true",
         help="include detailed book metadata",
     )
-    search.add_argument(
-        "--pages",
-        type=_positive_int,
-        default=1,
-        help="number of result pages to request (default: 1)",
-    )
+    _add_paging_options(search)
+    _add_output_option(search)
     search.set_defaults(handler=_run_search)
 
     advanced = commands.add_parser(
@@ -139,24 +261,27 @@ def build_parser():
         action="store_true",
         help="include detailed book metadata",
     )
-    advanced.add_argument(
-        "--pages",
-        type=_positive_int,
-        default=1,
-        help="number of result pages to request (default: 1)",
-    )
+    _add_paging_options(advanced)
+    _add_output_option(advanced)
     advanced.set_defaults(handler=_run_advanced_search)
 
     details = commands.add_parser("details", help="get details for a book by ID")
     details.add_argument("id", help="book catalog ID")
+    _add_output_option(details)
     details.set_defaults(handler=_run_details)
 
     hours = commands.add_parser("branch-hours", help="show a branch's hours")
-    hours.add_argument("branch", nargs="+", help="branch name")
+    hours.add_argument("branch", nargs="*", help="branch name")
+    hours.add_argument(
+        "--all",
+        action="store_true",
+        help="show the hours of every branch",
+    )
+    _add_output_option(hours)
     hours.set_defaults(handler=_run_branch_hours)
 
     account = commands.add_parser(
-        "account", help="show read-only account circulation data"
+        "account", help="show account circulation data and renew checkouts"
     )
     account_commands = account.add_subparsers(
         dest="account_command",
@@ -170,15 +295,186 @@ def build_parser():
     checkouts = account_commands.add_parser("checkouts", help="show current checkouts")
     _add_account_options(checkouts)
     checkouts.set_defaults(handler=_run_account)
+    renew = account_commands.add_parser("renew", help="renew checked out books")
+    renew.add_argument(
+        "book_ids", nargs="*", metavar="ID", help="ID of a book to renew"
+    )
+    renew.add_argument(
+        "--all",
+        action="store_true",
+        help="renew every checked out book that can be renewed",
+    )
+    _add_account_options(renew)
+    renew.set_defaults(handler=_run_account_renew)
+    summary = account_commands.add_parser(
+        "summary", help="show holds ready for pickup and books due soon"
+    )
+    summary.add_argument(
+        "--due-within",
+        type=_non_negative_int,
+        default=3,
+        metavar="DAYS",
+        help="show books due within this many days (default: 3)",
+    )
+    _add_account_options(summary)
+    summary.set_defaults(handler=_run_account_summary)
+
+    crawl = commands.add_parser(
+        "crawl", help="mirror search results into a local database"
+    )
+    crawl.add_argument("store", help="SQLite database the books are stored in")
+    crawl.add_argument("query", nargs="+", help="search query; may be repeated")
+    crawl.add_argument(
+        "--type",
+        choices=SEARCH_TYPES[:-1],
+        default="keyword",
+        dest="search_type",
+        metavar="TYPE",
+        help="search field: {} (default: keyword)".format(", ".join(SEARCH_TYPES[:-1])),
+    )
+    crawl.add_argument(
+        "--format",
+        action="append",
+        dest="formats",
+        metavar="FORMAT",
+        help="crawl each query once per media format; may be repeated",
+    )
+    crawl.add_argument(
+        "--concurrency",
+        type=_positive_int,
+        default=DEFAULT_CONCURRENCY,
+        metavar="N",
+        help=f"result pages to fetch at once (default: {DEFAULT_CONCURRENCY})",
+    )
+    crawl.add_argument(
+        "--batch-size",
+        type=_positive_int,
+        default=10,
+        metavar="PAGES",
+        help="result pages written per transaction (default: 10)",
+    )
+    crawl.add_argument(
+        "--refresh",
+        action="store_true",
+        help="crawl finished queries again from the first page",
+    )
+    _add_output_option(crawl)
+    crawl.set_defaults(handler=_run_crawl)
+
+    cache = commands.add_parser("cache", help="inspect or clear the response cache")
+    cache_commands = cache.add_subparsers(
+        dest="cache_command",
+        required=True,
+        title="commands",
+        metavar="COMMAND",
+    )
+    stats = cache_commands.add_parser(
+        "stats", help="show cache hits and misses by endpoint"
+    )
+    _add_output_option(stats)
+    stats.set_defaults(handler=_run_cache)
+    clear = cache_commands.add_parser("clear", help="delete every cached page")
+    clear.set_defaults(handler=_run_cache, output="text")
 
     return parser
 
 
-def _collect_results(result_pages):
-    results = []
-    for page in result_pages:
-        results.extend(page)
-    return results
+def _client(args, environ):
+    path = args.cache or environ.get("SFPL_CACHE")
+    cassette = None
+
+    if args.record:
+        cassette = Cassette(args.record, mode="record")
+    elif args.replay:
+        try:
+            cassette = Cassette(args.replay, mode="replay", latency=args.replay_latency)
+        except (OSError, ValueError, KeyError) as exc:
+            raise CLIError(f"cannot read cassette {args.replay}: {exc}") from exc
+
+    rate_limiter = None
+    if args.rate:
+        rate_limiter = RateLimiter(rate=args.rate, burst=max(1, round(args.rate)))
+
+    retry = breaker = None
+    if args.retries:
+        retry = RetryPolicy(attempts=args.retries + 1)
+        breaker = CircuitBreaker()
+
+    if not path and cassette is None and rate_limiter is None and retry is None:
+        return None
+    return Client(
+        cache=ResponseCache(path) if path else None,
+        cassette=cassette,
+        rate_limiter=rate_limiter,
+        retry=retry,
+        breaker=breaker,
+    )
+
+
+class _Detailed:
+    """A book result with its prefetched details, or None if they're unavailable."""
+
+    def __init__(self, book, details):
+        self.book = book
+        self.details = details
+
+
+class _Renewal:
+    """The outcome of renewing a book."""
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+
+def _with_details(items, concurrency):
+    books = [item for item in items if isinstance(item, Book)]
+    details = {
+        id(outcome.book): outcome.value
+        for outcome in Book.getDetailsMany(books, concurrency=concurrency)
+    }
+    return [
+        _Detailed(item, details[id(item)]) if isinstance(item, Book) else item
+        for item in items
+    ]
+
+
+class _Pages:
+    """Pages of results, rendered one at a time as they arrive."""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __iter__(self):
+        return iter(self.pages)
+
+    def close(self):
+        close = getattr(self.pages, "close", None)
+        if close is not None:
+            close()
+
+
+def _stream_results(result_pages, details_concurrency=None):
+    if not details_concurrency:
+        yield from result_pages
+        return
+
+    # Fetch each page's book details in the background while the next page
+    # of results downloads.
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        pending = None
+        for page in result_pages:
+            future = executor.submit(_with_details, page, details_concurrency)
+            if pending is not None:
+                yield pending.result()
+            pending = future
+        if pending is not None:
+            yield pending.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        close = getattr(result_pages, "close", None)
+        if close is not None:
+            close()
 
 
 def _run_search(args, environ, input_stream):
@@ -189,13 +485,18 @@ def _run_search(args, environ, input_stream):
         format=args.format,
         sort=args.sort,
         on_order=args.on_order,
+        client=args.client,
+    )
+    return _Pages(
+        _stream_results(
+            search.getResults(
+                pages=args.pages,
+                start_page=args.start_page,
+                concurrency=args.concurrency,
+            ),
+            details_concurrency=args.concurrency if args.details else None,
+        )
     )
-    results = _collect_results(search.getResults(pages=args.pages))
-    if getattr(args, "details", False):
-        for item in results:
-            if isinstance(item, Book):
-                item._include_details = True
-    return results
 
 
 def _parse_filters(values, operation):
@@ -230,25 +531,42 @@ def _run_advanced_search(args, environ, input_stream):
         format=args.format,
         sort=args.sort,
         on_order=args.on_order,
+        client=args.client,
         **filters,
     )
-    results = _collect_results(search.getResults(pages=args.pages))
-    if getattr(args, "details", False):
-        for item in results:
-            if isinstance(item, Book):
-                item._include_details = True
-    return results
+    return _Pages(
+        _stream_results(
+            search.getResults(
+                pages=args.pages,
+                start_page=args.start_page,
+                concurrency=args.concurrency,
+            ),
+            details_concurrency=args.concurrency if args.details else None,
+        )
+    )
 
 
 def _run_details(args, environ, input_stream):
     del environ, input_stream
-    book = Book({"_id": args.id, "title": "", "subtitle": "", "author": ""})
+    book = Book(
+        {"_id": args.id, "title": "", "subtitle": "", "author": ""},
+        client=args.client,
+    )
     return {"type": "details", "details": book.getDetails()}
 
 
 def _run_branch_hours(args, environ, input_stream):
     del environ, input_stream
-    branch = Branch(" ".join(args.branch))
+    if args.all:
+        if args.branch:
+            raise CLIError("pass either a branch name or --all, not both")
+        return {
+            "type": "all-hours",
+            "branches": Branch.getAllHours(client=args.client),
+        }
+    if not args.branch:
+        raise CLIError("a branch name or --all is required")
+    branch = Branch(" ".join(args.branch), client=args.client)
     return {"branch": branch.name, "hours": branch.getHours()}
 
 
@@ -267,14 +585,89 @@ def _account_credentials(args, environ, input_stream):
     return barcode, pin
 
 
-def _run_account(args, environ, input_stream):
+def _login(args, environ, input_stream):
     barcode, pin = _account_credentials(args, environ, input_stream)
-    account = Account(barcode, pin)
+    path = args.sessions or environ.get("SFPL_SESSIONS")
+    return Account(
+        barcode,
+        pin,
+        client=args.client,
+        sessions=SessionStore(path) if path else None,
+    )
+
+
+def _run_account(args, environ, input_stream):
+    account = _login(args, environ, input_stream)
     if args.account_command == "holds":
         return account.getHolds()
     return account.getCheckouts()
 
 
+def _run_account_renew(args, environ, input_stream):
+    if not args.all and not args.book_ids:
+        raise CLIError("a book ID or --all is required")
+    if args.all and args.book_ids:
+        raise CLIError("pass book IDs or --all, not both")
+
+    account = _login(args, environ, input_stream)
+    if args.all:
+        outcomes = account.renewAll()
+    else:
+        outcomes = account.renewMany(
+            Book(
+                {"_id": book_id, "title": "", "subtitle": "", "author": ""},
+                client=args.client,
+            )
+            for book_id in args.book_ids
+        )
+
+    args.failed = not all(outcome.ok for outcome in outcomes)
+    return [_Renewal(outcome) for outcome in outcomes]
+
+
+def _run_account_summary(args, environ, input_stream):
+    account = _login(args, environ, input_stream)
+    return {
+        "type": "account-summary",
+        "summary": account.getSummary(due_within=args.due_within),
+    }
+
+
+def _run_cache(args, environ, input_stream):
+    del environ, input_stream
+    if args.client is None or args.client.cache is None:
+        raise CLIError("no cache configured; pass --cache or set SFPL_CACHE")
+    cache = args.client.cache
+    if args.cache_command == "clear":
+        cache.clear()
+        return []
+    return {"type": "cache-stats", "stats": cache.totals()}
+
+
+def _run_crawl(args, environ, input_stream):
+    del environ, input_stream
+    searches = [
+        search
+        for query in args.query
+        for search in sweep(
+            query,
+            _type=args.search_type,
+            formats=args.formats or (None,),
+            client=args.client,
+        )
+    ]
+    crawler = Crawler(
+        args.store, concurrency=args.concurrency, batch_size=args.batch_size
+    )
+    try:
+        return {
+            "type": "crawl",
+            "queries": crawler.crawl(searches, refresh=args.refresh),
+        }
+    finally:
+        crawler.close()
+
+
 def _format_details(details):
     brief = details.get("brief", {})
     lines = []
@@ -304,6 +697,21 @@ def _format_details(details):
 
 
 def _text_item(item):
+    if isinstance(item, _Renewal):
+        label = item.outcome.book.title or str(item.outcome.book._id)
+        if item.outcome.ok:
+            return f"{label}: renewed"
+        return f"{label}: not renewed: {_error_message(item.outcome.error)}"
+    if isinstance(item, _Detailed):
+        line = _text_item(item.book)
+        if item.details:
+            try:
+                formatted = _format_details(item.details)
+            except DETAILS_ERRORS:
+                return line
+            if formatted:
+                line += "\n" + formatted
+        return line
     if isinstance(item, Book):
         line = item.title
         if item.subtitle:
@@ -312,42 +720,145 @@ def _text_item(item):
             line += " — " + item.author
         if item.status:
             line += f" ({item.status})"
-        if getattr(item, "_include_details", False):
-            try:
-                details = item.getDetails()
-                formatted = _format_details(details)
-                if formatted:
-                    line += "\n" + formatted
-            except (
-                AttributeError,
-                KeyError,
-                StopIteration,
-                TypeError,
-                ValueError,
-                exceptions.MissingScriptError,
-                requests.RequestException,
-            ):
-                return line
         return line
     if isinstance(item, List):
         return f"{item.title} — {item.user!s} ({item.itemcount} items)"
     raise TypeError(f"unsupported result type: {type(item).__name__}")
 
 
-def _render(value, stream):
-    if isinstance(value, dict) and value.get("type") == "details":
+def _json_item(item):
+    if isinstance(item, _Renewal):
+        return {
+            "type": "renewal",
+            "id": str(item.outcome.book._id),
+            "title": item.outcome.book.title,
+            "renewed": item.outcome.ok,
+            "error": None if item.outcome.ok else _error_message(item.outcome.error),
+        }
+    if isinstance(item, _Detailed):
+        return {**_json_item(item.book), "details": item.details}
+    if isinstance(item, Book):
+        return {
+            "type": "book",
+            "id": str(item._id),
+            "title": item.title,
+            "subtitle": item.subtitle,
+            "author": item.author,
+            "status": item.status,
+        }
+    if isinstance(item, List):
+        return {
+            "type": "list",
+            "id": str(item._id),
+            "title": item.title,
+            "list_type": item._type,
+            "user": str(item.user),
+            "created_on": item.createdOn,
+            "item_count": item.itemcount,
+            "description": item.description,
+        }
+    raise TypeError(f"unsupported result type: {type(item).__name__}")
+
+
+def _json_dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _render_pages(pages, stream, output):
+    first = True
+    try:
+        if output == "json":
+            stream.write("[")
+        for page in pages:
+            for item in page:
+                if output == "text":
+                    stream.write(_text_item(item) + "\n")
+                elif output == "ndjson":
+                    stream.write(_json_dumps(_json_item(item)) + "\n")
+                else:
+                    stream.write(
+                        ("\n" if first else ",\n") + _json_dumps(_json_item(item))
+                    )
+                first = False
+            # Let downstream readers see each page as soon as it's parsed.
+            stream.flush()
+        if output == "json":
+            stream.write("]\n" if first else "\n]\n")
+    finally:
+        pages.close()
+
+
+def _render(value, stream, output="text"):
+    if isinstance(value, list):
+        value = _Pages(iter([value]))
+
+    if isinstance(value, _Pages):
+        _render_pages(value, stream, output)
+        return
+
+    if value.get("type") == "account-summary":
+        _render_summary(value["summary"], stream, output)
+        return
+
+    if output != "text":
+        document = {key: item for key, item in value.items() if key != "type"}
+        stream.write(_json_dumps(document) + "\n")
+        return
+
+    if value.get("type") == "details":
         formatted = _format_details(value["details"])
         if formatted:
             stream.write(formatted + "\n")
         return
 
-    if isinstance(value, list):
-        for item in value:
-            stream.write(_text_item(item) + "\n")
+    if value.get("type") == "cache-stats":
+        for event, endpoints in sorted(value["stats"].items()):
+            for endpoint, count in sorted(endpoints.items()):
+                stream.write(f"{event} {endpoint}: {count}\n")
         return
 
-    stream.write(value["branch"] + "\n")
-    hours = value["hours"]
+    if value.get("type") == "crawl":
+        for query in value["queries"]:
+            stream.write(
+                f"{query['query']}: {query['pages']} pages, {query['books']} books\n"
+            )
+        return
+
+    if value.get("type") == "all-hours":
+        for index, (branch, hours) in enumerate(value["branches"].items()):
+            if index:
+                stream.write("\n")
+            _render_hours(branch, hours, stream)
+        return
+
+    _render_hours(value["branch"], value["hours"], stream)
+
+
+def _render_summary(summary, stream, output):
+    sections = [
+        ("ready", "Ready for pickup", summary.ready),
+        ("due_soon", "Due soon", summary.dueSoon),
+        ("holds", "On hold", summary.holds),
+        ("checkouts", "Checked out", summary.checkouts),
+    ]
+
+    if output != "text":
+        document = {
+            key: [_json_item(book) for book in books] for key, _, books in sections
+        }
+        stream.write(_json_dumps(document) + "\n")
+        return
+
+    for index, (_, heading, books) in enumerate(sections):
+        if index:
+            stream.write("\n")
+        stream.write(f"{heading} ({len(books)}):\n")
+        for book in books:
+            stream.write("  " + _text_item(book) + "\n")
+
+
+def _render_hours(branch, hours, stream):
+    stream.write(branch + "\n")
     for day in WEEKDAYS:
         if day in hours:
             stream.write(f"{day}: {hours[day]}\n")
@@ -364,6 +875,7 @@ EXPECTED_ERRORS = (
     exceptions.MissingScriptError,
     exceptions.NoBranchFound,
     exceptions.NotLoggedIn,
+    exceptions.RenewError,
 )
 
 
@@ -371,6 +883,20 @@ def _error_message(exc):
     return str(exc) or exc.__class__.__name__
 
 
+def _discard_output(stream):
+    # The reader went away; point the stream at devnull so the interpreter's
+    # final flush doesn't raise BrokenPipeError again on the way out.
+    try:
+        fileno = stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, fileno)
+    finally:
+        os.close(devnull)
+
+
 def main(argv=None, stdout=None, stderr=None, environ=None, input_stream=None):
     """Run the CLI and return its process exit status."""
     stdout = stdout or sys.stdout
@@ -378,10 +904,15 @@ def main(argv=None, stdout=None, stderr=None, environ=None, input_stream=None):
     environ = os.environ if environ is None else environ
     input_stream = input_stream or sys.stdin
     args = build_parser().parse_args(argv)
+    args.client = None
+    args.failed = False
+    tracer = trace.Tracer() if args.trace or args.trace_json else None
+    previous = trace.activate(tracer) if tracer is not None else None
 
     try:
+        args.client = _client(args, environ)
         result = args.handler(args, environ, input_stream)
-        _render(result, stdout)
+        _render(result, stdout, args.output)
     except CLIError as exc:
         stderr.write(f"sfpl: error: {exc}\n")
         return 2
@@ -392,8 +923,25 @@ def main(argv=None, stdout=None, stderr=None, environ=None, input_stream=None):
         stderr.write(f"sfpl: error: network request failed: {exc}\n")
         return 1
     except BrokenPipeError:
+        _discard_output(stdout)
         return 0
-    return 0
+    finally:
+        if args.client is not None:
+            args.client.close()
+        if tracer is not None:
+            trace.activate(previous)
+            _report_trace(tracer, args, stderr)
+    return 1 if args.failed else 0
+
+
+def _report_trace(tracer, args, stderr):
+    if args.trace:
+        stderr.write(tracer.format_table())
+    if args.trace_json:
+        try:
+            tracer.write_chrome_trace(args.trace_json)
+        except OSError as exc:
+            stderr.write(f"sfpl: error: cannot write trace {args.trace_json}: {exc}\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,291 @@
+"""The HTTP client shared by the classes in :mod:`sfpl.sfpl`."""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import exceptions, trace
+from .cassette import CassetteAdapter
+
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class Client:
+    """An HTTP client that owns a pool of keep-alive connections.
+
+    Every request made by the sfpl classes goes through a Client, so pages
+    fetched one after another reuse the same TCP and TLS connections instead
+    of opening a new one each time.
+
+    Attributes:
+        session (requests.Session): The session anonymous requests are sent with.
+        adapter (requests.adapters.HTTPAdapter): The connection pool shared by
+            every session the client creates.
+        timeout (float or tuple): Default timeout for each request, in seconds.
+        hosts (dict): Maps host names to the base URL their requests are sent to instead.
+        cache (ResponseCache): The cache anonymous GET requests are served from, if any.
+        memo (Memo): The in-memory cache of parsed results, if any.
+        cassette (Cassette): The cassette requests are recorded to or replayed
+            from, if any.
+        rate_limiter (RateLimiter): Paces the requests sent to each host, if any.
+        retry (RetryPolicy): When failed requests are sent again, if ever.
+        breaker (CircuitBreaker): Fails fast for hosts that keep failing, if any.
+    """
+
+    def __init__(
+        self,
+        pool_size=10,
+        timeout=30,
+        headers=None,
+        hosts=None,
+        cache=None,
+        memo=None,
+        cassette=None,
+        rate_limiter=None,
+        retry=None,
+        breaker=None,
+    ):
+        """
+        Args:
+            pool_size (int, optional): Maximum number of connections kept open per host.
+            timeout (float or tuple, optional): Default timeout for each request, in seconds.
+            headers (dict, optional): Headers sent with every request.
+            hosts (dict, optional): Maps host names such as ``"sfpl.bibliocommons.com"``
+                to the base URL requests for them are sent to instead, e.g. a proxy or
+                a local test server.
+            cache (ResponseCache, optional): A cache for anonymous GET requests.
+                Requests sent with a session of their own, such as an account's,
+                are never cached.
+            memo (Memo, optional): An in-memory cache of book details, user IDs
+                and branch hours.
+            cassette (Cassette, optional): A cassette to record every request
+                and response to, or to replay them from instead of the network.
+            rate_limiter (RateLimiter, optional): Paces the requests sent to
+                each host. Share one limiter between clients to give them one
+                budget. Pages served from the cache don't count against it.
+            retry (RetryPolicy, optional): Sends idempotent requests again after
+                connection errors, timeouts and server errors.
+            breaker (CircuitBreaker, optional): Rejects requests to a host that
+                keeps failing, without sending them.
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.hosts = dict(hosts or {})
+        self.cache = cache
+        self.memo = memo
+        self.cassette = cassette
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.breaker = breaker
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        if cassette is not None:
+            self.adapter = CassetteAdapter(cassette, self.adapter)
+
+        self.session = self.new_session()
+
+    def new_session(self):
+        """Creates a session with its own cookies that shares the connection pool.
+
+        Returns:
+            requests.Session: The new session.
+        """
+        session = requests.Session()
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        session.headers.update(self.headers)
+        return session
+
+    def request(self, method, url, session=None, **kwargs):
+        """Sends a request.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to request.
+            session (requests.Session, optional): The session to send the request
+                with, for requests that need its cookies. Defaults to the client's
+                anonymous session.
+            **kwargs: Passed on to ``requests.Session.request``.
+
+        Returns:
+            requests.Response: The response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        if trace.active() is None:
+            return self._send(method, url, session, **kwargs)
+
+        method = method.upper()
+        with trace.span(
+            f"{method} {trace.url_template(url)}", "http", method=method, url=url
+        ) as span:
+            response = self._send(method, url, session, **kwargs)
+            if span is not None:
+                span.attributes.update(
+                    status=response.status_code,
+                    bytes=len(response.content),
+                    ttfb=response.elapsed.total_seconds(),
+                )
+            return response
+
+    def _send(self, method, url, session, **kwargs):
+        if self.cache is not None and session is None and method.upper() == "GET":
+            return self._cached_get(url, **kwargs)
+
+        return self._network(method, url, session or self.session, **kwargs)
+
+    def _network(self, method, url, session, **kwargs):
+        if self.retry is None and self.breaker is None:
+            return self._attempt(method, url, session, **kwargs)
+
+        attempt = 0
+        while True:
+            attempt += 1
+
+            if self.breaker is not None:
+                self.breaker.before(url)
+
+            try:
+                response = self._attempt(method, url, session, **kwargs)
+            except requests.RequestException as exc:
+                # Only connection errors and timeouts say the host is unwell;
+                # a cassette miss or an invalid URL never reached it.
+                transient = isinstance(exc, RETRY_ERRORS) and not isinstance(
+                    exc, exceptions.UnrecordedRequest
+                )
+                if self.breaker is not None:
+                    if transient:
+                        self.breaker.failure(url)
+                    else:
+                        self.breaker.cancel(url)
+                if not (
+                    transient
+                    and self.retry is not None
+                    and self.retry.retries(method, url, attempt)
+                ):
+                    raise
+                self._backoff(url, self.retry.delay(attempt))
+                continue
+
+            if self.breaker is not None:
+                self.breaker.observe(url, response.status_code)
+
+            if self.retry is None or not self.retry.retries(
+                method, url, attempt, response.status_code
+            ):
+                return response
+
+            response.close()
+            self._backoff(url, self.retry.delay(attempt, response))
+
+    def _attempt(self, method, url, session, **kwargs):
+        if self.rate_limiter is None:
+            return session.request(method, _rewrite_url(url, self.hosts), **kwargs)
+
+        with trace.span("rate limit", "wait", url=url):
+            self.rate_limiter.acquire(url)
+        response = session.request(method, _rewrite_url(url, self.hosts), **kwargs)
+        self.rate_limiter.observe(url, response)
+        return response
+
+    @staticmethod
+    def _backoff(url, seconds):
+        with trace.span("retry backoff", "wait", url=url):
+            time.sleep(seconds)
+
+    def _cached_get(self, url, params=None, headers=None, **kwargs):
+        if params:
+            url = requests.Request("GET", url, params=params).prepare().url
+
+        if not self.cache.ttl(url):
+            return self._network("GET", url, self.session, headers=headers, **kwargs)
+
+        entry = self.cache.get(url)
+
+        if entry is not None and entry.fresh:
+            self.cache.record(url, "hit")
+            return entry.response()
+
+        if entry is not None:
+            headers = {**entry.validators(), **(headers or {})}
+
+        response = self._network("GET", url, self.session, headers=headers, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            self.cache.record(url, "revalidated")
+            self.cache.refresh(entry)
+            return entry.response()
+
+        self.cache.record(url, "miss")
+        self.cache.store(url, response)
+        return response
+
+    def get(self, url, session=None, **kwargs):
+        return self.request("GET", url, session=session, **kwargs)
+
+    def post(self, url, session=None, **kwargs):
+        return self.request("POST", url, session=session, **kwargs)
+
+    def put(self, url, session=None, **kwargs):
+        return self.request("PUT", url, session=session, **kwargs)
+
+    def close(self):
+        """Closes every pooled connection, saves the cassette being recorded and
+        closes the cache, if any."""
+        self.adapter.close()
+
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _rewrite_url(url, hosts):
+    if not hosts:
+        return url
+
+    parts = urlsplit(url)
+    base = hosts.get(parts.netloc)
+
+    if base is None:
+        return url
+
+    return base.rstrip("/") + url[len(f"{parts.scheme}://{parts.netloc}") :]
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """Gets the process-wide client used when a class isn't given one.
+
+    Returns:
+        Client: The shared client.
+    """
+    global _default_client
+
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = Client()
+        return _default_client
+
+
+def set_default_client(client):
+    """Replaces the process-wide client.
+
+    Args:
+        client (Client): The client to share, or None to create a new one on next use.
+    """
+    global _default_client
+
+    with _default_client_lock:
+        _default_client = client
@@ -0,0 +1,364 @@
+"""A resumable crawler that mirrors search results into SQLite.
+
+A :class:`Crawler` pages through a set of searches and upserts every book it
+finds, by ID, into a :class:`CatalogStore`. Each page's books and the
+search's progress are written in the same transaction, so a crawl that stops
+part of the way through, whether from an error or an interrupt, resumes at
+the page after the last one stored.
+"""
+
+import itertools
+import json
+import sqlite3
+import time
+
+from .extract import extract_result_count
+from .sfpl import Book, Search, _extract_data, _iter_pages, _last_page
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    subtitle TEXT,
+    author TEXT,
+    bib TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS progress (
+    query TEXT PRIMARY KEY,
+    page INTEGER NOT NULL,
+    last_page INTEGER,
+    done INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_UPSERT = """
+INSERT INTO books VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    title = excluded.title,
+    subtitle = excluded.subtitle,
+    author = excluded.author,
+    bib = excluded.bib,
+    updated_at = excluded.updated_at
+"""
+
+
+def query_key(search):
+    """Gets the key a search's progress is stored under.
+
+    Args:
+        search (Search or AdvancedSearch): The search.
+
+    Returns:
+        str: The URL of the search's first page, which includes every filter.
+    """
+    return search._pageUrl(1)
+
+
+def sweep(
+    term, _type="keyword", formats=(None,), sorts=(None,), on_order=(None,), client=None
+):
+    """Builds a search for every combination of facets.
+
+    The catalog only pages through so many results of one search, so a large
+    part of it is crawled by splitting a search by format and the like.
+
+    Args:
+        term (str): Search term.
+        _type (str, optional): The type of search.
+        formats (iterable, optional): Format filters, None meaning any format.
+        sorts (iterable, optional): Sort orders, None meaning the default.
+        on_order (iterable, optional): On-order filters, None meaning either.
+        client (Client, optional): The client to send requests with.
+
+    Returns:
+        list: The searches.
+    """
+    return [
+        Search(
+            term,
+            _type=_type,
+            format=format,
+            sort=sort,
+            on_order=ordered,
+            client=client,
+        )
+        for format, sort, ordered in itertools.product(formats, sorts, on_order)
+    ]
+
+
+class CatalogStore:
+    """Books and crawl progress stored in an SQLite database.
+
+    Attributes:
+        path (str): The database file.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The database file, created if it doesn't exist.
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def upsert(self, bibs):
+        """Inserts or updates books from bib records, without committing.
+
+        Args:
+            bibs (dict): Maps metadata IDs to bib records, as in ``entities.bibs``.
+
+        Returns:
+            int: The number of books written.
+        """
+        now = time.time()
+        rows = []
+
+        for metadata_id, bib in bibs.items():
+            info = bib["briefInfo"]
+            authors = info["authors"]
+            rows.append(
+                (
+                    int(Book.metaDataIdToId(metadata_id)),
+                    info["title"],
+                    info["subtitle"],
+                    authors[0] if authors else None,
+                    json.dumps(bib, separators=(",", ":")),
+                    now,
+                )
+            )
+
+        self._connection.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def checkpoint(self, query, page, last_page, done=False):
+        """Records a search's progress, without committing.
+
+        Args:
+            query (str): The search's key.
+            page (int): The last page stored.
+            last_page (int): The search's last page, if known.
+            done (bool, optional): Whether every page has been stored.
+        """
+        self._connection.execute(
+            "INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?, ?)",
+            (query, page, last_page, int(done), time.time()),
+        )
+
+    def commit(self):
+        """Commits the books and progress written since the last commit."""
+        self._connection.commit()
+
+    def progress(self, query=None):
+        """Gets crawl progress.
+
+        Args:
+            query (str, optional): Only get this search's progress.
+
+        Returns:
+            dict: Maps each search's key to a dictionary of its last stored
+                ``page``, its ``last_page`` and whether it is ``done``.
+        """
+        sql = "SELECT query, page, last_page, done FROM progress"
+        parameters = ()
+
+        if query is not None:
+            sql += " WHERE query = ?"
+            parameters = (query,)
+
+        return {
+            key: {"page": page, "last_page": last_page, "done": bool(done)}
+            for key, page, last_page, done in self._connection.execute(sql, parameters)
+        }
+
+    def get_book(self, _id, client=None):
+        """Looks up a stored book.
+
+        Args:
+            _id (str): The book's ID.
+            client (Client, optional): The client the book sends requests with.
+
+        Returns:
+            Book: The book, or None if it hasn't been stored.
+        """
+        row = self._connection.execute(
+            "SELECT id, title, subtitle, author FROM books WHERE id = ?", (int(_id),)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return Book(
+            dict(zip(("_id", "title", "subtitle", "author"), (str(row[0]), *row[1:]))),
+            client=client,
+        )
+
+    def bibs(self, since=None):
+        """Yields stored bib records in ID order.
+
+        Args:
+            since (float, optional): Only yield records written at or after
+                this Unix timestamp.
+
+        Yields:
+            tuple: Each book's ID and bib record.
+        """
+        sql = "SELECT id, bib FROM books"
+        parameters = ()
+
+        if since is not None:
+            sql += " WHERE updated_at >= ?"
+            parameters = (since,)
+
+        for _id, bib in self._connection.execute(sql + " ORDER BY id", parameters):
+            yield str(_id), json.loads(bib)
+
+    def __len__(self):
+        return self._connection.execute("SELECT count(*) FROM books").fetchone()[0]
+
+    def close(self):
+        """Commits and closes the database."""
+        self._connection.commit()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Crawler:
+    """Mirrors the results of searches into a CatalogStore.
+
+    Attributes:
+        store (CatalogStore): Where books and progress are written.
+        concurrency (int): Number of pages of a search fetched at once.
+        batch_size (int): Number of pages written per transaction.
+        index (LocalIndex): The index updated with each page, if any.
+    """
+
+    def __init__(self, store, concurrency=4, batch_size=10, index=None):
+        """
+        Args:
+            store (CatalogStore or str): The store, or the path of its database file.
+            concurrency (int, optional): Number of pages of a search fetched at once.
+            batch_size (int, optional): Number of pages written per transaction.
+            index (LocalIndex, optional): An index of the same store to update
+                with each page as it is stored.
+        """
+        self.store = store if isinstance(store, CatalogStore) else CatalogStore(store)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.index = index
+
+    def crawl(self, searches, refresh=False):
+        """Crawls every page of each search in turn, resuming earlier crawls.
+
+        Args:
+            searches (iterable): Search or AdvancedSearch objects for books.
+            refresh (bool, optional): Whether to crawl searches that were
+                finished before from their first page again.
+
+        Returns:
+            list: For each search, a dictionary of its ``query`` key, the
+                ``pages`` and ``books`` stored by this call, its last stored
+                ``page``, its ``last_page`` and whether it is ``done``.
+
+        Raises:
+            ValueError: If a search is for lists.
+        """
+        searches = list(searches)
+
+        for search in searches:
+            if getattr(search, "_type", None) == "list":
+                raise ValueError("only book searches can be crawled")
+
+        return [self.crawl_one(search, refresh=refresh) for search in searches]
+
+    def crawl_one(self, search, refresh=False):
+        """Crawls every page of a search, resuming an earlier crawl of it.
+
+        Args:
+            search (Search or AdvancedSearch): A search for books.
+            refresh (bool, optional): Whether to crawl the search from its
+                first page again if it was finished before.
+
+        Returns:
+            dict: The search's progress, as returned by :meth:`crawl`.
+        """
+        query = query_key(search)
+        saved = self.store.progress(query).get(query)
+        page, last_page, done = 0, None, False
+
+        if saved and not (refresh and saved["done"]):
+            page, last_page, done = saved["page"], saved["last_page"], saved["done"]
+
+        result = {"query": query, "pages": 0, "books": 0}
+
+        if not done:
+            client = search.client
+            start = page + 1
+            # The last page according to the first page fetched, which is all
+            # there is to go on when it has no results to yield.
+            reported = {}
+
+            def get_page(number):
+                response = client.get(search._pageUrl(number))
+                # An error page has no result count, which would otherwise
+                # look like the end of the results and finish the crawl.
+                response.raise_for_status()
+                response_text = response.text
+                total = extract_result_count(response_text)
+
+                if total is None:
+                    return None, (None, {})
+
+                last = _last_page(total, 10)
+                if number == start:
+                    reported["last_page"] = last
+                return last, (last, _extract_data(response_text)["entities"]["bibs"])
+
+            pages = _iter_pages(get_page, "all", start, self.concurrency)
+
+            try:
+                for number, (last_page, bibs) in enumerate(pages, page + 1):
+                    page = number
+                    result["books"] += self.store.upsert(bibs)
+                    if self.index is not None:
+                        self.index.add(
+                            (Book.metaDataIdToId(metadata_id), bib)
+                            for metadata_id, bib in bibs.items()
+                        )
+                    result["pages"] += 1
+                    self.store.checkpoint(query, page, last_page)
+
+                    if result["pages"] % self.batch_size == 0:
+                        self.store.commit()
+
+                if not result["pages"]:
+                    last_page = reported.get("last_page", last_page)
+
+                # A page without a result count also ends the pages early, so
+                # the search is only done once its last page is stored.
+                if last_page is not None and page >= last_page:
+                    done = True
+                    self.store.checkpoint(query, page, last_page, done=True)
+            finally:
+                # Every page written so far was checkpointed with it, so it is
+                # safe to keep them even when the crawl stops with an error.
+                pages.close()
+                self.store.commit()
+
+        result.update(page=page, last_page=last_page, done=done)
+        return result
+
+    def close(self):
+        """Closes the store."""
+        self.store.close()
@@ -1,5 +1,7 @@
 """Custom exception classes raised by the sfpl module."""
 
+import requests
+
 
 class NotOnHold(Exception):
     """Raised when a user tries to cancel a hold on a book they aren't holding."""
@@ -76,3 +78,23 @@ class MissingScriptError(Exception):
 
 class NotLoggedIn(Exception):
     """Raised when an authentication token is rejected."""
+
+
+class UnrecordedRequest(requests.ConnectionError):
+    """Raised when a cassette being replayed has no response for a request."""
+
+    def __init__(self, method, url):
+        requests.ConnectionError.__init__(
+            self, f"no recorded response for {method} {url}"
+        )
+
+
+class CircuitOpen(requests.ConnectionError):
+    """Raised instead of sending a request to a host that keeps failing."""
+
+    def __init__(self, host, retry_in):
+        requests.ConnectionError.__init__(
+            self, f"{host} is failing, not retrying for {retry_in:.0f}s"
+        )
+        self.host = host
+        self.retry_in = retry_in
@@ -0,0 +1,111 @@
+"""Fast extraction of the data embedded in BiblioCommons pages.
+
+BiblioCommons renders its pages server-side and ships the application state as
+a JSON "island": a ``<script type="application/json" data-iso-key="_0">`` tag.
+Building a full BeautifulSoup tree of a ~500 KB page just to read that one tag
+dominates the cost of parsing holds, checkouts, search and item pages, so the
+functions here slice the payload straight out of the response text and only
+fall back to BeautifulSoup when the page layout doesn't match what we expect.
+"""
+
+import json
+import re
+
+from bs4 import BeautifulSoup
+
+from . import exceptions, trace
+
+# Regex Patterns
+
+script_tag_regex = re.compile(r"<script\b([^>]*)>", re.IGNORECASE)
+script_end_regex = re.compile(r"</script\s*>", re.IGNORECASE)
+json_type_regex = re.compile(r"""(?:^|\s)type\s*=\s*["']application/json["']""")
+book_page_regex = r"[\d,]+ to [\d,]+ of ([\d,]+) results?"
+
+
+def _iso_key_regex(key):
+    return re.compile(rf"""(?:^|\s)data-iso-key\s*=\s*["']{re.escape(key)}["']""")
+
+
+def extract_json_island(response_text: str, key: str = "_0") -> str | None:
+    """Finds the raw text of a JSON island without parsing the page.
+
+    Args:
+        response_text (str): The HTML of the page.
+        key (str, optional): The island's ``data-iso-key``.
+
+    Returns:
+        str: The contents of the script tag, or None if it couldn't be found.
+    """
+    iso_key_regex = _iso_key_regex(key)
+
+    for tag in script_tag_regex.finditer(response_text):
+        attributes = tag.group(1)
+        if json_type_regex.search(attributes) and iso_key_regex.search(attributes):
+            end = script_end_regex.search(response_text, tag.end())
+            if not end:
+                return None
+            return response_text[tag.end() : end.start()]
+
+    return None
+
+
+def _soup_extract_data(response_text: str, key: str = "_0") -> dict:
+    with trace.span("soup"):
+        soup = BeautifulSoup(response_text, "lxml")
+    script_tag = soup.find("script", {"type": "application/json", "data-iso-key": key})
+    if not script_tag:
+        raise exceptions.MissingScriptError
+
+    with trace.span("json decode"):
+        return json.loads(script_tag.text)
+
+
+def extract_data(response_text: str, key: str = "_0") -> dict:
+    """Decodes the JSON island embedded in a page.
+
+    Args:
+        response_text (str): The HTML of the page.
+        key (str, optional): The island's ``data-iso-key``.
+
+    Returns:
+        dict: The decoded application state.
+
+    Raises:
+        MissingScriptError: If the page has no such island.
+    """
+    with trace.span("extract island"):
+        island = extract_json_island(response_text, key)
+
+    if island is not None:
+        try:
+            with trace.span("json decode"):
+                return json.loads(island)
+        except ValueError:
+            pass
+
+    return _soup_extract_data(response_text, key)
+
+
+def extract_result_count(response_text: str) -> int | None:
+    """Reads the total number of results from a search page.
+
+    Args:
+        response_text (str): The HTML of the search page.
+
+    Returns:
+        int: The total number of results, or None if the page doesn't say.
+    """
+    match = re.search(book_page_regex, response_text)
+
+    if not match:
+        with trace.span("soup"):
+            soup = BeautifulSoup(response_text, "lxml")
+        pages_element = soup.find(string=re.compile(book_page_regex))
+        if not pages_element:
+            return None
+        match = re.match(book_page_regex, pages_element)
+        if not match:
+            return None
+
+    return int(match.group(1).replace(",", ""))
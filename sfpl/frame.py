@@ -0,0 +1,363 @@
+"""A columnar container for book search results.
+
+A :class:`BookFrame` keeps book IDs in one contiguous 64-bit integer array
+and the title, author and subtitle columns dictionary-encoded: each distinct
+string is stored once, and each book holds a small integer code pointing at
+it. A frame is built straight from the ``entities.bibs`` JSON of a search
+page, so a crawl of thousands of books never creates a Python object per
+book. Frames export to NumPy and Arrow when those packages are installed
+(``pip install sfpl[numpy]`` or ``pip install sfpl[arrow]``).
+"""
+
+import itertools
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+STRING_COLUMNS = ("title", "author", "subtitle")
+
+
+class _Dictionary:
+    """Builds a dictionary-encoded string column."""
+
+    def __init__(self, categories=None):
+        self.categories = list(categories or [])
+        self.index = {value: code for code, value in enumerate(self.categories)}
+        self.codes = array("i")
+
+    def encode(self, value):
+        code = self.index.get(value)
+
+        if code is None:
+            code = self.index[value] = len(self.categories)
+            self.categories.append(value)
+
+        return code
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+
+class BookFrame:
+    """Book search results stored by column.
+
+    Attributes:
+        ids (array.array): Each book's SFPL ID, as 64-bit integers.
+        codes (dict): Maps each string column to an ``array.array`` of codes
+            into its categories.
+        categories (dict): Maps each string column to the list of distinct
+            values its codes refer to.
+    """
+
+    __slots__ = ("categories", "codes", "ids")
+
+    def __init__(self, ids=None, codes=None, categories=None):
+        """
+        Args:
+            ids (array.array, optional): Book IDs as 64-bit integers.
+            codes (dict, optional): Codes of each string column.
+            categories (dict, optional): Distinct values of each string column.
+        """
+        self.ids = ids if ids is not None else array("q")
+        self.codes = codes or {name: array("i") for name in STRING_COLUMNS}
+        self.categories = categories or {name: [] for name in STRING_COLUMNS}
+
+    @classmethod
+    def fromBibs(cls, bibs, all_authors=False):
+        """Builds a frame from the bib records of a page's JSON data.
+
+        Args:
+            bibs (dict): Maps metadata IDs to bib records, as in ``entities.bibs``.
+            all_authors (bool, optional): Whether the author is every author
+                joined with " & ", rather than just the first one.
+
+        Returns:
+            BookFrame: The frame.
+        """
+        from .sfpl import Book
+
+        ids = array("q")
+        columns = {name: _Dictionary() for name in STRING_COLUMNS}
+
+        for metadata_id, bib in bibs.items():
+            info = bib["briefInfo"]
+            authors = info["authors"]
+
+            if all_authors:
+                author = " & ".join(authors)
+            else:
+                author = authors[0] if authors else None
+
+            ids.append(int(Book.metaDataIdToId(metadata_id)))
+            columns["title"].append(info["title"])
+            columns["author"].append(author)
+            columns["subtitle"].append(info["subtitle"])
+
+        return cls._fromColumns(ids, columns)
+
+    @classmethod
+    def fromBooks(cls, books):
+        """Builds a frame from Book objects.
+
+        Args:
+            books (iterable): The books.
+
+        Returns:
+            BookFrame: The frame.
+        """
+        ids = array("q")
+        columns = {name: _Dictionary() for name in STRING_COLUMNS}
+
+        for book in books:
+            ids.append(int(book._id))
+            for name in STRING_COLUMNS:
+                columns[name].append(getattr(book, name))
+
+        return cls._fromColumns(ids, columns)
+
+    @classmethod
+    def concat(cls, frames):
+        """Joins frames end to end.
+
+        Args:
+            frames (iterable): The frames to join, in order.
+
+        Returns:
+            BookFrame: The joined frame.
+        """
+        ids = array("q")
+        columns = {name: _Dictionary() for name in STRING_COLUMNS}
+
+        for frame in frames:
+            ids.extend(frame.ids)
+
+            for name, column in columns.items():
+                # Re-encode each distinct value once, then map codes in bulk.
+                remap = [column.encode(value) for value in frame.categories[name]]
+                column.codes.extend(map(remap.__getitem__, frame.codes[name]))
+
+        return cls._fromColumns(ids, columns)
+
+    @classmethod
+    def _fromColumns(cls, ids, columns):
+        return cls(
+            ids,
+            {name: column.codes for name, column in columns.items()},
+            {name: column.categories for name, column in columns.items()},
+        )
+
+    def column(self, name):
+        """Gets a column's values.
+
+        Args:
+            name (str): ``"id"``, ``"title"``, ``"author"`` or ``"subtitle"``.
+
+        Returns:
+            list: The values, one per book. IDs are strings, as on Book objects.
+        """
+        if name == "id":
+            return [str(_id) for _id in self.ids]
+
+        return list(map(self.categories[name].__getitem__, self.codes[name]))
+
+    def take(self, indices):
+        """Selects books by position.
+
+        Args:
+            indices (iterable): Positions of the books to keep, in the order wanted.
+
+        Returns:
+            BookFrame: A frame of the selected books sharing this frame's categories.
+        """
+        indices = list(indices)
+        return BookFrame(
+            array("q", map(self.ids.__getitem__, indices)),
+            {
+                name: array("i", map(codes.__getitem__, indices))
+                for name, codes in self.codes.items()
+            },
+            self.categories,
+        )
+
+    def filter(self, mask=None, **values):
+        """Selects the books that match.
+
+        String columns are compared by code, so each value is looked up once
+        rather than compared against every book.
+
+        Args:
+            mask (iterable, optional): A boolean for each book.
+            **values: Column names mapped to a value, or a collection of values,
+                that books must have, e.g. ``author="Rowling, J. K."``.
+
+        Returns:
+            BookFrame: The matching books.
+        """
+        keep = itertools.repeat(True) if mask is None else mask
+        selectors = [keep]
+
+        for name, wanted in values.items():
+            if isinstance(wanted, (str, int)) or wanted is None:
+                wanted = (wanted,)
+
+            if name == "id":
+                ids = {int(_id) for _id in wanted}
+                selectors.append(map(ids.__contains__, self.ids))
+                continue
+
+            index = {value: code for code, value in enumerate(self.categories[name])}
+            codes = {index[value] for value in wanted if value in index}
+            selectors.append(map(codes.__contains__, self.codes[name]))
+
+        return self.take(
+            index for index, *flags in zip(range(len(self)), *selectors) if all(flags)
+        )
+
+    def sortBy(self, name, reverse=False):
+        """Sorts the books by a column.
+
+        String columns are sorted by ranking their distinct values once and
+        then ordering the codes by rank. Missing values sort first.
+
+        Args:
+            name (str): The column to sort by.
+            reverse (bool, optional): Whether to sort in descending order.
+
+        Returns:
+            BookFrame: The sorted books.
+        """
+        if name == "id":
+            keys = self.ids
+        else:
+            categories = self.categories[name]
+            ranks = [0] * len(categories)
+            order = sorted(
+                range(len(categories)),
+                key=lambda code: (categories[code] is not None, categories[code] or ""),
+            )
+            for rank, code in enumerate(order):
+                ranks[code] = rank
+            keys = list(map(ranks.__getitem__, self.codes[name]))
+
+        return self.take(
+            sorted(range(len(self)), key=keys.__getitem__, reverse=reverse)
+        )
+
+    def unique(self):
+        """Drops repeated books, keeping the first of each ID.
+
+        Returns:
+            BookFrame: The distinct books.
+        """
+        seen = set()
+        return self.take(
+            index
+            for index, _id in enumerate(self.ids)
+            if not (_id in seen or seen.add(_id))
+        )
+
+    def rows(self):
+        """Yields each book as a dictionary.
+
+        Yields:
+            dict: The book's ``_id``, ``title``, ``author`` and ``subtitle``.
+        """
+        columns = [self.column(name) for name in STRING_COLUMNS]
+
+        for _id, *values in zip(self.ids, *columns):
+            yield {"_id": str(_id), **dict(zip(STRING_COLUMNS, values))}
+
+    def toBooks(self, client=None, book_class=None):
+        """Yields a Book object for each book.
+
+        Args:
+            client (Client, optional): The client the books send requests with.
+            book_class (type, optional): The class to create. Defaults to Book.
+
+        Yields:
+            Book: Each book, in order.
+        """
+        from .sfpl import Book
+
+        book_class = book_class or Book
+
+        for row in self.rows():
+            yield book_class(row, client=client)
+
+    def toNumpy(self):
+        """Exports the frame as NumPy arrays.
+
+        Returns:
+            dict: Maps ``"id"`` to an int64 array that shares this frame's
+                memory, and each string column to an object array of its values.
+
+        Raises:
+            ImportError: If NumPy isn't installed.
+        """
+        if numpy is None:
+            raise ImportError(
+                "BookFrame.toNumpy requires numpy: pip install sfpl[numpy]"
+            )
+
+        result = {"id": numpy.frombuffer(self.ids, dtype=numpy.int64)}
+
+        for name in STRING_COLUMNS:
+            categories = numpy.empty(len(self.categories[name]), dtype=object)
+            categories[:] = self.categories[name]
+            codes = numpy.frombuffer(
+                self.codes[name], dtype=f"i{self.codes[name].itemsize}"
+            )
+            result[name] = categories[codes]
+
+        return result
+
+    def toArrow(self):
+        """Exports the frame as an Arrow table.
+
+        The ID column and the dictionary indices of the string columns share
+        this frame's memory rather than being copied.
+
+        Returns:
+            pyarrow.Table: A table with an int64 ``id`` column and
+                dictionary-encoded ``title``, ``author`` and ``subtitle`` columns.
+
+        Raises:
+            ImportError: If pyarrow isn't installed.
+        """
+        if pyarrow is None:
+            raise ImportError(
+                "BookFrame.toArrow requires pyarrow: pip install sfpl[arrow]"
+            )
+
+        columns = {
+            "id": pyarrow.Array.from_buffers(
+                pyarrow.int64(), len(self), [None, pyarrow.py_buffer(self.ids)]
+            )
+        }
+
+        for name in STRING_COLUMNS:
+            codes = self.codes[name]
+            indices = pyarrow.Array.from_buffers(
+                pyarrow.int32() if codes.itemsize == 4 else pyarrow.int64(),
+                len(codes),
+                [None, pyarrow.py_buffer(codes)],
+            )
+            columns[name] = pyarrow.DictionaryArray.from_arrays(
+                indices, pyarrow.array(self.categories[name], type=pyarrow.string())
+            )
+
+        return pyarrow.table(columns)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"<BookFrame: {len(self)} books>"
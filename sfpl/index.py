@@ -0,0 +1,272 @@
+"""An inverted index for searching a mirrored catalog offline.
+
+A :class:`LocalIndex` is kept in the same SQLite database as a
+:class:`~sfpl.crawl.CatalogStore`. For each word of each book's title,
+subtitle, authors and ID it stores the books the word appears in, so a search
+looks up one short run of postings per word instead of reading every book.
+Searches return the same :class:`~sfpl.sfpl.Book` objects, a page at a time,
+as :meth:`Search.getResults <sfpl.sfpl.Search.getResults>`.
+"""
+
+import json
+import re
+import time
+import unicodedata
+
+from . import exceptions
+from .client import get_default_client
+from .crawl import CatalogStore
+from .sfpl import Book, _iter_pages, _last_page
+
+# Fields each search type matches.
+SEARCH_FIELDS = {
+    "keyword": ("title", "subtitle", "author", "id"),
+    "title": ("title", "subtitle"),
+    "author": ("author",),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    field TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (token, field, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_id ON postings (id);
+CREATE TABLE IF NOT EXISTS indexed (
+    id INTEGER PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+"""
+
+word_regex = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Splits text into lowercase words without accents.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The words, in order.
+    """
+    if not text:
+        return []
+
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return word_regex.findall(stripped)
+
+
+def _postings(_id, bib):
+    info = bib["briefInfo"]
+    fields = {
+        "title": [info.get("title")],
+        "subtitle": [info.get("subtitle")],
+        "author": info.get("authors") or [],
+        "id": [_id],
+    }
+
+    for field, values in fields.items():
+        for token in {token for value in values for token in tokenize(value)}:
+            yield token, field, int(_id)
+
+
+class LocalIndex:
+    """An inverted index over the books in a CatalogStore.
+
+    Attributes:
+        store (CatalogStore): The store whose books are indexed.
+        client (Client): The client that books from searches send requests with.
+    """
+
+    def __init__(self, store, client=None):
+        """
+        Args:
+            store (CatalogStore or str): The store, or the path of its database file.
+            client (Client, optional): The client that books from searches send
+                requests with. Defaults to the shared client.
+        """
+        self.store = store if isinstance(store, CatalogStore) else CatalogStore(store)
+        self.client = client or get_default_client()
+        self._connection = self.store._connection
+
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def add(self, records):
+        """Indexes bib records, replacing any earlier entries for them, without committing.
+
+        Args:
+            records (iterable): Each book's ID and bib record.
+
+        Returns:
+            int: The number of records indexed.
+        """
+        now = time.time()
+        count = 0
+
+        for _id, bib in records:
+            self._connection.execute("DELETE FROM postings WHERE id = ?", (int(_id),))
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO postings VALUES (?, ?, ?)", _postings(_id, bib)
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO indexed VALUES (?, ?)", (int(_id), now)
+            )
+            count += 1
+
+        return count
+
+    def update(self):
+        """Indexes the stored books that are new or changed since they were last indexed.
+
+        Returns:
+            int: The number of books indexed.
+        """
+        rows = self._connection.execute(
+            "SELECT books.id, books.bib FROM books"
+            " LEFT JOIN indexed ON indexed.id = books.id"
+            " WHERE indexed.id IS NULL OR indexed.updated_at < books.updated_at"
+        ).fetchall()
+
+        with self._connection:
+            return self.add((str(_id), json.loads(bib)) for _id, bib in rows)
+
+    def search(self, term, _type="keyword"):
+        """Creates a search of the index.
+
+        Args:
+            term (str): Search term. Books must match every word of it.
+            _type (str, optional): ``"keyword"``, ``"title"`` or ``"author"``.
+
+        Returns:
+            LocalSearch: The search.
+
+        Raises:
+            InvalidSearchType: If the search type is not valid.
+        """
+        return LocalSearch(self, term, _type=_type)
+
+    def close(self):
+        """Closes the store."""
+        self.store.close()
+
+    def __len__(self):
+        return self._connection.execute("SELECT count(*) FROM indexed").fetchone()[0]
+
+
+class LocalSearch:
+    """A search of a LocalIndex, answered without sending any requests.
+
+    Attributes:
+        index (LocalIndex): The index searched.
+        term (str): Search term.
+        _type (str): The type of search.
+    """
+
+    def __init__(self, index, term, _type="keyword"):
+        """
+        Args:
+            index (LocalIndex): The index to search.
+            term (str): Search term. Books must match every word of it.
+            _type (str, optional): ``"keyword"``, ``"title"`` or ``"author"``.
+
+        Raises:
+            InvalidSearchType: If the search type is not valid.
+        """
+        if _type.lower() not in SEARCH_FIELDS:
+            raise exceptions.InvalidSearchType(_type.lower())
+
+        self.index = index
+        self.term = term
+        self._type = _type.lower()
+
+    def _matches(self):
+        tokens = sorted(set(tokenize(self.term)))
+
+        if not tokens:
+            return None, ()
+
+        fields = SEARCH_FIELDS[self._type]
+        select = "SELECT id FROM postings WHERE token = ? AND field IN ({})".format(
+            ", ".join("?" * len(fields))
+        )
+        sql = " INTERSECT ".join([select] * len(tokens))
+        parameters = [value for token in tokens for value in (token, *fields)]
+        return sql, parameters
+
+    def count(self):
+        """Counts the matching books.
+
+        Returns:
+            int: The number of books that match.
+        """
+        sql, parameters = self._matches()
+
+        if sql is None:
+            return 0
+
+        return self.index._connection.execute(
+            f"SELECT count(*) FROM ({sql})", parameters
+        ).fetchone()[0]
+
+    def getResults(self, pages=1, start_page=1, concurrency=1):
+        """Gets the matching books, ten to a page, ordered by title.
+
+        Args:
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from.
+            concurrency(int): Accepted for compatibility with Search.getResults;
+                pages are read from the database one at a time.
+
+        Yields:
+            list: A list of books on the page.
+        """
+        del concurrency
+        last_page = None
+
+        def get_page(page):
+            nonlocal last_page
+
+            # Counting intersects every posting list, so it's done once for
+            # all the pages of the search.
+            if last_page is None:
+                last_page = _last_page(self.count(), 10)
+
+            return last_page, self._getPage(page)
+
+        return _iter_pages(get_page, pages, start_page, 1)
+
+    def _getPage(self, page):
+        sql, parameters = self._matches()
+
+        if sql is None:
+            return []
+
+        rows = self.index._connection.execute(
+            "SELECT id, title, subtitle, author FROM books"
+            f" WHERE id IN ({sql})"
+            " ORDER BY title COLLATE NOCASE, id LIMIT 10 OFFSET ?",
+            (*parameters, (page - 1) * 10),
+        ).fetchall()
+
+        return [
+            Book(
+                {
+                    "_id": str(_id),
+                    "title": title,
+                    "subtitle": subtitle,
+                    "author": author,
+                },
+                client=self.index.client,
+            )
+            for _id, title, subtitle, author in rows
+        ]
+
+    def __str__(self):
+        return f"Local Search Type: {self._type} Search Term {self.term}"
+
+    def __repr__(self):
+        return f"Local Search Type: {self._type} Search Term {self.term}"
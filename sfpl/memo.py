@@ -0,0 +1,199 @@
+"""Bounded, in-process memoization of parsed results.
+
+A :class:`Client` given a :class:`Memo` remembers book details by book ID,
+user IDs by user name and branch hours by branch ID, so a long-running
+process that asks for the same ones again skips the request and the parse.
+Each kind of result is held in a :class:`MemoCache` with its own size and
+time to live.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class MemoCache:
+    """A thread-safe mapping with least-recently-used eviction and expiry.
+
+    Values are returned as stored, not copied, so they shouldn't be modified.
+
+    Attributes:
+        maxsize (int): Maximum number of entries kept.
+        ttl (float): How long an entry is kept, in seconds, or None to keep it
+            until it is evicted.
+        hits (int): Number of lookups that found a live entry.
+        misses (int): Number of lookups that didn't.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        Args:
+            maxsize (int, optional): Maximum number of entries kept.
+            ttl (float, optional): How long an entry is kept, in seconds.
+                Defaults to keeping it until it is evicted.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Looks up an entry, marking it as recently used.
+
+        Args:
+            key: The entry's key.
+            default (optional): Returned if there is no live entry.
+
+        Returns:
+            The entry's value, or ``default``.
+        """
+        with self._lock:
+            value = self._get(key)
+
+            if value is _MISSING:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            return value
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return _MISSING
+
+        value, expires_at = entry
+
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            return _MISSING
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """Stores an entry, evicting the least recently used ones if the cache is full.
+
+        Args:
+            key: The entry's key.
+            value: The entry's value.
+        """
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Looks up an entry, computing and storing it if there is no live one.
+
+        Concurrent misses for one key may each compute the value; the last to
+        finish is kept.
+
+        Args:
+            key: The entry's key.
+            compute (callable): Takes no arguments and returns the value.
+                Exceptions it raises propagate and nothing is stored.
+
+        Returns:
+            The entry's value.
+        """
+        with self._lock:
+            value = self._get(key)
+
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+
+            self.misses += 1
+
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Removes an entry, if there is one.
+
+        Args:
+            key: The entry's key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """float: The fraction of lookups that were hits, or 0.0 before any lookups."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._get(key) is not _MISSING
+
+
+class Memo:
+    """The memoized results of a client.
+
+    Attributes:
+        details (MemoCache): Book details by book ID.
+        users (MemoCache): User IDs by user name.
+        hours (MemoCache): Branch hours by branch ID.
+    """
+
+    def __init__(self, details=None, users=None, hours=None):
+        """
+        Args:
+            details (MemoCache, optional): Defaults to 512 entries kept for an hour.
+            users (MemoCache, optional): Defaults to 1024 entries kept for a day.
+            hours (MemoCache, optional): Defaults to 64 entries kept for an hour.
+        """
+        # A MemoCache is falsy while empty, so test for None explicitly.
+        self.details = (
+            MemoCache(maxsize=512, ttl=60 * 60) if details is None else details
+        )
+        self.users = (
+            MemoCache(maxsize=1024, ttl=24 * 60 * 60) if users is None else users
+        )
+        self.hours = MemoCache(maxsize=64, ttl=60 * 60) if hours is None else hours
+
+    def clear(self):
+        """Clears every cache."""
+        for cache in self._caches().values():
+            cache.clear()
+
+    @property
+    def stats(self):
+        """dict: Hits, misses, hit rate and size of each cache."""
+        return {
+            name: {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_rate": cache.hit_rate,
+                "size": len(cache),
+            }
+            for name, cache in self._caches().items()
+        }
+
+    def _caches(self):
+        return {"details": self.details, "users": self.users, "hours": self.hours}
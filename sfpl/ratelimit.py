@@ -0,0 +1,220 @@
+"""Rate limiting of requests to the SFPL website.
+
+A :class:`RateLimiter` keeps a token bucket per host. Each request takes a
+token, and tokens come back at a steady rate up to a burst size, so callers
+on any number of threads or event loops share one budget. When the server
+answers 429 Too Many Requests or 503 Service Unavailable with a
+``Retry-After`` header, every caller for that host is paused until it
+expires.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+THROTTLED_STATUSES = frozenset((429, 503))
+
+
+def retry_after(headers):
+    """Gets how long a response asks clients to wait before trying again.
+
+    Args:
+        headers (Mapping): The response headers.
+
+    Returns:
+        float: The wait in seconds, or None if the response doesn't give one.
+    """
+    value = headers.get("Retry-After")
+
+    if value is None:
+        return None
+
+    value = value.strip()
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+
+    return max(0.0, (when - datetime.now(UTC)).total_seconds())
+
+
+class _Bucket:
+    __slots__ = ("burst", "paused_until", "rate", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.paused_until = 0.0
+
+
+class RateLimiter:
+    """A token bucket per host, shared by every thread and event loop.
+
+    Pass the same limiter to several clients, including an
+    :class:`sfpl.aio.AsyncClient`, to give all of them one budget.
+
+    Attributes:
+        rate (float): Requests per second allowed to each host by default.
+        burst (int): Requests each host may receive at once after being idle.
+        hosts (dict): Maps host names to their own ``(rate, burst)``.
+    """
+
+    def __init__(self, rate=5.0, burst=10, hosts=None):
+        """
+        Args:
+            rate (float, optional): Requests per second allowed to each host.
+            burst (int, optional): Requests each host may receive at once after
+                being idle.
+            hosts (dict, optional): Maps host names such as
+                ``"sfpl.bibliocommons.com"`` to their own ``(rate, burst)``.
+
+        Raises:
+            ValueError: If a rate isn't positive or a burst is less than 1.
+        """
+        for host_rate, host_burst in [(rate, burst), *(hosts or {}).values()]:
+            if host_rate <= 0 or host_burst < 1:
+                raise ValueError("rate must be positive and burst at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self.hosts = dict(hosts or {})
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._stats = {}
+
+    def _reserve(self, host):
+        # Takes a token, going into debt if there are none left, and returns
+        # how long the caller must wait for it. Debt makes later callers wait
+        # their turn, so waiting never happens while the lock is held.
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            bucket.tokens = min(
+                bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate
+            )
+            bucket.updated = now
+            bucket.tokens -= 1
+
+            ready = now
+            if bucket.tokens < 0:
+                ready = now - bucket.tokens / bucket.rate
+
+            delay = max(ready, bucket.paused_until) - now
+            stats = self._host_stats(host)
+            stats["requests"] += 1
+            stats["waited"] += delay
+            return delay
+
+    def _bucket(self, host, now):
+        bucket = self._buckets.get(host)
+
+        if bucket is None:
+            rate, burst = self.hosts.get(host, (self.rate, self.burst))
+            bucket = self._buckets[host] = _Bucket(rate, burst, now)
+
+        return bucket
+
+    def _host_stats(self, host):
+        return self._stats.setdefault(
+            host, {"requests": 0, "waited": 0.0, "throttled": 0}
+        )
+
+    def acquire(self, url):
+        """Waits until a request may be sent.
+
+        Args:
+            url (str): The URL about to be requested.
+
+        Returns:
+            float: How long the caller waited, in seconds.
+        """
+        delay = self._reserve(urlsplit(url).netloc)
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return delay
+
+    async def acquire_async(self, url):
+        """Waits until a request may be sent, without blocking the event loop.
+
+        Args:
+            url (str): The URL about to be requested.
+
+        Returns:
+            float: How long the caller waited, in seconds.
+        """
+        delay = self._reserve(urlsplit(url).netloc)
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        return delay
+
+    def pause(self, url, seconds):
+        """Holds back every request to a host for a while.
+
+        Args:
+            url (str): A URL on the host.
+            seconds (float): How long to pause for.
+        """
+        host = urlsplit(url).netloc
+
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            bucket.paused_until = max(bucket.paused_until, now + seconds)
+
+    def observe(self, url, response):
+        """Pauses a host if a response says it is being throttled.
+
+        Args:
+            url (str): The URL that was requested.
+            response: The response, with ``status_code`` and ``headers``.
+
+        Returns:
+            float: How long the host was paused for, or None if it wasn't.
+        """
+        if response.status_code not in THROTTLED_STATUSES:
+            return None
+
+        with self._lock:
+            self._host_stats(urlsplit(url).netloc)["throttled"] += 1
+
+        seconds = retry_after(response.headers)
+
+        if seconds is not None:
+            self.pause(url, seconds)
+
+        return seconds
+
+    def stats(self):
+        """Gets how many requests were sent to each host and how long they waited.
+
+        Returns:
+            dict: Maps each host to its number of ``requests``, the total seconds
+                they ``waited``, and how many responses were ``throttled``.
+        """
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+    @property
+    def waited(self):
+        """float: The total time requests to every host have waited, in seconds."""
+        with self._lock:
+            return sum(stats["waited"] for stats in self._stats.values())
@@ -0,0 +1,304 @@
+"""Retrying failed requests and failing fast while the SFPL website is down.
+
+A :class:`RetryPolicy` decides whether a request that failed, or got a
+server error back, is sent again, and how long to back off first. Only
+idempotent methods are retried, so a hold or renewal is never placed twice.
+A :class:`CircuitBreaker` counts consecutive failures per host and, once a
+host has failed too often, rejects requests to it straight away with
+:class:`sfpl.exceptions.CircuitOpen` until a cool-down has passed.
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from . import exceptions
+from .ratelimit import retry_after
+
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+FAILURE_STATUSES = frozenset((500, 502, 503, 504))
+
+
+class RetryPolicy:
+    """When and how long to wait before sending a request again.
+
+    Each retry waits a random time between zero and an exponentially growing
+    backoff ("full jitter"), so clients that failed together don't retry
+    together. A ``Retry-After`` header longer than that is waited out instead.
+
+    Attributes:
+        attempts (int): The most times a request is sent, including the first.
+        backoff (float): The backoff before the first retry, in seconds. It
+            doubles with each retry.
+        max_backoff (float): The longest backoff, in seconds.
+        jitter (bool): Whether to wait a random part of the backoff.
+        methods (frozenset): The methods that are retried.
+        statuses (frozenset): The response statuses that are retried.
+    """
+
+    def __init__(
+        self,
+        attempts=3,
+        backoff=0.5,
+        max_backoff=30.0,
+        jitter=True,
+        methods=IDEMPOTENT_METHODS,
+        statuses=RETRY_STATUSES,
+    ):
+        """
+        Args:
+            attempts (int, optional): The most times a request is sent,
+                including the first.
+            backoff (float, optional): The backoff before the first retry, in
+                seconds.
+            max_backoff (float, optional): The longest backoff, in seconds.
+            jitter (bool, optional): Whether to wait a random part of the backoff.
+            methods (iterable, optional): The methods that are retried. Only add
+                methods that are safe to send twice.
+            statuses (iterable, optional): The response statuses that are retried.
+
+        Raises:
+            ValueError: If attempts is less than 1 or a backoff is negative.
+        """
+        if attempts < 1 or backoff < 0 or max_backoff < 0:
+            raise ValueError("attempts must be at least 1 and backoffs not negative")
+
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.methods = frozenset(method.upper() for method in methods)
+        self.statuses = frozenset(statuses)
+
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def retries(self, method, url, attempt, status=None):
+        """Gets whether a request is sent again, counting the outcome for
+        :meth:`stats`.
+
+        Args:
+            method (str): The request's method.
+            url (str): The requested URL.
+            attempt (int): How many times the request has been sent.
+            status (int, optional): The response status, or None if the request
+                failed without one.
+
+        Returns:
+            bool: Whether to retry.
+        """
+        if method.upper() not in self.methods:
+            return False
+        if status is not None and status not in self.statuses:
+            return False
+
+        retrying = attempt < self.attempts
+        host = urlsplit(url).netloc
+
+        with self._lock:
+            stats = self._stats.setdefault(host, {"retried": 0, "exhausted": 0})
+            stats["retried" if retrying else "exhausted"] += 1
+
+        return retrying
+
+    def delay(self, attempt, response=None):
+        """Gets how long to wait before a retry.
+
+        Args:
+            attempt (int): How many times the request has been sent.
+            response (optional): The response being retried, if any.
+
+        Returns:
+            float: The wait in seconds.
+        """
+        backoff = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+
+        if response is not None:
+            backoff = max(backoff, retry_after(response.headers) or 0.0)
+
+        return backoff
+
+    def stats(self):
+        """Gets how many requests to each host were retried or gave up.
+
+        Returns:
+            dict: Maps each host to its number of ``retried`` attempts and
+                ``exhausted`` requests.
+        """
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+
+class _Circuit:
+    __slots__ = ("failures", "opened_at", "probing", "rejected", "trips")
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.rejected = 0
+        self.trips = 0
+
+
+class CircuitBreaker:
+    """Fails fast for hosts that keep failing.
+
+    A host's circuit opens after ``threshold`` consecutive failures, i.e.
+    connection errors, timeouts or 5xx responses. While it is open, requests
+    to the host raise :class:`sfpl.exceptions.CircuitOpen` without being
+    sent. After ``reset`` seconds one request is let through as a probe: if
+    it succeeds the circuit closes, otherwise it opens again.
+
+    Attributes:
+        threshold (int): Consecutive failures that open a host's circuit.
+        reset (float): Seconds a circuit stays open before a probe is let through.
+    """
+
+    def __init__(self, threshold=5, reset=30.0):
+        """
+        Args:
+            threshold (int, optional): Consecutive failures that open a host's circuit.
+            reset (float, optional): Seconds a circuit stays open before a probe
+                is let through.
+
+        Raises:
+            ValueError: If threshold is less than 1 or reset is negative.
+        """
+        if threshold < 1 or reset < 0:
+            raise ValueError("threshold must be at least 1 and reset not negative")
+
+        self.threshold = threshold
+        self.reset = reset
+
+        self._lock = threading.Lock()
+        self._circuits = {}
+
+    def _circuit(self, host):
+        circuit = self._circuits.get(host)
+
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit()
+
+        return circuit
+
+    def before(self, url):
+        """Checks that a request may be sent.
+
+        Args:
+            url (str): The URL about to be requested.
+
+        Raises:
+            sfpl.exceptions.CircuitOpen: If the host's circuit is open.
+        """
+        host = urlsplit(url).netloc
+
+        with self._lock:
+            circuit = self._circuit(host)
+
+            if circuit.opened_at is None:
+                return
+
+            remaining = circuit.opened_at + self.reset - time.monotonic()
+
+            if remaining <= 0 and not circuit.probing:
+                circuit.probing = True
+                return
+
+            circuit.rejected += 1
+
+        raise exceptions.CircuitOpen(host, max(0.0, remaining))
+
+    def success(self, url):
+        """Records a request that succeeded, closing the host's circuit.
+
+        Args:
+            url (str): The requested URL.
+        """
+        with self._lock:
+            circuit = self._circuit(urlsplit(url).netloc)
+            circuit.failures = 0
+            circuit.opened_at = None
+            circuit.probing = False
+
+    def cancel(self, url):
+        """Records a request that failed without the host failing, such as for
+        an invalid URL, so another probe may be let through.
+
+        Args:
+            url (str): The requested URL.
+        """
+        with self._lock:
+            self._circuit(urlsplit(url).netloc).probing = False
+
+    def failure(self, url):
+        """Records a request that failed, opening the host's circuit if it has
+        failed too often or its probe failed.
+
+        Args:
+            url (str): The requested URL.
+        """
+        with self._lock:
+            circuit = self._circuit(urlsplit(url).netloc)
+            circuit.failures += 1
+
+            if circuit.probing or (
+                circuit.opened_at is None and circuit.failures >= self.threshold
+            ):
+                circuit.opened_at = time.monotonic()
+                circuit.probing = False
+                circuit.trips += 1
+
+    def observe(self, url, status):
+        """Records a response, counting 5xx statuses as failures.
+
+        Args:
+            url (str): The requested URL.
+            status (int): The response status.
+        """
+        if status in FAILURE_STATUSES:
+            self.failure(url)
+        else:
+            self.success(url)
+
+    def state(self, url):
+        """Gets the state of a host's circuit.
+
+        Args:
+            url (str): A URL on the host.
+
+        Returns:
+            str: ``"closed"``, ``"open"``, or ``"half-open"`` once a probe may
+                be sent.
+        """
+        with self._lock:
+            return self._state(self._circuit(urlsplit(url).netloc))
+
+    def _state(self, circuit):
+        if circuit.opened_at is None:
+            return "closed"
+        if circuit.probing or time.monotonic() - circuit.opened_at >= self.reset:
+            return "half-open"
+        return "open"
+
+    def stats(self):
+        """Gets the state of each host's circuit.
+
+        Returns:
+            dict: Maps each host to its ``state``, consecutive ``failures``,
+                number of ``trips`` to open and requests ``rejected`` while open.
+        """
+        with self._lock:
+            return {
+                host: {
+                    "state": self._state(circuit),
+                    "failures": circuit.failures,
+                    "trips": circuit.trips,
+                    "rejected": circuit.rejected,
+                }
+                for host, circuit in self._circuits.items()
+            }
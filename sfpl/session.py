@@ -0,0 +1,226 @@
+"""Saved account sessions, so an :class:`sfpl.sfpl.Account` can skip logging in.
+
+A :class:`SessionStore` keeps the cookies and identity of logged in accounts
+in a JSON file that only its owner can read or write. Entries are keyed by a
+salted scrypt hash of the barcode and PIN, so neither is written to disk, a
+short PIN can't be looked up from its key cheaply, and a changed PIN never
+picks up an old session. A saved session is used without checking it
+first, and replaced by a fresh login once the server turns it away.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Cookie attributes saved alongside each cookie's name and value.
+COOKIE_FIELDS = ("domain", "path", "expires", "secure")
+
+# scrypt cost parameters for session keys: about 16 MiB and tens of
+# milliseconds per key, paid once per account and store.
+SCRYPT_PARAMETERS = {"n": 2**14, "r": 8, "p": 1}
+
+
+class SavedSession:
+    """An account's saved cookies and identity.
+
+    Attributes:
+        card (tuple): The account's username and id, or None if they weren't
+            known when the session was saved.
+        cookies (list): The session cookies, as dicts of ``name``, ``value``
+            and :data:`COOKIE_FIELDS`.
+        saved_at (float): When the session was saved, as a Unix timestamp.
+    """
+
+    __slots__ = ("card", "cookies", "saved_at")
+
+    def __init__(self, card, cookies, saved_at):
+        self.card = card
+        self.cookies = cookies
+        self.saved_at = saved_at
+
+    def restore(self, session):
+        """Loads the unexpired cookies into a session.
+
+        Args:
+            session (requests.Session): The session.
+
+        Returns:
+            int: The number of cookies loaded.
+        """
+        now = time.time()
+        loaded = 0
+
+        for cookie in self.cookies:
+            if cookie.get("expires") is not None and cookie["expires"] <= now:
+                continue
+            session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                **{field: cookie.get(field) for field in COOKIE_FIELDS},
+            )
+            loaded += 1
+
+        return loaded
+
+
+class SessionStore:
+    """A file of saved account sessions, readable only by its owner.
+
+    Attributes:
+        path (str): The file the sessions are kept in.
+        max_age (float): Seconds after which a saved session is ignored, or
+            None to rely on the server and cookie expiry alone.
+    """
+
+    def __init__(self, path, max_age=7 * 24 * 60 * 60):
+        """
+        Args:
+            path (str): The file to keep the sessions in. It is created with
+                ``0600`` permissions on first save.
+            max_age (float, optional): Seconds after which a saved session is
+                ignored, or None to rely on the server and cookie expiry alone.
+        """
+        self.path = os.path.expanduser(path)
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._keys = {}
+
+    @staticmethod
+    def key(barcode, pin, salt):
+        """Gets the key an account's session is saved under.
+
+        Args:
+            barcode (str): The library card barcode.
+            pin (str): PIN/ password for library account.
+            salt (str): The store's random salt, in hex.
+
+        Returns:
+            str: The hex digest of the salted scrypt hash of the barcode and PIN.
+        """
+        return hashlib.scrypt(
+            f"{barcode}\0{pin}".encode(),
+            salt=bytes.fromhex(salt),
+            **SCRYPT_PARAMETERS,
+        ).hex()
+
+    def _key(self, barcode, pin, salt):
+        # Called with the lock held. Keys are kept in memory only, so each
+        # account pays for scrypt once per store.
+        key = self._keys.get((salt, barcode, pin))
+        if key is None:
+            key = self._keys[salt, barcode, pin] = self.key(barcode, pin, salt)
+        return key
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                store = json.load(file)
+            salt, sessions = store["salt"], store["sessions"]
+            bytes.fromhex(salt)
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            # A missing, corrupt or unsalted store only costs a login.
+            return None, {}
+        return salt, sessions
+
+    def _write(self, salt, sessions):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        # mkstemp creates the file with 0600 permissions, so cookies are never
+        # readable by other users, even before the rename.
+        fd, temp = tempfile.mkstemp(dir=directory, prefix=".sfpl-sessions-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump({"salt": salt, "sessions": sessions}, file)
+            os.replace(temp, self.path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    def load(self, barcode, pin):
+        """Gets an account's saved session.
+
+        Args:
+            barcode (str): The library card barcode.
+            pin (str): PIN/ password for library account.
+
+        Returns:
+            SavedSession: The session, or None if there is none or it's too old.
+        """
+        with self._lock:
+            salt, sessions = self._read()
+            if salt is None:
+                return None
+            entry = sessions.get(self._key(barcode, pin, salt))
+
+        if entry is None:
+            return None
+
+        if self.max_age is not None and time.time() - entry["saved_at"] > self.max_age:
+            return None
+
+        card = entry.get("card")
+        return SavedSession(
+            tuple(card) if card else None, entry["cookies"], entry["saved_at"]
+        )
+
+    def save(self, barcode, pin, account):
+        """Saves a logged in account's session.
+
+        Args:
+            barcode (str): The library card barcode.
+            pin (str): PIN/ password for library account.
+            account (Account): The account.
+        """
+        cookies = [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                **{field: getattr(cookie, field) for field in COOKIE_FIELDS},
+            }
+            for cookie in account.session.cookies
+        ]
+
+        with self._lock:
+            salt, sessions = self._read()
+            if salt is None:
+                salt = os.urandom(16).hex()
+            sessions[self._key(barcode, pin, salt)] = {
+                # Only an identity the account has already fetched is saved.
+                "card": account._card,
+                "cookies": cookies,
+                "saved_at": time.time(),
+            }
+            self._write(salt, sessions)
+
+    def delete(self, barcode, pin):
+        """Forgets an account's saved session.
+
+        Args:
+            barcode (str): The library card barcode.
+            pin (str): PIN/ password for library account.
+
+        Returns:
+            bool: Whether there was a session to forget.
+        """
+        with self._lock:
+            salt, sessions = self._read()
+            if (
+                salt is None
+                or sessions.pop(self._key(barcode, pin, salt), None) is None
+            ):
+                return False
+            self._write(salt, sessions)
+            return True
+
+    def clear(self):
+        """Forgets every saved session."""
+        with self._lock:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
@@ -1,28 +1,227 @@
-import json
+import datetime
+import itertools
 import math
 import re
+import sys
+import threading
+import time
+import weakref
+from collections import deque
 from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
 from typing import ClassVar
 
 import requests
 from bs4 import BeautifulSoup
 
-from . import exceptions
+from . import exceptions, trace
+from .client import get_default_client
+from .extract import extract_data, extract_result_count
+from .frame import BookFrame
 
 # Regex Patterns
 
 id_regex = r"https://sfpl.bibliocommons.com/.+/(\d+)"
-book_page_regex = r"[\d,]+ to [\d,]+ of ([\d,]+) results?"
 list_page_regex = r"[\d,]+ - [\d,]+ of ([\d,]+) items?"
 
+# Errors that mean a book's details couldn't be fetched or understood.
+DETAILS_ERRORS = (
+    AttributeError,
+    KeyError,
+    StopIteration,
+    TypeError,
+    ValueError,
+    exceptions.MissingScriptError,
+    requests.RequestException,
+)
+
+# Errors that mean a hold couldn't be placed.
+HOLD_ERRORS = (
+    KeyError,
+    TypeError,
+    ValueError,
+    exceptions.HoldError,
+    exceptions.NotLoggedIn,
+    requests.RequestException,
+)
+
+_MISSING = object()
+
 
 def _extract_data(response_text: str) -> dict:
-    soup = BeautifulSoup(response_text, "lxml")
-    script_tag = soup.find("script", {"type": "application/json", "data-iso-key": "_0"})
-    if not script_tag:
-        raise exceptions.MissingScriptError
+    return extract_data(response_text)
+
+
+def _soup(markup):
+    with trace.span("soup"):
+        return BeautifulSoup(markup, "lxml")
+
+
+def _intern(value):
+    # Authors, statuses and the like repeat across thousands of objects, so
+    # they share one copy of each string.
+    return sys.intern(value) if type(value) is str else value
+
+
+@trace.traced("parse search page")
+def _parse_search_page(
+    response_text: str, client=None, book_class=None
+) -> tuple[int | None, list["Book"]]:
+    """Parses a page of book search results.
+
+    Returns:
+        tuple: The total number of results (None if the page doesn't say) and
+            the list of Book objects on the page.
+    """
+    total = extract_result_count(response_text)
+
+    if total is None:
+        return None, []
+
+    bib_data = _extract_data(response_text)["entities"]["bibs"]
+    book_class = book_class or Book
+
+    books = [
+        book_class.fromBib(bib, client=client, metadata_id=metadata_id)
+        for metadata_id, bib in bib_data.items()
+    ]
 
-    return json.loads(script_tag.text)
+    return total, books
+
+
+@trace.traced("parse search page")
+def _parse_search_frame(response_text: str) -> tuple[int | None, BookFrame]:
+    """Parses a page of book search results into a BookFrame.
+
+    Returns:
+        tuple: The total number of results (None if the page doesn't say) and
+            a BookFrame of the books on the page.
+    """
+    total = extract_result_count(response_text)
+
+    if total is None:
+        return None, BookFrame()
+
+    return total, BookFrame.fromBibs(_extract_data(response_text)["entities"]["bibs"])
+
+
+@trace.traced("parse list page")
+def _parse_list_page(
+    response_text: str, client=None
+) -> tuple[int | None, list["List"]]:
+    """Parses a page of user list search results.
+
+    Returns:
+        tuple: The total number of lists (None if the page doesn't say) and
+            the list of List objects on the page.
+    """
+    soup = _soup(response_text)
+    pages_element = soup.find(string=re.compile(list_page_regex))
+
+    if not pages_element:
+        return None, []
+
+    total = int(
+        re.match(list_page_regex, str(pages_element).strip()).group(1).replace(",", "")
+    )
+
+    lists = [
+        List(
+            {
+                "type": _list.find(class_="list_type small").text.strip(),
+                "title": _list.find(class_="title").text,
+                "user": User(
+                    _list.find(class_="username").text,
+                    _list.find(class_="username")["href"].split("/")[4],
+                    client=client,
+                )
+                if not _list.find(class_="username muted")
+                else _list.find(class_="username muted").text.strip(),
+                "createdon": _list.find(
+                    class_="dataPair clearfix small list_created_date"
+                )
+                .find(class_="value")
+                .text,
+                "itemcount": int(
+                    _list.find(class_="list_item_count").text.replace("items", "")
+                ),
+                "description": _list.find(class_="description").text.replace("\n", ""),
+                "id": _list.find(class_="title").find("a")["href"].split("/")[4],
+            },
+            client=client,
+        )
+        for _list in soup(class_="col-xs-12 col-sm-4 cp_user_list_item")
+    ]
+
+    return total, lists
+
+
+def _last_page(total: int | None, per_page: int) -> int | None:
+    return None if total is None else math.ceil(total / per_page)
+
+
+def _iter_pages(
+    get_page, pages, start_page, concurrency
+) -> Generator[list, None, None]:
+    """Yields pages of results in order, optionally prefetching them.
+
+    Args:
+        get_page (callable): Takes a page number and returns the total number
+            of pages (None if the page doesn't say) and the results on the page.
+        pages (int or str): Number of pages to get, or "all" for every page.
+        start_page (int): The first page to get.
+        concurrency (int): Maximum number of pages to fetch at once.
+
+    Yields:
+        list: The results on each page.
+    """
+    if pages != "all" and pages < 1:
+        return
+
+    last_page, results = get_page(start_page)
+
+    if last_page is None or last_page < start_page:
+        return
+
+    yield results
+
+    end = last_page if pages == "all" else min(start_page + pages - 1, last_page)
+    remaining = iter(range(start_page + 1, end + 1))
+
+    if concurrency <= 1:
+        for page in remaining:
+            last_page, results = get_page(page)
+
+            if last_page is None or last_page < page:
+                return
+
+            yield results
+
+        return
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = deque(
+        (page, executor.submit(get_page, page))
+        for page in itertools.islice(remaining, concurrency)
+    )
+
+    try:
+        while pending:
+            page, future = pending.popleft()
+            last_page, results = future.result()
+
+            if last_page is None or last_page < page:
+                return
+
+            for next_page in itertools.islice(remaining, 1):
+                pending.append((next_page, executor.submit(get_page, next_page)))
+
+            yield results
+
+    finally:
+        # Drops pages that haven't started when the caller stops early or the
+        # results run out before the last requested page.
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 class User:
@@ -31,33 +230,45 @@ class User:
     Attributes:
         name (str): the account's username.
         _id (str): the account's id.
+        client (Client): The client requests are sent with.
     """
 
-    def __init__(self, name, _id=None):
+    __slots__ = ("_id", "client", "name")
+
+    def __init__(self, name, _id=None, client=None):
         """
         Args:
             name (str): The account's username.
+            client (Client, optional): The client to send requests with.
+                Defaults to the shared client.
 
         Raises:
             NoUserFound: If the search doesn't return any users.
         """
-        if not _id:
-            self.name = name
+        self.client = client or get_default_client()
+        self.name = _intern(name)
 
-            resp = requests.get(
-                f"https://sfpl.bibliocommons.com/search?t=user&search_category=user&q={self.name}"
+        if not _id:
+            memo = self.client.memo
+            _id = (
+                self._findId()
+                if memo is None
+                else memo.users.get_or_compute(name, self._findId)
             )
 
-            match = re.match(id_regex, resp.url)
+        self._id = _id
 
-            if not match:
-                raise exceptions.NoUserFound(name)
+    def _findId(self):
+        resp = self.client.get(
+            f"https://sfpl.bibliocommons.com/search?t=user&search_category=user&q={self.name}"
+        )
 
-            self._id = match.group(1)
+        match = re.match(id_regex, resp.url)
 
-        else:
-            self.name = name
-            self._id = _id
+        if not match:
+            raise exceptions.NoUserFound(self.name)
+
+        return match.group(1)
 
     def getFollowing(self):
         """Gets all the users the account follows.
@@ -67,13 +278,14 @@ class User:
         """
         return [
             User(
-                user.find("a").text, re.match(id_regex, user.find("a")["href"]).group(1)
+                user.find("a").text,
+                re.match(id_regex, user.find("a")["href"]).group(1),
+                client=self.client,
             )
-            for user in BeautifulSoup(
-                requests.get(
+            for user in _soup(
+                self.client.get(
                     f"https://sfpl.bibliocommons.com/user_profile/{self._id}/following"
-                ).text,
-                "lxml",
+                ).text
             )(class_="col-xs-12 col-md-4")
         ]
 
@@ -85,13 +297,14 @@ class User:
         """
         return [
             User(
-                user.find("a").text, re.match(id_regex, user.find("a")["href"]).group(1)
+                user.find("a").text,
+                re.match(id_regex, user.find("a")["href"]).group(1),
+                client=self.client,
             )
-            for user in BeautifulSoup(
-                requests.get(
+            for user in _soup(
+                self.client.get(
                     f"https://sfpl.bibliocommons.com/user_profile/{self._id}/followers"
-                ).text,
-                "lxml",
+                ).text
             )(class_="col-xs-12 col-md-4")
         ]
 
@@ -111,13 +324,13 @@ class User:
                     "itemcount": int(_list("td")[3].text),
                     "description": None,
                     "id": _list.find("a")["href"].split("/")[4],
-                }
+                },
+                client=self.client,
             )
-            for _list in BeautifulSoup(
-                requests.get(
+            for _list in _soup(
+                self.client.get(
                     f"https://sfpl.bibliocommons.com/lists/show/{self._id}"
-                ).text,
-                "lxml",
+                ).text
             ).find("tbody")("tr")
         ]
 
@@ -163,10 +376,12 @@ class User:
         return self.name
 
     def __eq__(self, other):
+        if not isinstance(other, User):
+            return NotImplemented
         return self._id == other._id
 
-    def __ne__(self, other):
-        return self._id != other._id
+    def __hash__(self):
+        return hash(self._id)
 
 
 class Account(User):
@@ -174,23 +389,56 @@ class Account(User):
 
     Attributes:
         session (requests.Session): The requests session with cookies.
-        name (str): the account's username.
-        _id (str): the account's id.
+        name (str): the account's username, fetched on first use.
+        _id (str): the account's id, fetched on first use.
+        client (Client): The client requests are sent with.
+        SNAPSHOT_TTL (float): Seconds the holds and checkouts pages are reused
+            for by renewals and hold cancellations.
     """
 
-    def __init__(self, barcode, pin):
+    SNAPSHOT_TTL: ClassVar[float] = 60
+
+    def __init__(self, barcode, pin, client=None, sessions=None):
         """
         Args:
             barcode (str): The library card barcode.
             pin (str): PIN/ password for library account.
+            client (Client, optional): The client to send requests with.
+                Defaults to the shared client.
+            sessions (SessionStore, optional): Where to save the session after
+                logging in. A saved session is reused instead of logging in
+                again, until the server turns it away.
 
         Raises:
             LoginError: If we aren't redirected to the main page after login.
         """
-        self.session = requests.Session()
+        self.client = client or get_default_client()
+        self.session = self.client.new_session()
+        self._sessions = sessions
+        self._credentials = (barcode, pin)
+        self._card = None
+        self._snapshot = AccountSnapshot()
+        self._login_lock = threading.Lock()
+        # None after logging in, "saved" while a restored session is trusted
+        # and "renewed" once it was turned away and replaced by a login.
+        self._restored = None
+
+        saved = sessions.load(barcode, pin) if sessions is not None else None
+
+        # A restored session isn't checked up front, which would cost as much
+        # as logging in. Pages redirect to the login page once it has expired,
+        # and the account logs in again then.
+        if saved is not None and saved.restore(self.session):
+            self._card = saved.card
+            self._restored = "saved"
+        else:
+            self._login()
 
-        resp = self.session.post(
+    def _login(self):
+        barcode, pin = self._credentials
+        resp = self.client.post(
             "https://sfpl.bibliocommons.com/user/login",
+            session=self.session,
             data={"name": barcode, "user_pin": pin},
             headers={
                 "X-Requested-With": "XMLHttpRequest",
@@ -201,16 +449,57 @@ class Account(User):
         if not resp.json()["logged_in"]:
             raise exceptions.LoginError(resp.json()["messages"][0]["key"])
 
-        main = BeautifulSoup(
-            self.session.get("https://sfpl.bibliocommons.com/user_dashboard").text,
-            "lxml",
-        )
+        if self._sessions is not None:
+            self._sessions.save(barcode, pin, self)
+
+    def _relogin(self):
+        # Replaces a restored session the server turned away. Returns whether
+        # a request that was redirected to the login page is worth retrying.
+        with self._login_lock:
+            if self._restored == "saved":
+                self.session.cookies.clear()
+                self._login()
+                self._restored = "renewed"
+
+            return self._restored == "renewed"
+
+    @property
+    def name(self):
+        """str: the account's username, fetched on first use."""
+        return self._userCard()[0]
+
+    @property
+    def _id(self):
+        """str: the account's id, fetched on first use."""
+        return self._userCard()[1]
+
+    def _userCard(self):
+        # Nothing a login needs depends on the account's name or id, so the
+        # dashboard they're read from is only fetched once one is used.
+        if self._card is None:
+            resp = self._getDashboard()
+
+            if resp.history and self._relogin():
+                resp = self._getDashboard()
+
+            self._card = self._parseUserCard(resp.text)
+
+            if self._sessions is not None:
+                self._sessions.save(*self._credentials, self)
 
-        super().__init__(
-            main.find(class_="cp_user_card")["data-name"],
-            main.find(class_="cp_user_card")["data-id"],
+        return self._card
+
+    def _getDashboard(self):
+        return self.client.get(
+            "https://sfpl.bibliocommons.com/user_dashboard", session=self.session
         )
 
+    @staticmethod
+    @trace.traced("parse user card")
+    def _parseUserCard(response_text: str) -> tuple[str, str]:
+        card = _soup(response_text).find(class_="cp_user_card")
+        return card["data-name"], card["data-id"]
+
     def hold(self, book, branch):
         """Holds the book.
 
@@ -222,15 +511,80 @@ class Account(User):
             HoldError: If the hold request is denied.
             NotLoggedIn: If the server doesn't accept the token.
         """
-        resp = self.session.post(
+        token = self._fetchHoldToken(book)
+        self._snapshot.invalidate("holds")
+        data = self._placeHold(book, branch, token)
+
+        if not data["logged_in"] and self._relogin():
+            data = self._placeHold(book, branch, self._fetchHoldToken(book))
+
+        self._checkHoldResponse(data)
+
+    def holdMany(self, books, branch, concurrency=4) -> list["Outcome"]:
+        """Holds many books, reusing one authenticity token for all of them.
+
+        The token is read from the first book's page and only fetched again
+        if the server rejects it.
+
+        Args:
+            books (iterable): Book objects to hold.
+            branch (Branch): Branch to have the books delivered to.
+            concurrency (int, optional): Number of holds to place at once.
+
+        Returns:
+            list: An Outcome for each book, in the order given, whose error is
+                why the book couldn't be held, such as a HoldError.
+        """
+        books = list(books)
+        lock = threading.Lock()
+        token = None
+        self._snapshot.invalidate("holds")
+
+        def getToken(book, rejected=None):
+            nonlocal token
+
+            # Placements wait here while the token is fetched, since they'd
+            # need it anyway, and only one of them refreshes a rejected token.
+            with lock:
+                if token is None or token == rejected:
+                    if rejected is not None:
+                        self._relogin()
+                    token = self._fetchHoldToken(book)
+                return token
+
+        def hold(book):
+            try:
+                used = getToken(book)
+                data = self._placeHold(book, branch, used)
+
+                if not data["logged_in"]:
+                    data = self._placeHold(book, branch, getToken(book, used))
+
+                self._checkHoldResponse(data)
+            except HOLD_ERRORS as exc:
+                return Outcome(book, error=exc)
+
+            return Outcome(book, value=True)
+
+        if concurrency <= 1 or len(books) <= 1:
+            return [hold(book) for book in books]
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(books))) as executor:
+            return list(executor.map(hold, books))
+
+    def _fetchHoldToken(self, book):
+        return self._parseAuthenticityToken(
+            self.client.get(
+                f"https://sfpl.bibliocommons.com/item/show/{book._id}",
+                session=self.session,
+            ).text
+        )
+
+    def _placeHold(self, book, branch, token):
+        resp = self.client.post(
             f"https://sfpl.bibliocommons.com/holds/place_single_click_hold/{book._id}",
             data={
-                "authenticity_token": BeautifulSoup(
-                    self.session.get(
-                        f"https://sfpl.bibliocommons.com/item/show/{book._id}"
-                    ).text,
-                    "lxml",
-                ).find("input", {"name": "authenticity_token"})["value"],
+                "authenticity_token": token,
                 "bib": book._id,
                 "branch": branch._id,
             },
@@ -238,13 +592,14 @@ class Account(User):
                 "X-Requested-With": "XMLHttpRequest",
                 "Accept": "application/json",
             },
+            session=self.session,
         )
 
-        if not resp.json()["logged_in"]:
-            raise exceptions.NotLoggedIn
+        # Rails answers a rejected authenticity token with 422 and no JSON.
+        if resp.status_code == 422:
+            return {"logged_in": False}
 
-        if not resp.json()["success"]:
-            raise exceptions.HoldError(resp.json()["messages"][0]["key"])
+        return resp.json()
 
     def cancelHold(self, book):
         """Cancels the hold on the book.
@@ -256,46 +611,62 @@ class Account(User):
             NotOnHold: If the book isn't being held.
             NotLoggedIn: If the server doesn't accept the token.
         """
-        resp = self.session.get(
-            "https://sfpl.bibliocommons.com/holds/index/not_yet_available"
-        )
+        [outcome] = self.cancelHolds([book])
 
-        if resp.history:
-            raise exceptions.NotLoggedIn
+        if not outcome.ok:
+            raise outcome.error
 
-        holds = BeautifulSoup(resp.text, "lxml")
+    def cancelHolds(self, books) -> list["Outcome"]:
+        """Cancels the holds on many books with a single request.
 
-        for hold in holds(
-            "div",
-            lambda class_: (
-                class_
-                and class_.startswith("listItem col-sm-offset-1 col-sm-10 col-xs-12")
-            ),
-        ):
-            if hold.find(testid="bib_link").text == book.title:
-                resp = self.session.post(
-                    "https://sfpl.bibliocommons.com/holds/delete.json",
-                    data={
-                        "authenticity_token": holds.find(
-                            "input", {"name": "authenticity_token"}
-                        )["value"],
-                        "confirm_hold_delete": True,
-                        "items[]": hold.find(class_="btn btn-link single_circ_action")[
-                            "href"
-                        ].split("/")[3],
-                        "bib_status": "future",
-                        "is_private": True,
-                    },
-                    headers={"X-Requested-With": "XMLHttpRequest"},
-                )
+        Books are looked up by ID in the account's snapshot, which is only
+        loaded again if it's older than ``SNAPSHOT_TTL``.
 
-                if not resp.json()["logged_in"]:
-                    raise exceptions.NotLoggedIn
+        Args:
+            books (iterable): Books to cancel the holds for.
 
-                break
+        Returns:
+            list: An Outcome for each book, in the order given, whose error is
+                NotOnHold if the book isn't being held.
 
-        else:
-            raise exceptions.NotOnHold(book.title)
+        Raises:
+            NotLoggedIn: If the server doesn't accept the token.
+        """
+        books = list(books)
+        page = self._circulation("holds")
+        outcomes = []
+        items = []
+
+        for book in books:
+            item = page.item(book)
+
+            if item is None or item is _MISSING:
+                outcomes.append(Outcome(book, error=exceptions.NotOnHold(book.title)))
+            else:
+                outcomes.append(Outcome(book, value=True))
+                items.append(item)
+
+        if not items:
+            return outcomes
+
+        self._snapshot.invalidate("holds")
+        resp = self.client.post(
+            "https://sfpl.bibliocommons.com/holds/delete.json",
+            data=[
+                ("authenticity_token", page.requireToken()),
+                ("confirm_hold_delete", True),
+                *(("items[]", item) for item in items),
+                ("bib_status", "future"),
+                ("is_private", True),
+            ],
+            headers={"X-Requested-With": "XMLHttpRequest"},
+            session=self.session,
+        )
+
+        if not resp.json()["logged_in"]:
+            raise exceptions.NotLoggedIn
+
+        return outcomes
 
     def renew(self, book):
         """Renews the hold on the book.
@@ -308,58 +679,191 @@ class Account(User):
             RenewError: If the renew request is denied.
             NotLoggedIn: If the server doesn't accept the token.
         """
-        resp = self.session.get("https://sfpl.bibliocommons.com/checkedout")
+        page = self._circulation("checkouts")
+        item = page.item(book)
 
-        if resp.history:
+        if item is _MISSING:
+            raise exceptions.NotCheckedOut(book.title)
+        if item is None:
+            raise exceptions.RenewError(f"{book.title} can't be renewed.")
+
+        self._snapshot.invalidate("checkouts")
+        self._renewLink(f"checkedout/confirm/{item}", page.requireToken())
+
+    def renewMany(self, books) -> list["Outcome"]:
+        """Renews many books, loading the checkouts page at most once.
+
+        Books are looked up by ID in the account's snapshot. Every renewable
+        book is sent in a single renewal request. If the library rejects it,
+        the checkouts are loaded again and each book whose due date didn't
+        change is renewed on its own, so one failure doesn't hold the others
+        back.
+
+        Args:
+            books (iterable): Book objects to renew.
+
+        Returns:
+            list: An Outcome for each book, in the order given, whose error is
+                NotCheckedOut or RenewError if the book wasn't renewed.
+
+        Raises:
+            NotLoggedIn: If the server doesn't accept the token.
+        """
+        return self._renewItems(self._circulation("checkouts"), list(books))
+
+    def renewAll(self) -> list["Outcome"]:
+        """Renews every checked out book that can be renewed.
+
+        Books the library doesn't allow to be renewed are left out.
+
+        Returns:
+            list: An Outcome for each renewable checked out book, as from
+                :meth:`renewMany`.
+
+        Raises:
+            NotLoggedIn: If the server doesn't accept the token.
+        """
+        page = self._circulation("checkouts")
+        books = [book for book in page.requireBooks() if page.item(book) is not None]
+        return self._renewItems(page, books)
+
+    def _renewItems(self, page, books):
+        outcomes = [None] * len(books)
+        pending = []
+
+        for index, book in enumerate(books):
+            item = page.item(book)
+
+            if item is _MISSING:
+                error = exceptions.NotCheckedOut(book.title)
+                outcomes[index] = Outcome(book, error=error)
+            elif item is None:
+                error = exceptions.RenewError(f"{book.title} can't be renewed.")
+                outcomes[index] = Outcome(book, error=error)
+            else:
+                pending.append((index, book, item))
+
+        if not pending:
+            return outcomes
+
+        token = page.requireToken()
+        self._snapshot.invalidate("checkouts")
+        resp = self.client.post(
+            "https://sfpl.bibliocommons.com/checkedout/renew",
+            data=[("authenticity_token", token)]
+            + [("items[]", item) for _, _, item in pending],
+            headers={
+                "X-Requested-With": "XMLHttpRequest",
+                "Accept": "application/json",
+                "Referer": "https://sfpl.bibliocommons.com/checkedout",
+            },
+            session=self.session,
+        )
+
+        try:
+            self._checkRenewResponse(resp.json())
+        except exceptions.RenewError as exc:
+            if len(pending) == 1:
+                index, book, _ = pending[0]
+                outcomes[index] = Outcome(book, error=exc)
+                return outcomes
+
+            # The response doesn't say which items were refused, and the
+            # others may have been renewed anyway, so reload the checkouts and
+            # only renew the books whose due dates haven't moved.
+            fresh = self._circulation("checkouts", max_age=0)
+            retry = []
+
+            for index, book, item in pending:
+                before = page.record(book._id)
+                after = fresh.record(book._id)
+
+                if after is None:
+                    error = exceptions.NotCheckedOut(book.title)
+                    outcomes[index] = Outcome(book, error=error)
+                elif self._renewed(before, after):
+                    outcomes[index] = Outcome(book, value=True)
+                else:
+                    retry.append((index, book, item))
+
+            if retry:
+                token = fresh.requireToken()
+                self._snapshot.invalidate("checkouts")
+
+            for index, book, item in retry:
+                try:
+                    self._renewLink(f"checkedout/confirm/{item}", token)
+                except exceptions.RenewError as item_exc:
+                    outcomes[index] = Outcome(book, error=item_exc)
+                else:
+                    outcomes[index] = Outcome(book, value=True)
+            return outcomes
+
+        for index, book, _ in pending:
+            outcomes[index] = Outcome(book, value=True)
+        return outcomes
+
+    @staticmethod
+    def _renewed(before, after):
+        return (before.get("dueDate"), before.get("timesRenewed")) != (
+            after.get("dueDate"),
+            after.get("timesRenewed"),
+        )
+
+    def _renewLink(self, href, token):
+        confirmation = self.client.get(
+            f"https://sfpl.bibliocommons.com/{href}",
+            headers={"X-CSRF-Token": token},
+            session=self.session,
+        ).json()
+
+        if not confirmation["logged_in"]:
             raise exceptions.NotLoggedIn
 
-        checkouts = BeautifulSoup(resp.text, "lxml")
+        resp = self.client.post(
+            "https://sfpl.bibliocommons.com/checkedout/renew",
+            data=self._parseRenewConfirmation(confirmation["html"]),
+            headers={
+                "X-Requested-With": "XMLHttpRequest",
+                "Accept": "application/json",
+                "Referer": "https://sfpl.bibliocommons.com/checkedout",
+            },
+            session=self.session,
+        )
+
+        self._checkRenewResponse(resp.json())
 
-        for checkout in checkouts(
-            "div", lambda class_: class_ and class_.startswith("listItem")
-        ):
-            if checkout.find(class_="title title_extended").text == book.title:
-                confirmation = self.session.get(
-                    "https://sfpl.bibliocommons.com/{}".format(
-                        checkout.find(class_="btn btn-link single_circ_action")["href"]
-                    ),
-                    headers={
-                        "X-CSRF-Token": checkouts.find(
-                            "input", {"name": "authenticity_token"}
-                        )["value"]
-                    },
-                ).json()
-
-                if not confirmation["logged_in"]:
-                    raise exceptions.NotLoggedIn
-
-                resp = self.session.post(
-                    "https://sfpl.bibliocommons.com/checkedout/renew",
-                    data={
-                        "authenticity_token": BeautifulSoup(
-                            confirmation["html"], "lxml"
-                        ).find("input", {"name": "authenticity_token"})["value"],
-                        "items[]": BeautifulSoup(confirmation["html"], "lxml").find(
-                            "input", id="items_"
-                        )["value"],
-                    },
-                    headers={
-                        "X-Requested-With": "XMLHttpRequest",
-                        "Accept": "application/json",
-                        "Referer": "https://sfpl.bibliocommons.com/checkedout",
-                    },
-                )
+    @staticmethod
+    def _parseRenewConfirmation(html: str) -> dict[str, str]:
+        confirmation = _soup(html)
 
-                if not resp.json()["logged_in"]:
-                    raise exceptions.NotLoggedIn
+        return {
+            "authenticity_token": confirmation.find(
+                "input", {"name": "authenticity_token"}
+            )["value"],
+            "items[]": confirmation.find("input", id="items_")["value"],
+        }
 
-                if not resp.json()["success"]:
-                    raise exceptions.RenewError(resp.json()["messages"][0]["key"])
+    @staticmethod
+    def _checkRenewResponse(data: dict):
+        if not data["logged_in"]:
+            raise exceptions.NotLoggedIn
 
-                break
+        if not data["success"]:
+            raise exceptions.RenewError(data["messages"][0]["key"])
 
-        else:
-            raise exceptions.NotCheckedOut(book.title)
+    @staticmethod
+    def _parseAuthenticityToken(response_text: str) -> str:
+        soup = _soup(response_text)
+        return soup.find("input", {"name": "authenticity_token"})["value"]
+
+    @staticmethod
+    def _checkHoldResponse(data: dict):
+        if not data["logged_in"]:
+            raise exceptions.NotLoggedIn
+
+        if not data["success"]:
+            raise exceptions.HoldError(data["messages"][0]["key"])
 
     def follow(self, user):
         """Follows the user.
@@ -370,17 +874,18 @@ class Account(User):
         Raises:
             NotLoggedIn: If the server doesn't accept the token.
         """
-        resp = self.session.put(
+        resp = self.client.put(
             f"https://sfpl.bibliocommons.com/user_profile/{self._id}?type=follow&value={user._id}",
             headers={
                 "X-Requested-With": "XMLHttpRequest",
-                "X-CSRF-Token": BeautifulSoup(
-                    self.session.get(
-                        f"https://sfpl.bibliocommons.com/user_profile/{user._id}"
-                    ).text,
-                    "lxml",
+                "X-CSRF-Token": _soup(
+                    self.client.get(
+                        f"https://sfpl.bibliocommons.com/user_profile/{user._id}",
+                        session=self.session,
+                    ).text
                 ).find("meta", {"name": "csrf-token"})["content"],
             },
+            session=self.session,
         )
 
         if not resp.json()["logged_in"]:
@@ -395,17 +900,18 @@ class Account(User):
         Raises:
             NotLoggedIn: If the server doesn't accept the token.
         """
-        resp = self.session.put(
+        resp = self.client.put(
             f"https://sfpl.bibliocommons.com/user_profile/{self._id}?type=unfollow&value={user._id}",
             headers={
                 "X-Requested-With": "XMLHttpRequest",
-                "X-CSRF-Token": BeautifulSoup(
-                    self.session.get(
-                        f"https://sfpl.bibliocommons.com/user_profile/{user._id}"
-                    ).text,
-                    "lxml",
+                "X-CSRF-Token": _soup(
+                    self.client.get(
+                        f"https://sfpl.bibliocommons.com/user_profile/{user._id}",
+                        session=self.session,
+                    ).text
                 ).find("meta", {"name": "csrf-token"})["content"],
             },
+            session=self.session,
         )
 
         if not resp.json()["logged_in"]:
@@ -416,25 +922,92 @@ class Account(User):
         Returns:
             list: A list of Book objects.
         """
-        resp = self.session.get("https://sfpl.bibliocommons.com/checkedout")
-
-        return self.parseCheckouts(resp.text)
+        return list(self._circulation("checkouts", max_age=0).requireBooks())
 
     def getHolds(self) -> list["Book"]:
         """Gets the user's held items.
         Returns:
             list: A list of Book objects.
         """
-        resp = self.session.get(
-            "https://sfpl.bibliocommons.com/holds/index/not_yet_available"
-        )
+        return list(self._circulation("holds", max_age=0).requireBooks())
+
+    def snapshot(self, max_age=None) -> "AccountSnapshot":
+        """Gets the account's holds and checkouts, loading them if needed.
+
+        Args:
+            max_age (float, optional): Reload pages older than this many
+                seconds. Defaults to ``SNAPSHOT_TTL``.
 
-        return self.parseHolds(resp.text)
+        Returns:
+            AccountSnapshot: The snapshot, which later calls keep up to date.
+        """
+        self._circulationMany(CIRCULATION_PAGES, max_age)
+        return self._snapshot
+
+    def getSummary(self, due_within=3, today=None) -> "AccountSummary":
+        """Gets the account's holds and checkouts for a daily report.
+
+        Every circulation page is downloaded at once, on its own thread, so
+        each page is parsed while the others are still downloading rather
+        than after all of them.
+
+        Args:
+            due_within (int, optional): Checked out books due within this many
+                days are due soon.
+            today (datetime.date, optional): The date due dates are compared
+                to. Defaults to today.
+
+        Returns:
+            AccountSummary: The holds and checkouts.
+
+        Raises:
+            NotLoggedIn: If a page can't be loaded.
+        """
+        pages = self._circulationMany(CIRCULATION_PAGES, max_age=0)
+        return AccountSummary(pages, due_within, today or datetime.date.today())
+
+    def _circulationMany(self, kinds, max_age=None):
+        # Loads pages concurrently over the account's session, so one page's
+        # parse overlaps the others' downloads.
+        kinds = list(kinds)
+
+        with ThreadPoolExecutor(max_workers=len(kinds)) as executor:
+            pages = executor.map(lambda kind: self._circulation(kind, max_age), kinds)
+            return dict(zip(kinds, pages))
+
+    def _circulation(self, kind, max_age=None):
+        if max_age is None:
+            max_age = self.SNAPSHOT_TTL
+
+        page = self._snapshot.page(kind)
+
+        if page is not None and page.age < max_age:
+            return page
+
+        url, _, _, _ = CIRCULATION_PAGES[kind]
+        resp = self.client.get(url, session=self.session)
+
+        if resp.history and self._relogin():
+            resp = self.client.get(url, session=self.session)
+
+        if resp.history:
+            raise exceptions.NotLoggedIn
+
+        page = _parseCirculation(kind, resp.text, self.client)
+        self._snapshot.store(kind, page)
+        return page
 
     @staticmethod
-    def parseCheckouts(response_text: str) -> list["Book"]:
-        data = Account.__extract_data(response_text)
+    @trace.traced("parse checkouts")
+    def parseCheckouts(
+        response_text: str, client=None, book_class=None
+    ) -> list["Book"]:
+        return Account._checkoutsFromData(
+            Account.__extract_data(response_text), client, book_class
+        )
 
+    @staticmethod
+    def _checkoutsFromData(data: dict, client=None, book_class=None) -> list["Book"]:
         bibs = data["entities"]["bibs"].values()
         checkouts = {b["metadataId"]: b for b in data["entities"]["checkouts"].values()}
 
@@ -442,14 +1015,24 @@ class Account(User):
         def parseStatus(id: str) -> str:
             return "Due {}".format(checkouts[id]["dueDate"])
 
+        book_class = book_class or Book
+
         return [
-            Book(Account._parseDataDict(b), status=parseStatus(b["id"])) for b in bibs
+            book_class.fromBib(
+                b, status=parseStatus(b["id"]), client=client, all_authors=True
+            )
+            for b in bibs
         ]
 
     @staticmethod
-    def parseHolds(response_text: str) -> list["Book"]:
-        data = Account.__extract_data(response_text)
+    @trace.traced("parse holds")
+    def parseHolds(response_text: str, client=None, book_class=None) -> list["Book"]:
+        return Account._holdsFromData(
+            Account.__extract_data(response_text), client, book_class
+        )
 
+    @staticmethod
+    def _holdsFromData(data: dict, client=None, book_class=None) -> list["Book"]:
         bibs = data["entities"]["bibs"].values()
         holds = {b["metadataId"]: b for b in data["entities"]["holds"].values()}
 
@@ -460,19 +1043,15 @@ class Account(User):
                 status = "{}: {}".format(status, holds[id]["holdText"])
             return status
 
+        book_class = book_class or Book
+
         return [
-            Book(Account._parseDataDict(b), status=parseStatus(b["id"])) for b in bibs
+            book_class.fromBib(
+                b, status=parseStatus(b["id"]), client=client, all_authors=True
+            )
+            for b in bibs
         ]
 
-    @staticmethod
-    def _parseDataDict(bib: dict) -> dict[str, str]:
-        return {
-            "title": bib["briefInfo"]["title"],
-            "subtitle": bib["briefInfo"]["subtitle"],
-            "author": " & ".join(bib["briefInfo"]["authors"]),
-            "_id": Book.metaDataIdToId(bib["id"]),
-        }
-
     @staticmethod
     def __extract_data(response_text: str) -> dict:
         try:
@@ -481,13 +1060,293 @@ class Account(User):
             raise exceptions.NotLoggedIn
 
     def loggedIn(self):
-        return not bool(
-            self.session.get("https://sfpl.bibliocommons.com/user_dashboard").history
-        )
+        return not bool(self._getDashboard().history)
 
     def logout(self):
-        """Logs out of the account."""
-        self.session.get("https://sfpl.bibliocommons.com/user/logout")
+        """Logs out of the account, forgetting its saved session, if any."""
+        self.client.get(
+            "https://sfpl.bibliocommons.com/user/logout", session=self.session
+        )
+
+        if self._sessions is not None:
+            self._sessions.delete(*self._credentials)
+
+
+class Outcome:
+    """The outcome of a bulk operation for one book.
+
+    Attributes:
+        book (Book): The book the operation was for.
+        value: The operation's result, if it succeeded.
+        error (Exception): The exception the operation raised, if it failed.
+    """
+
+    def __init__(self, book, value=None, error=None):
+        self.book = book
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        """bool: Whether the operation succeeded."""
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return f"<Outcome {self.book!r}: ok>"
+        return f"<Outcome {self.book!r}: {self.error!r}>"
+
+
+# Each circulation page's URL, JSON entity, item ID field and the action
+# that item IDs are used for.
+CIRCULATION_PAGES = {
+    "holds": (
+        "https://sfpl.bibliocommons.com/holds/index/not_yet_available",
+        "holds",
+        "holdsId",
+        "cancel",
+    ),
+    "ready": (
+        "https://sfpl.bibliocommons.com/holds/index/ready_for_pickup",
+        "holds",
+        "holdsId",
+        "cancel",
+    ),
+    "checkouts": (
+        "https://sfpl.bibliocommons.com/checkedout",
+        "checkouts",
+        "checkoutId",
+        "renew",
+    ),
+}
+
+token_regex = re.compile(
+    r'<(?:input[^>]*\bname="authenticity_token"[^>]*\bvalue'
+    r'|meta[^>]*\bname="csrf-token"[^>]*\bcontent)="([^"]*)"'
+)
+
+
+class _CirculationPage:
+    """A parsed holds or checkouts page."""
+
+    __slots__ = ("books", "fetched", "items", "records", "token")
+
+    def __init__(self, books, records, items, token):
+        self.books = books
+        self.records = records
+        self.items = items
+        self.token = token
+        self.fetched = time.monotonic()
+
+    @property
+    def age(self):
+        return time.monotonic() - self.fetched
+
+    def record(self, key):
+        return self.records.get(key)
+
+    def item(self, book):
+        # The ID of the book's hold or checkout, None if it doesn't allow the
+        # page's action, or _MISSING if the book isn't on the page.
+        self.requireBooks()
+        return self.items.get(book._id, _MISSING)
+
+    def requireBooks(self):
+        if self.books is None:
+            raise exceptions.NotLoggedIn
+        return self.books
+
+    def requireToken(self):
+        if self.token is None:
+            raise exceptions.NotLoggedIn
+        return self.token
+
+
+class AccountSnapshot:
+    """An account's parsed holds and checkouts, indexed for lookups.
+
+    Each page is parsed once and its hold and checkout records are indexed
+    by book ID and by metadata ID. Renewals and hold cancellations look books
+    up here instead of loading the page again, and invalidate the page they
+    change.
+    """
+
+    def __init__(self):
+        self._pages = dict.fromkeys(CIRCULATION_PAGES)
+        self._lock = threading.Lock()
+
+    def page(self, kind):
+        with self._lock:
+            return self._pages[kind]
+
+    def store(self, kind, page):
+        with self._lock:
+            self._pages[kind] = page
+
+    def invalidate(self, kind=None):
+        """Marks a page as out of date, so it's loaded again on next use.
+
+        Args:
+            kind (str, optional): ``"holds"``, ``"ready"`` or ``"checkouts"``.
+                Defaults to every page.
+        """
+        with self._lock:
+            for name in [kind] if kind else CIRCULATION_PAGES:
+                self._pages[name] = None
+
+    def _books(self, kind):
+        page = self.page(kind)
+        return None if page is None else page.books
+
+    @property
+    def holds(self):
+        """list: The held Book objects, or None if they aren't loaded."""
+        return self._books("holds")
+
+    @property
+    def checkouts(self):
+        """list: The checked out Book objects, or None if they aren't loaded."""
+        return self._books("checkouts")
+
+    def _record(self, kinds, key):
+        key = key._id if isinstance(key, Book) else key
+
+        for kind in kinds:
+            page = self.page(kind)
+            record = None if page is None else page.record(key)
+            if record is not None:
+                return record
+
+        return None
+
+    @property
+    def ready(self):
+        """list: The Book objects ready for pickup, or None if they aren't loaded."""
+        return self._books("ready")
+
+    def hold(self, key):
+        """Gets the hold record for a book.
+
+        Args:
+            key: A Book, a book ID or a metadata ID.
+
+        Returns:
+            dict: The hold record from the page's JSON data, or None.
+        """
+        return self._record(("holds", "ready"), key)
+
+    def checkout(self, key):
+        """Gets the checkout record for a book.
+
+        Args:
+            key: A Book, a book ID or a metadata ID.
+
+        Returns:
+            dict: The checkout record from the page's JSON data, or None.
+        """
+        return self._record(("checkouts",), key)
+
+    def token(self, kind):
+        """Gets the authenticity token from a page.
+
+        Args:
+            kind (str): ``"holds"``, ``"ready"`` or ``"checkouts"``.
+
+        Returns:
+            str: The token, or None if the page isn't loaded or has none.
+        """
+        page = self.page(kind)
+        return None if page is None else page.token
+
+    def age(self, kind):
+        """Gets how long ago a page was loaded.
+
+        Args:
+            kind (str): ``"holds"``, ``"ready"`` or ``"checkouts"``.
+
+        Returns:
+            float: The age in seconds, or None if the page isn't loaded.
+        """
+        page = self.page(kind)
+        return None if page is None else page.age
+
+
+class AccountSummary:
+    """An account's holds and checkouts, with the views a daily report needs.
+
+    Attributes:
+        holds (list): Books on hold that aren't ready yet.
+        ready (list): Books ready for pickup, the soonest to expire first.
+        checkouts (list): Checked out books.
+        dueSoon (list): Checked out books that are due within ``due_within``
+            days or overdue, the soonest due first.
+        dueDates (dict): Maps the IDs of checked out books to their due dates.
+        pickupDates (dict): Maps the IDs of books ready for pickup to the
+            last day they can be picked up, if known.
+    """
+
+    def __init__(self, pages, due_within, today):
+        self.holds = list(pages["holds"].requireBooks())
+        self.checkouts = list(pages["checkouts"].requireBooks())
+        self.dueDates = self._dates(pages["checkouts"], self.checkouts, "dueDate")
+
+        ready = pages["ready"]
+        self.pickupDates = self._dates(ready, ready.requireBooks(), "pickupByDate")
+        self.ready = sorted(
+            ready.requireBooks(),
+            key=lambda book: self.pickupDates.get(book._id, datetime.date.max),
+        )
+
+        last_day = today + datetime.timedelta(days=due_within)
+        self.dueSoon = sorted(
+            (
+                book
+                for book in self.checkouts
+                if book._id in self.dueDates and self.dueDates[book._id] <= last_day
+            ),
+            key=lambda book: self.dueDates[book._id],
+        )
+
+    @staticmethod
+    def _dates(page, books, field):
+        dates = {}
+
+        for book in books:
+            value = (page.record(book._id) or {}).get(field)
+            try:
+                dates[book._id] = datetime.date.fromisoformat(value[:10])
+            except (TypeError, ValueError):
+                pass
+
+        return dates
+
+
+def _parseCirculation(kind, response_text, client, book_class=None):
+    _, entity, id_field, action = CIRCULATION_PAGES[kind]
+    match = token_regex.search(response_text)
+    token = match.group(1) if match else None
+
+    with trace.span(f"parse {kind}"):
+        try:
+            data = _extract_data(response_text)
+        except exceptions.MissingScriptError:
+            return _CirculationPage(None, {}, {}, token)
+
+        if entity == "holds":
+            books = Account._holdsFromData(data, client, book_class)
+        else:
+            books = Account._checkoutsFromData(data, client, book_class)
+
+        records = {}
+        items = {}
+
+        for record in data["entities"].get(entity, {}).values():
+            _id = Book.metaDataIdToId(record["metadataId"])
+            records[_id] = records[record["metadataId"]] = record
+            actionable = action in record.get("actions", ())
+            items[_id] = record[id_field] if actionable else None
+
+    return _CirculationPage(books, records, items, token)
 
 
 class Book:
@@ -499,30 +1358,114 @@ class Book:
         subtitle (str): The subtitle of the book.
         _id (str): SFPL's id for the book.
         status (str): The book's status, if applicable. (e.g. duedate, hold position)
+        client (Client): The client requests are sent with.
     """
 
-    def __init__(self, data_dict, status=None):
+    __slots__ = ("_id", "author", "client", "status", "subtitle", "title")
+
+    def __init__(self, data_dict, status=None, client=None):
         self.title = data_dict["title"]
-        self.author = data_dict["author"]
-        self.subtitle = data_dict["subtitle"]
+        self.author = _intern(data_dict["author"])
+        self.subtitle = _intern(data_dict["subtitle"])
         self._id = data_dict["_id"]
 
-        self.status = status
+        self.status = _intern(status)
+        self.client = client or get_default_client()
+
+    @classmethod
+    def fromBib(
+        cls, bib, status=None, client=None, metadata_id=None, all_authors=False
+    ):
+        """Creates a book straight from a bib record in a page's JSON data.
+
+        Args:
+            bib (dict): The bib record, with a ``briefInfo`` entry.
+            status (str, optional): The book's status.
+            client (Client, optional): The client to send requests with.
+                Defaults to the shared client.
+            metadata_id (str, optional): The record's metadata ID, if the
+                record doesn't have an ``id`` entry.
+            all_authors (bool, optional): Whether the author is every author
+                joined with " & ", rather than just the first one.
+
+        Returns:
+            Book: The book.
+        """
+        info = bib["briefInfo"]
+        authors = info["authors"]
+
+        if all_authors:
+            author = " & ".join(authors)
+        else:
+            author = authors[0] if authors else None
+
+        book = cls.__new__(cls)
+        book.title = info["title"]
+        book.author = _intern(author)
+        book.subtitle = _intern(info["subtitle"])
+        book._id = cls.metaDataIdToId(metadata_id or bib["id"])
+        book.status = _intern(status)
+        book.client = client or get_default_client()
+        return book
 
     def getDetails(self):
         """Get the book's details.
 
+        Returns:
+            dict: Book details. They may be shared with other callers when the
+                client memoizes them, so they shouldn't be modified.
+        """
+        memo = self.client.memo
+
+        if memo is None:
+            return self._fetchDetails()
+
+        return memo.details.get_or_compute(self._id, self._fetchDetails)
+
+    def _fetchDetails(self):
+        return self.parseDetails(
+            self.client.get(f"https://sfpl.bibliocommons.com/item/show/{self._id}").text
+        )
+
+    @staticmethod
+    def getDetailsMany(books, concurrency=4) -> list["Outcome"]:
+        """Gets the details of many books at once.
+
+        Args:
+            books (iterable): Book objects to get the details of.
+            concurrency (int, optional): Number of detail pages to fetch at once.
+
+        Returns:
+            list: An Outcome for each book, in the order given, whose value is
+                the book's details or whose error is why they couldn't be fetched.
+        """
+        books = list(books)
+
+        def getDetails(book):
+            try:
+                return Outcome(book, value=book.getDetails())
+            except DETAILS_ERRORS as exc:
+                return Outcome(book, error=exc)
+
+        if concurrency <= 1 or len(books) <= 1:
+            return [getDetails(book) for book in books]
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(books))) as executor:
+            return list(executor.map(getDetails, books))
+
+    @staticmethod
+    @trace.traced("parse details")
+    def parseDetails(response_text: str) -> dict:
+        """Parses the details from a book's page.
+
+        Args:
+            response_text (str): The HTML of the book's page.
+
         Returns:
             dict: Book details.
         """
         return next(
-            iter(
-                _extract_data(
-                    requests.get(
-                        f"https://sfpl.bibliocommons.com/item/show/{self._id}"
-                    ).text,
-                )["entities"]["catalogBibs"].values()
-            )
+            iter(_extract_data(response_text)["entities"]["catalogBibs"].values())
         )
 
     @staticmethod
@@ -561,10 +1504,12 @@ class Book:
         return f"{self.title} by {self.author}" if self.author else self.title
 
     def __eq__(self, other):
+        if not isinstance(other, Book):
+            return NotImplemented
         return self._id == other._id
 
-    def __ne__(self, other):
-        return self._id != other._id
+    def __hash__(self):
+        return hash(self._id)
 
 
 class Search:
@@ -575,9 +1520,18 @@ class Search:
         _type(str): The type of search.
         format (str): Format filter, if set.
         sort (str): Sort mode, if set.
+        client (Client): The client requests are sent with.
     """
 
-    def __init__(self, term, _type="keyword", format=None, sort=None, on_order=None):
+    def __init__(
+        self,
+        term,
+        _type="keyword",
+        format=None,
+        sort=None,
+        on_order=None,
+        client=None,
+    ):
         """
         Args:
             term (str): Search term.
@@ -585,10 +1539,13 @@ class Search:
             format(str, optional): Media format filter.
             sort(str, optional): Sort order for results.
             on_order(bool, optional): Filter by on-order status (True for on-order, False for available now).
+            client(Client, optional): The client to send requests with. Defaults to the shared client.
 
         Raises:
             InvalidSearchType: If the search type is not valid.
         """
+        self.client = client or get_default_client()
+
         if _type.lower() in ["keyword", "title", "author", "subject", "tag", "list"]:
             self.term = term
             self._type = _type.lower()
@@ -599,118 +1556,73 @@ class Search:
         else:
             raise exceptions.InvalidSearchType(_type.lower())
 
-    def getResults(self, pages=1) -> Generator[list["Book"], None, None]:
+    def getResults(
+        self, pages=1, start_page=1, concurrency=1
+    ) -> Generator[list["Book"], None, None]:
         """Gets the results of the search.
 
         Args:
-            pages(int): Number of pages to get.
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from, for resuming a crawl.
+            concurrency(int): Number of pages to fetch at once. Pages after the
+                first are prefetched in the background but still yielded in order.
 
         Yields:
             list: A list of books or lists on the page.
         """
-        if self._type in ["keyword", "title", "author", "subject", "tag"]:
-            for x in range(1, pages + 1):
-                query = "+".join(self.term.split())
-                url = f"https://sfpl.bibliocommons.com/v2/search?page={x}&query={query}&searchType={self._type}"
-                if self.format:
-                    url += f"&f_FORMAT={self.format}"
-                if self.sort:
-                    url += f"&sort={self.sort}"
-                if self.on_order is True:
-                    url += "&f_ON_ORDER=true"
-                elif self.on_order is False:
-                    url += "&f_ON_ORDER=false"
-                resp = requests.get(url)
-                soup = BeautifulSoup(resp.text, "lxml")
-                pages_element = soup.find(string=re.compile(book_page_regex))
-
-                if not pages_element:
-                    return
-
-                pages = (
-                    re.match(book_page_regex, pages_element).group(1).replace(",", "")
-                )
+        return _iter_pages(self._getPage, pages, start_page, concurrency)
 
-                if math.ceil(int(pages) / 10) < x:
-                    return
-
-                bib_data = json.loads(soup.find(type="application/json").text)[
-                    "entities"
-                ]["bibs"]
-
-                books = []
-
-                for book in bib_data:
-                    authors = bib_data[book]["briefInfo"]["authors"]
-                    b = Book(
-                        {
-                            "title": bib_data[book]["briefInfo"]["title"],
-                            "author": authors[0] if authors else None,
-                            "subtitle": bib_data[book]["briefInfo"]["subtitle"],
-                            "_id": Book.metaDataIdToId(book),
-                        }
-                    )
-                    books.append(b)
-
-                yield books
-
-        elif self._type == "list":
-            for x in range(1, pages + 1):
-                resp = requests.get(
-                    f"https://sfpl.bibliocommons.com/search?page={x}&q={self.term}&search_category=userlist&t=userlist"
-                )
+    def getFrame(self, pages=1, start_page=1, concurrency=1) -> BookFrame:
+        """Gets the results of a book search by column, without a Book object per result.
+
+        Args:
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from, for resuming a crawl.
+            concurrency(int): Number of pages to fetch at once.
+
+        Returns:
+            BookFrame: The books on every page, in order.
+
+        Raises:
+            ValueError: If this is a search for lists.
+        """
+        if self._type == "list":
+            raise ValueError("getFrame only supports book searches")
+
+        return BookFrame.concat(
+            _iter_pages(self._getFramePage, pages, start_page, concurrency)
+        )
 
-                soup = BeautifulSoup(resp.text, "lxml")
-
-                if (
-                    math.ceil(
-                        int(
-                            re.match(
-                                list_page_regex,
-                                str(
-                                    soup.find(string=re.compile(list_page_regex))
-                                ).strip(),
-                            )
-                            .group(1)
-                            .replace(",", "")
-                        )
-                        / 25
-                    )
-                    < x
-                ):
-                    return
-
-                yield [
-                    List(
-                        {
-                            "type": _list.find(class_="list_type small").text.strip(),
-                            "title": _list.find(class_="title").text,
-                            "user": User(
-                                _list.find(class_="username").text,
-                                _list.find(class_="username")["href"].split("/")[4],
-                            )
-                            if not _list.find(class_="username muted")
-                            else _list.find(class_="username muted").text.strip(),
-                            "createdon": _list.find(
-                                class_="dataPair clearfix small list_created_date"
-                            )
-                            .find(class_="value")
-                            .text,
-                            "itemcount": int(
-                                _list.find(class_="list_item_count").text.replace(
-                                    "items", ""
-                                )
-                            ),
-                            "description": _list.find(
-                                class_="description"
-                            ).text.replace("\n", ""),
-                            "id": _list.find(class_="title")
-                            .find("a")["href"]
-                            .split("/")[4],
-                        }
-                    )
-                    for _list in soup(class_="col-xs-12 col-sm-4 cp_user_list_item")
-                ]
+    def _getPage(self, page):
+        return self._parsePage(self.client.get(self._pageUrl(page)).text)
+
+    def _getFramePage(self, page):
+        total, frame = _parse_search_frame(self.client.get(self._pageUrl(page)).text)
+        return _last_page(total, 10), frame
+
+    def _parsePage(self, response_text):
+        if self._type == "list":
+            total, lists = _parse_list_page(response_text, client=self.client)
+            return _last_page(total, 25), lists
+
+        total, books = _parse_search_page(response_text, client=self.client)
+        return _last_page(total, 10), books
+
+    def _pageUrl(self, page):
+        if self._type == "list":
+            return f"https://sfpl.bibliocommons.com/search?page={page}&q={self.term}&search_category=userlist&t=userlist"
+
+        query = "+".join(self.term.split())
+        url = f"https://sfpl.bibliocommons.com/v2/search?page={page}&query={query}&searchType={self._type}"
+        if self.format:
+            url += f"&f_FORMAT={self.format}"
+        if self.sort:
+            url += f"&sort={self.sort}"
+        if self.on_order is True:
+            url += "&f_ON_ORDER=true"
+        elif self.on_order is False:
+            url += "&f_ON_ORDER=false"
+        return url
 
     def __str__(self):
         return f"Search Type: {self._type} Search Term {self.term}"
@@ -732,15 +1644,25 @@ class AdvancedSearch:
         query(str): The formatted query.
         format(str): Format filter, if set.
         sort(str): Sort mode, if set.
+        client(Client): The client requests are sent with.
     """
 
-    def __init__(self, exclusive=True, format=None, sort=None, on_order=None, **kwargs):
+    def __init__(
+        self,
+        exclusive=True,
+        format=None,
+        sort=None,
+        on_order=None,
+        client=None,
+        **kwargs,
+    ):
         """
         Args:
             exclusive (bool): Whether or not to include all results that match or any that match.
             format (str, optional): Media format filter.
             sort (str, optional): Sort order for results.
             on_order(bool, optional): Filter by on-order status (True for on-order, False for available now).
+            client (Client, optional): The client to send requests with. Defaults to the shared client.
             **kwargs: Search terms including one of 'include' or 'exclude' and one type such as 'keyword' or 'author'.
                       An example kwarg would be: includeauthor='J.K Rowling' or excludekeyword='Chamber'.
                       You can include multiple of the same type with includekeyword1='Chamber' and includekeyword2='Secrets'.
@@ -748,6 +1670,7 @@ class AdvancedSearch:
         Raises:
             MissingFilterTerm: If the term is missing a required part.
         """
+        self.client = client or get_default_client()
         self.format = format
         self.sort = sort
         self.on_order = on_order
@@ -797,11 +1720,14 @@ class AdvancedSearch:
             " -" + "-".join(exclude) if exclude else "",
         )
 
-    def getResults(self, pages=1):
+    def getResults(self, pages=1, start_page=1, concurrency=1):
         """Generator that yields a stream of results.
 
         Args:
-            pages(int): Number of pages to get.
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from, for resuming a crawl.
+            concurrency(int): Number of pages to fetch at once. Pages after the
+                first are prefetched in the background but still yielded in order.
 
         Yields:
             list: A list of books on the page.
@@ -812,48 +1738,45 @@ class AdvancedSearch:
             >>> next(stream)
             [Fantastic Beasts and Where to Find Them by Rowling, J. K., Fantastic Beasts and Where to Find Them : The Original Screenplay by Rowling, J. K., The Casual Vacancy by Rowling, J. K., Very Good Lives by Rowling, J. K., Animales fantásticos y dónde encontrarlos by Rowling, J. K.]
         """
-        for x in range(1, pages + 1):
-            url = f"https://sfpl.bibliocommons.com/v2/search?page={x}&query={self.query}&searchType=bl"
-            if self.format:
-                url += f"&f_FORMAT={self.format}"
-            if self.sort:
-                url += f"&sort={self.sort}"
-            if self.on_order is True:
-                url += "&f_ON_ORDER=true"
-            elif self.on_order is False:
-                url += "&f_ON_ORDER=false"
-            resp = requests.get(url)
-
-            soup = BeautifulSoup(resp.text, "lxml")
-            pages_element = soup.find(string=re.compile(book_page_regex))
-
-            if not pages_element:
-                return
+        return _iter_pages(self._getPage, pages, start_page, concurrency)
 
-            pages = re.match(book_page_regex, pages_element).group(1).replace(",", "")
+    def getFrame(self, pages=1, start_page=1, concurrency=1) -> BookFrame:
+        """Gets the results by column, without a Book object per result.
 
-            if math.ceil(int(pages) / 10) < x:
-                return
+        Args:
+            pages(int or str): Number of pages to get, or "all" for every page.
+            start_page(int): The page to start from, for resuming a crawl.
+            concurrency(int): Number of pages to fetch at once.
 
-            bib_data = json.loads(soup.find(type="application/json").text)["entities"][
-                "bibs"
-            ]
-
-            books = []
-
-            for book in bib_data:
-                authors = bib_data[book]["briefInfo"]["authors"]
-                b = Book(
-                    {
-                        "title": bib_data[book]["briefInfo"]["title"],
-                        "author": authors[0] if authors else None,
-                        "subtitle": bib_data[book]["briefInfo"]["subtitle"],
-                        "_id": Book.metaDataIdToId(book),
-                    }
-                )
-                books.append(b)
+        Returns:
+            BookFrame: The books on every page, in order.
+        """
+        return BookFrame.concat(
+            _iter_pages(self._getFramePage, pages, start_page, concurrency)
+        )
 
-            yield books
+    def _getPage(self, page):
+        return self._parsePage(self.client.get(self._pageUrl(page)).text)
+
+    def _getFramePage(self, page):
+        total, frame = _parse_search_frame(self.client.get(self._pageUrl(page)).text)
+        return _last_page(total, 10), frame
+
+    def _parsePage(self, response_text):
+        total, books = _parse_search_page(response_text, client=self.client)
+        return _last_page(total, 10), books
+
+    def _pageUrl(self, page):
+        url = f"https://sfpl.bibliocommons.com/v2/search?page={page}&query={self.query}&searchType=bl"
+        if self.format:
+            url += f"&f_FORMAT={self.format}"
+        if self.sort:
+            url += f"&sort={self.sort}"
+        if self.on_order is True:
+            url += "&f_ON_ORDER=true"
+        elif self.on_order is False:
+            url += "&f_ON_ORDER=false"
+        return url
 
     def __str__(self):
         return self.query
@@ -879,13 +1802,26 @@ class List:
         itemcount (int): the number of books in the list.
         description (str): a description of the list.
         _id (str): SFPL's id for the list.
+        client (Client): The client requests are sent with.
     """
 
-    def __init__(self, data_dict):
-        self._type = data_dict["type"]
+    __slots__ = (
+        "_id",
+        "_type",
+        "client",
+        "createdOn",
+        "description",
+        "itemcount",
+        "title",
+        "user",
+    )
+
+    def __init__(self, data_dict, client=None):
+        self.client = client or get_default_client()
+        self._type = _intern(data_dict["type"])
         self.title = data_dict["title"]
         self.user = data_dict["user"]
-        self.createdOn = data_dict["createdon"]
+        self.createdOn = _intern(data_dict["createdon"])
         self.itemcount = data_dict["itemcount"]
         self.description = data_dict["description"]
         self._id = data_dict["id"]
@@ -902,13 +1838,13 @@ class List:
                     "_id": int(
                         "".join(s for s in book.find("a")["href"] if s.isdigit())
                     ),
-                }
+                },
+                client=self.client,
             )
-            for book in BeautifulSoup(
-                requests.get(
+            for book in _soup(
+                self.client.get(
                     f"https://sfpl.bibliocommons.com/list/share/{self.user._id}_{self.user.name}/{self._id}"
-                ).text,
-                "lxml",
+                ).text
             )(class_="listItem bg_white col-xs-12")
         ]
 
@@ -919,10 +1855,12 @@ class List:
         return self.title
 
     def __eq__(self, other):
+        if not isinstance(other, List):
+            return NotImplemented
         return self._id == other._id
 
-    def __ne__(self, other):
-        return self._id != other._id
+    def __hash__(self):
+        return hash(self._id)
 
 
 class Branch:
@@ -931,6 +1869,7 @@ class Branch:
     Attributes:
         name (str): The name of the library branch.
         _id (str): SFPL's ID for the library branch.
+        client (Client): The client requests are sent with.
     """
 
     BRANCHES: ClassVar[dict[str, str]] = {
@@ -967,15 +1906,28 @@ class Branch:
         "western addition": "44563150",
     }
 
-    def __init__(self, name):
+    # Hours of every branch by client, with the local date they were fetched.
+    _all_hours: ClassVar[weakref.WeakKeyDictionary] = weakref.WeakKeyDictionary()
+    _all_hours_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    __slots__ = ("_id", "client", "name")
+
+    def __init__(self, name, client=None):
         """
         Args:
             name (str): Name of library branch to match.
+            client (Client, optional): The client to send requests with.
+                Defaults to the shared client.
 
         Raises:
             NoBranchFound: No matches for the given name were found.
         """
-        for branch in Branch.BRANCHES:
+        self.client = client or get_default_client()
+
+        # An exact name wins over a partial one, so "park" isn't "glen park".
+        exact = [name.lower()] if name.lower() in Branch.BRANCHES else []
+
+        for branch in exact or Branch.BRANCHES:
             if name.lower() in branch.lower():
                 self.name = branch
                 self._id = Branch.BRANCHES[self.name]
@@ -988,12 +1940,90 @@ class Branch:
         """Get the operating hours of the library.
 
         Returns:
-            dict: A dictionary mapping days of the week to operating hours.
+            dict: A dictionary mapping days of the week to operating hours. It
+                may be shared with other callers when the client memoizes it,
+                so it shouldn't be modified.
         """
-        branch = self.name.replace(" children's", "").replace(" ", "-").lower()
-        response = requests.get(f"https://sfpl.org/locations/{branch}")
+        memo = self.client.memo
+
+        if memo is None:
+            return self._fetchHours()
+
+        return memo.hours.get_or_compute(self._id, self._fetchHours)
+
+    def _fetchHours(self):
+        response = self.client.get(self._hoursUrl())
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "lxml")
+        return self.parseHours(response.text)
+
+    @staticmethod
+    def getAllHours(
+        client=None, concurrency=8, refresh=False
+    ) -> dict[str, dict[str, str]]:
+        """Gets the operating hours of every branch at once.
+
+        Branches that share a page, such as the children's libraries, are only
+        fetched once. The result is kept until the local date changes.
+
+        Args:
+            client (Client, optional): The client to send requests with.
+                Defaults to the shared client.
+            concurrency (int, optional): Number of branch pages to fetch at once.
+            refresh (bool, optional): Whether to fetch the hours even if they
+                were already fetched today.
+
+        Returns:
+            dict: Maps each name in ``Branch.BRANCHES`` to a dictionary mapping
+                days of the week to operating hours. The hour dictionaries may
+                be shared, so they shouldn't be modified.
+        """
+        client = client or get_default_client()
+        today = datetime.date.today()
+
+        with Branch._all_hours_lock:
+            cached = Branch._all_hours.get(client)
+
+        if cached is not None and cached[0] == today and not refresh:
+            return dict(cached[1])
+
+        branches = [Branch(name, client=client) for name in Branch.BRANCHES]
+        pages = {}
+
+        for branch in branches:
+            pages.setdefault(branch._hoursUrl(), branch)
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(concurrency, len(pages)))
+        ) as executor:
+            hours = dict(zip(pages, executor.map(Branch._fetchHours, pages.values())))
+
+        result = {branch.name: hours[branch._hoursUrl()] for branch in branches}
+
+        if client.memo is not None:
+            for branch in branches:
+                client.memo.hours.put(branch._id, result[branch.name])
+
+        with Branch._all_hours_lock:
+            Branch._all_hours[client] = (today, result)
+
+        return dict(result)
+
+    def _hoursUrl(self):
+        branch = self.name.replace(" children's", "").replace(" ", "-").lower()
+        return f"https://sfpl.org/locations/{branch}"
+
+    @staticmethod
+    @trace.traced("parse hours")
+    def parseHours(response_text: str) -> dict[str, str]:
+        """Parses the operating hours from a branch's page.
+
+        Args:
+            response_text (str): The HTML of the branch's page.
+
+        Returns:
+            dict: A dictionary mapping days of the week to operating hours.
+        """
+        soup = _soup(response_text)
         result = {}
 
         for day in soup.select(".office-hours__item"):
@@ -1010,7 +2040,9 @@ class Branch:
         return self.name
 
     def __eq__(self, other):
-        return self.name == other.name
+        if not isinstance(other, Branch):
+            return NotImplemented
+        return self._id == other._id
 
-    def __ne__(self, other):
-        return self.name != other.name
+    def __hash__(self):
+        return hash(self._id)
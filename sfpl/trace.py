@@ -0,0 +1,296 @@
+"""Timing of requests and parse stages.
+
+While a :class:`Tracer` is active, every request a :class:`Client` sends and
+every parse stage (slicing out the JSON island, decoding it, building a
+BeautifulSoup tree, and the parsers built on them) is recorded as a
+:class:`Span`. A tracer can summarize its spans as a per-stage table, write
+them in the Chrome trace-event format for ``chrome://tracing`` or Perfetto,
+or pass each one to hooks as it finishes. When no tracer is active, a
+:func:`traced` function costs one global lookup per call, and a :func:`span`
+block costs entering and leaving a generator-based context manager, a
+microsecond or two; both are small beside the request or parse they time.
+"""
+
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlsplit
+
+_active = None
+
+number_segment_regex = re.compile(r"/\d+(?=/|$)")
+
+
+def activate(tracer):
+    """Makes a tracer record the spans of every thread.
+
+    Args:
+        tracer (Tracer): The tracer, or None to stop tracing.
+
+    Returns:
+        Tracer: The tracer that was active before, if any.
+    """
+    global _active
+
+    previous, _active = _active, tracer
+    return previous
+
+
+def active():
+    """Gets the active tracer.
+
+    Returns:
+        Tracer: The tracer, or None if nothing is being traced.
+    """
+    return _active
+
+
+def url_template(url):
+    """Gets a URL's path and query parameter names, with IDs in the path replaced.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        str: The template, e.g. ``/item/show/{id}`` or ``/v2/search?page&query``.
+    """
+    parts = urlsplit(url)
+    path = number_segment_regex.sub("/{id}", parts.path)
+    names = dict.fromkeys(
+        name for name, _ in parse_qsl(parts.query, keep_blank_values=True)
+    )
+    return path + ("?" + "&".join(names) if names else "")
+
+
+class Span:
+    """A timed stage.
+
+    Attributes:
+        name (str): The stage, e.g. ``"GET /user_dashboard"`` or ``"json decode"``.
+        category (str): ``"http"`` for requests, ``"wait"`` for time spent held
+            back by a rate limiter or backing off before a retry, or ``"parse"`` for parse stages.
+        start (float): When the stage started, as a ``time.perf_counter`` value.
+        end (float): When the stage ended, or None while it is running.
+        thread (int): The ID of the thread that ran the stage.
+        attributes (dict): Details of the stage. Request spans have the
+            ``method``, ``url``, response ``status``, body size in ``bytes``
+            and time to first byte in seconds, ``ttfb``.
+    """
+
+    __slots__ = ("attributes", "category", "end", "name", "start", "thread")
+
+    def __init__(self, name, category, attributes):
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration(self):
+        """float: How long the stage took, in seconds."""
+        return (self.end or time.perf_counter()) - self.start
+
+    def __repr__(self):
+        return f"<Span {self.name}: {self.duration * 1000:.1f} ms>"
+
+
+@contextmanager
+def span(name, category="parse", **attributes):
+    """Times a stage, if a tracer is active.
+
+    Args:
+        name (str): The stage.
+        category (str, optional): ``"http"``, ``"wait"`` or ``"parse"``.
+        **attributes: Details of the stage.
+
+    Yields:
+        Span: The span, to add attributes to, or None if nothing is being traced.
+    """
+    tracer = _active
+
+    if tracer is None:
+        yield None
+        return
+
+    current = Span(name, category, attributes)
+    try:
+        yield current
+    finally:
+        current.end = time.perf_counter()
+        tracer.add(current)
+
+
+def traced(name):
+    """Decorates a function so each call is timed as a parse stage.
+
+    Args:
+        name (str): The stage.
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class Tracer:
+    """Records spans while it is active.
+
+    Use it as a context manager, or pass it to :func:`activate`.
+
+    Attributes:
+        spans (list): The finished spans, in the order they finished.
+        hooks (list): Functions called with each span as it finishes.
+    """
+
+    def __init__(self, hooks=None):
+        """
+        Args:
+            hooks (iterable, optional): Functions to call with each span as it
+                finishes. They may be called from any thread.
+        """
+        self.spans = []
+        self.hooks = list(hooks or [])
+        self.origin = time.perf_counter()
+
+        self._lock = threading.Lock()
+        self._previous = None
+
+    def add(self, finished):
+        """Records a finished span and passes it to the hooks.
+
+        Args:
+            finished (Span): The span.
+        """
+        with self._lock:
+            self.spans.append(finished)
+
+        for hook in self.hooks:
+            hook(finished)
+
+    def summary(self):
+        """Totals the spans by stage.
+
+        Returns:
+            dict: Maps each stage, in the order it first started, to its
+                ``category``, number of ``calls``, ``total``, ``mean`` and
+                ``max`` time in seconds, and for requests the mean ``ttfb``
+                and total ``bytes``.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda finished: finished.start)
+
+        stages = {}
+
+        for finished in spans:
+            stage = stages.setdefault(
+                finished.name,
+                {"category": finished.category, "calls": 0, "total": 0.0, "max": 0.0},
+            )
+            stage["calls"] += 1
+            stage["total"] += finished.duration
+            stage["max"] = max(stage["max"], finished.duration)
+
+            if finished.category == "http":
+                stage["ttfb"] = stage.get("ttfb", 0.0) + finished.attributes.get(
+                    "ttfb", 0.0
+                )
+                stage["bytes"] = stage.get("bytes", 0) + finished.attributes.get(
+                    "bytes", 0
+                )
+
+        for stage in stages.values():
+            stage["mean"] = stage["total"] / stage["calls"]
+            if "ttfb" in stage:
+                stage["ttfb"] /= stage["calls"]
+
+        return stages
+
+    def format_table(self):
+        """Formats the summary as a table.
+
+        Stages can contain each other, e.g. ``parse holds`` contains
+        ``json decode``, so totals don't add up to the wall time.
+
+        Returns:
+            str: The table, one line per stage.
+        """
+        stages = self.summary()
+        width = max([len("stage"), *map(len, stages)])
+        header = (
+            f"{'stage':<{width}}  {'calls':>5}  {'total ms':>9}  {'mean ms':>9}"
+            f"  {'max ms':>9}  {'ttfb ms':>9}  {'bytes':>10}"
+        )
+        lines = [header]
+
+        for name, stage in stages.items():
+            ttfb = f"{stage['ttfb'] * 1000:.1f}" if "ttfb" in stage else ""
+            size = str(stage["bytes"]) if "bytes" in stage else ""
+            lines.append(
+                f"{name:<{width}}  {stage['calls']:>5}  {stage['total'] * 1000:>9.1f}"
+                f"  {stage['mean'] * 1000:>9.1f}  {stage['max'] * 1000:>9.1f}"
+                f"  {ttfb:>9}  {size:>10}"
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self):
+        """Converts the spans to the Chrome trace-event format.
+
+        Returns:
+            dict: A trace with a complete (``"X"``) event per span.
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": finished.name,
+                    "cat": finished.category,
+                    "ph": "X",
+                    "ts": round((finished.start - self.origin) * 1e6, 1),
+                    "dur": round(finished.duration * 1e6, 1),
+                    "pid": pid,
+                    "tid": finished.thread,
+                    "args": finished.attributes,
+                }
+                for finished in spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_chrome_trace(self, path):
+        """Writes the spans to a file in the Chrome trace-event format.
+
+        Args:
+            path (str): The file.
+        """
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+    def __enter__(self):
+        self._previous = activate(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        activate(self._previous)
+        self._previous = None
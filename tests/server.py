@@ -0,0 +1,174 @@
+"""A local stand-in for the SFPL websites, for tests that make real requests."""
+
+import codecs
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+ASSETS = os.path.join(os.path.abspath(os.path.dirname(__file__)), "assets")
+
+
+def asset(name):
+    with codecs.open(os.path.join(ASSETS, name), encoding="utf-8") as mockup:
+        return mockup.read()
+
+
+def json_island(data):
+    return (
+        f'<script type="application/json" data-iso-key="_0">{json.dumps(data)}</script>'
+    )
+
+
+def search_page(page, total, per_page=10):
+    first = (page - 1) * per_page + 1
+    last = min(page * per_page, total)
+    bibs = {
+        f"S93C{n}": {
+            "briefInfo": {"title": f"Book {n}", "subtitle": "", "authors": ["Author"]}
+        }
+        for n in range(first, last + 1)
+    }
+    return (
+        f"<html><body><span>{first} to {last} of {total:,} results</span>"
+        f"{json_island({'entities': {'bibs': bibs}})}</body></html>"
+    )
+
+
+def item_page(_id, token="token"):
+    return (
+        f'<html><body><input name="authenticity_token" value="{token}">'
+        + json_island(
+            {"entities": {"catalogBibs": {_id: {"brief": {"title": f"Book {_id}"}}}}}
+        )
+        + "</body></html>"
+    )
+
+
+def hours_page(hours):
+    items = "".join(
+        '<div class="office-hours__item">'
+        f'<span class="office-hours__item-label">{day}</span>'
+        f'<span class="office-hours__item-slots">{slots}</span></div>'
+        for day, slots in hours.items()
+    )
+    return f"<html><body>{items}</body></html>"
+
+
+def json_response(data, headers=None):
+    return (
+        200,
+        {"Content-Type": "application/json", **(headers or {})},
+        json.dumps(data),
+    )
+
+
+def response(status=200, headers=None):
+    # A received response, for tests that don't send requests.
+    return mock.Mock(status_code=status, headers=headers or {})
+
+
+class Request:
+    """A request received by the stub server."""
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    @property
+    def form(self):
+        return parse_qs(self.body.decode())
+
+    @property
+    def cookies(self):
+        cookies = {}
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name:
+                cookies[name] = value
+        return cookies
+
+
+class StubServer:
+    """A threaded HTTP server that answers requests from a table of routes.
+
+    Routes map ``(method, path)`` to a handler that takes a :class:`Request`
+    and returns ``(status, headers, body)``. Every request is recorded in
+    ``requests``.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.requests = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle_one(self, method):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                request = Request(
+                    method,
+                    parts.path,
+                    parse_qs(parts.query),
+                    self.headers,
+                    self.rfile.read(length),
+                )
+                with stub._lock:
+                    stub.requests.append(request)
+
+                handler = stub.routes.get((method, parts.path))
+                if handler is None:
+                    status, headers, body = 404, {}, "not found"
+                else:
+                    status, headers, body = handler(request)
+
+                if isinstance(body, str):
+                    body = body.encode()
+
+                self.send_response(status)
+                headers = dict(headers)
+                headers.setdefault("Content-Type", "text/html; charset=utf-8")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self.handle_one("GET")
+
+            def do_POST(self):
+                self.handle_one("POST")
+
+            def do_PUT(self):
+                self.handle_one("PUT")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.hosts = {"sfpl.bibliocommons.com": self.url, "sfpl.org": self.url}
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def requested(self, path):
+        with self._lock:
+            return [r for r in self.requests if r.path == path]
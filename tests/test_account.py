@@ -0,0 +1,484 @@
+import datetime
+import io
+import re
+import threading
+import unittest
+from unittest import mock
+
+from sfpl import exceptions
+from sfpl.cli import main
+from sfpl.client import Client
+from sfpl.sfpl import Account, Book, Branch
+
+from .server import StubServer, asset, item_page, json_response
+
+# The library's pages have no authenticity token in their markup.
+CHECKOUTS_TOKEN = '<input name="authenticity_token" value="page-token">'
+HOLDS_TOKEN = '<input name="authenticity_token" value="holds-token">'
+
+
+def book(_id, title=""):
+    return Book({"_id": _id, "title": title, "subtitle": "", "author": ""})
+
+
+class TestRenewMany(unittest.TestCase):
+    def setUp(self):
+        self.refused = set()
+        self.renewed = set()
+        self.unrenewable = set()
+        # Whether a refused batch still renews the items that weren't refused.
+        self.partial = False
+
+        def checkouts(request):
+            page = asset("checkouts.html")
+            for item in self.renewed:
+                page = re.sub(
+                    f'("checkoutId":"{item}".*?"dueDate":")[^"]*',
+                    r"\g<1>2025-06-09",
+                    page,
+                )
+            for item in self.unrenewable:
+                page = re.sub(
+                    f'("checkoutId":"{item}".*?"actions":)\\[[^\\]]*\\]',
+                    r'\g<1>["updateFormat"]',
+                    page,
+                )
+            return 200, {}, page.replace("</body>", CHECKOUTS_TOKEN + "</body>")
+
+        def renew(request):
+            items = request.form["items[]"]
+            if self.refused.intersection(items):
+                if self.partial:
+                    self.renewed.update(set(items) - self.refused)
+                return json_response(
+                    {
+                        "logged_in": True,
+                        "success": False,
+                        "messages": [{"key": "too many renewals"}],
+                    }
+                )
+            return json_response({"logged_in": True, "success": True})
+
+        def confirm(request):
+            item = request.path.rsplit("/", 1)[-1]
+            return json_response(
+                {
+                    "logged_in": True,
+                    "html": '<input name="authenticity_token" value="t2">'
+                    f'<input id="items_" value="{item}">',
+                }
+            )
+
+        routes = {
+            ("POST", "/user/login"): lambda request: json_response({"logged_in": True}),
+            ("GET", "/checkedout"): checkouts,
+            ("POST", "/checkedout/renew"): renew,
+        }
+        for item in (
+            "2200973801354783065",
+            "-543450662176820777",
+            "2844868886065951540",
+        ):
+            routes["GET", f"/checkedout/confirm/{item}"] = confirm
+
+        self.server = StubServer(routes).start()
+        self.client = Client(hosts=self.server.hosts, timeout=5)
+        self.account = Account("card", "1234", client=self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def renewals(self):
+        return [
+            request.form["items[]"]
+            for request in self.server.requested("/checkedout/renew")
+        ]
+
+    def test_books_are_renewed_in_one_request(self):
+        outcomes = self.account.renewMany(
+            [book("1236126093"), book("6223776093"), book("1859091093")]
+        )
+
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        self.assertEqual(len(self.server.requested("/checkedout")), 1)
+        self.assertEqual(
+            self.renewals(),
+            [["-543450662176820777", "2200973801354783065", "2844868886065951540"]],
+        )
+        self.assertEqual(
+            self.server.requested("/checkedout/renew")[0].form["authenticity_token"],
+            ["page-token"],
+        )
+
+    def test_unknown_books_are_reported(self):
+        missing, renewed = self.account.renewMany(
+            [book("404", "Missing"), book("1236126093")]
+        )
+
+        self.assertIsInstance(missing.error, exceptions.NotCheckedOut)
+        self.assertTrue(renewed.ok)
+        self.assertEqual(self.renewals(), [["-543450662176820777"]])
+
+    def test_refused_batch_is_renewed_one_at_a_time(self):
+        self.refused.add("2200973801354783065")
+
+        renewed, refused = self.account.renewMany(
+            [book("1236126093"), book("6223776093")]
+        )
+
+        self.assertTrue(renewed.ok)
+        self.assertIsInstance(refused.error, exceptions.RenewError)
+        self.assertEqual(str(refused.error), "too many renewals")
+        self.assertEqual(
+            self.renewals(),
+            [
+                ["-543450662176820777", "2200973801354783065"],
+                ["-543450662176820777"],
+                ["2200973801354783065"],
+            ],
+        )
+        self.assertEqual(len(self.server.requested("/checkedout")), 2)
+
+    def test_partly_renewed_batch_is_not_renewed_again(self):
+        self.refused.add("2200973801354783065")
+        self.partial = True
+
+        renewed, refused = self.account.renewMany(
+            [book("1236126093"), book("6223776093")]
+        )
+
+        self.assertTrue(renewed.ok)
+        self.assertIsInstance(refused.error, exceptions.RenewError)
+        self.assertEqual(
+            self.renewals(),
+            [
+                ["-543450662176820777", "2200973801354783065"],
+                ["2200973801354783065"],
+            ],
+        )
+
+    def test_renew_all(self):
+        outcomes = self.account.renewAll()
+
+        self.assertEqual(len(outcomes), 9)
+        self.assertIn("Kolyma Tales", [outcome.book.title for outcome in outcomes])
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        [items] = self.renewals()
+        self.assertEqual(len(items), 9)
+        self.assertEqual(len(self.server.requested("/checkedout")), 1)
+
+    def test_renew_all_skips_books_that_cant_be_renewed(self):
+        self.unrenewable.add("-543450662176820777")
+
+        outcomes = self.account.renewAll()
+
+        self.assertEqual(len(outcomes), 8)
+        self.assertNotIn("1236126093", [outcome.book._id for outcome in outcomes])
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        [items] = self.renewals()
+        self.assertNotIn("-543450662176820777", items)
+
+    def test_renew_many_reports_books_that_cant_be_renewed(self):
+        self.unrenewable.add("-543450662176820777")
+
+        [outcome] = self.account.renewMany([book("1236126093")])
+
+        self.assertIsInstance(outcome.error, exceptions.RenewError)
+        self.assertEqual(self.renewals(), [])
+
+    def test_cli_renew_all_succeeds_when_some_books_cant_be_renewed(self):
+        self.unrenewable.add("-543450662176820777")
+        stdout = io.StringIO()
+
+        with mock.patch("sfpl.cli._client", return_value=self.client):
+            status = main(
+                ["account", "renew", "--all"],
+                stdout=stdout,
+                stderr=io.StringIO(),
+                environ={"SFPL_BARCODE": "card", "SFPL_PIN": "1234"},
+            )
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stdout.getvalue().count(": renewed\n"), 8)
+
+        self.refused.add("2200973801354783065")
+        with mock.patch("sfpl.cli._client", return_value=self.client):
+            status = main(
+                ["account", "renew", "--all"],
+                stdout=io.StringIO(),
+                stderr=io.StringIO(),
+                environ={"SFPL_BARCODE": "card", "SFPL_PIN": "1234"},
+            )
+
+        self.assertEqual(status, 1)
+
+
+class TestCancelHolds(unittest.TestCase):
+    def setUp(self):
+        routes = {
+            ("POST", "/user/login"): lambda request: json_response({"logged_in": True}),
+            ("GET", "/holds/index/not_yet_available"): lambda request: (
+                200,
+                {},
+                asset("holds.html").replace("</body>", HOLDS_TOKEN + "</body>"),
+            ),
+            ("POST", "/holds/delete.json"): lambda request: json_response(
+                {"logged_in": True}
+            ),
+        }
+        self.server = StubServer(routes).start()
+        self.client = Client(hosts=self.server.hosts, timeout=5)
+        self.account = Account("card", "1234", client=self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_holds_are_cancelled_in_one_request(self):
+        outcomes = self.account.cancelHolds(
+            [book("7165420093"), book("5842307093"), book("404", "Missing")]
+        )
+
+        self.assertEqual([outcome.ok for outcome in outcomes], [True, True, False])
+        self.assertIsInstance(outcomes[2].error, exceptions.NotOnHold)
+        self.assertEqual(len(self.server.requests), 3)
+        [delete] = self.server.requested("/holds/delete.json")
+        self.assertEqual(
+            delete.form["items[]"], ["8156797030608695005", "7231387993885382121"]
+        )
+        self.assertEqual(delete.form["authenticity_token"], ["holds-token"])
+
+    def test_cancel_hold_raises_for_books_not_on_hold(self):
+        self.account.cancelHold(book("5842307093"))
+
+        with self.assertRaises(exceptions.NotOnHold):
+            self.account.cancelHold(book("404", "Missing"))
+        self.assertEqual(len(self.server.requested("/holds/delete.json")), 1)
+
+
+class TestHoldMany(unittest.TestCase):
+    def setUp(self):
+        self.token = "t1"
+        self.issued = 0
+        self.rotate_after = None
+
+        def show(request):
+            self.issued += 1
+            return 200, {}, item_page(request.path.rsplit("/", 1)[-1], self.token)
+
+        def place(request):
+            if request.form["authenticity_token"] != [self.token]:
+                return 422, {}, "invalid authenticity token"
+            if request.path.endswith("/13"):
+                return json_response(
+                    {
+                        "logged_in": True,
+                        "success": False,
+                        "messages": [{"key": "already on hold"}],
+                    }
+                )
+            if request.path.endswith(f"/{self.rotate_after}"):
+                self.token = "t2"
+            return json_response({"logged_in": True, "success": True})
+
+        routes = {
+            ("POST", "/user/login"): lambda request: json_response({"logged_in": True}),
+        }
+        for _id in map(str, range(10, 20)):
+            routes["GET", f"/item/show/{_id}"] = show
+            routes["POST", f"/holds/place_single_click_hold/{_id}"] = place
+
+        self.server = StubServer(routes).start()
+        self.client = Client(hosts=self.server.hosts, timeout=5)
+        self.account = Account("card", "1234", client=self.client)
+        self.branch = Branch("anza")
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_one_token_is_reused(self):
+        books = [book(str(_id)) for _id in range(10, 20)]
+
+        outcomes = self.account.holdMany(books, self.branch, concurrency=4)
+
+        self.assertEqual([outcome.book for outcome in outcomes], books)
+        self.assertEqual(self.issued, 1)
+        [refused] = [outcome for outcome in outcomes if not outcome.ok]
+        self.assertEqual(refused.book._id, "13")
+        self.assertIsInstance(refused.error, exceptions.HoldError)
+
+    def test_rejected_token_is_refreshed_once(self):
+        self.rotate_after = "10"
+
+        outcomes = self.account.holdMany(
+            [book("10"), book("11"), book("12")], self.branch, concurrency=1
+        )
+
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        self.assertEqual(self.issued, 2)
+        self.assertEqual(
+            len(self.server.requested("/holds/place_single_click_hold/11")), 2
+        )
+
+    def test_hold_raises_when_token_is_rejected(self):
+        with (
+            mock.patch.object(Account, "_fetchHoldToken", return_value="stale"),
+            self.assertRaises(exceptions.NotLoggedIn),
+        ):
+            self.account.hold(book("10"), self.branch)
+
+
+class TestAccountSnapshot(unittest.TestCase):
+    def setUp(self):
+        routes = {
+            ("POST", "/user/login"): lambda request: json_response({"logged_in": True}),
+            ("GET", "/checkedout"): lambda request: (
+                200,
+                {},
+                asset("checkouts.html").replace("</body>", CHECKOUTS_TOKEN + "</body>"),
+            ),
+            ("GET", "/holds/index/not_yet_available"): lambda request: (
+                200,
+                {},
+                asset("holds.html").replace("</body>", HOLDS_TOKEN + "</body>"),
+            ),
+            ("POST", "/checkedout/renew"): lambda request: json_response(
+                {"logged_in": True, "success": True}
+            ),
+            ("POST", "/holds/delete.json"): lambda request: json_response(
+                {"logged_in": True}
+            ),
+        }
+        for item in ("-543450662176820777", "2844868886065951540"):
+            routes["GET", f"/checkedout/confirm/{item}"] = lambda request: (
+                json_response(
+                    {
+                        "logged_in": True,
+                        "html": '<input name="authenticity_token" value="t2">'
+                        f'<input id="items_" value="{request.path[-19:]}">',
+                    }
+                )
+            )
+
+        self.server = StubServer(routes).start()
+        self.client = Client(hosts=self.server.hosts, timeout=5)
+        self.account = Account("card", "1234", client=self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_records_are_indexed_by_book_and_metadata_id(self):
+        snapshot = self.account.snapshot()
+
+        record = snapshot.checkout("1236126093")
+        self.assertEqual(record["checkoutId"], "-543450662176820777")
+        self.assertIs(snapshot.checkout("S93C1236126"), record)
+        self.assertIs(snapshot.checkout(book("1236126093")), record)
+        self.assertEqual(snapshot.hold("7165420093")["holdsId"], "8156797030608695005")
+        self.assertIsNone(snapshot.hold("404"))
+        self.assertEqual(snapshot.token("holds"), "holds-token")
+        self.assertEqual(len(snapshot.checkouts), 9)
+
+    def test_renew_reuses_loaded_checkouts(self):
+        [kolyma] = [
+            book for book in self.account.getCheckouts() if book.title == "Kolyma Tales"
+        ]
+
+        self.account.renew(kolyma)
+
+        self.assertEqual(len(self.server.requested("/checkedout")), 1)
+        self.assertEqual(len(self.server.requested("/checkedout/renew")), 1)
+
+    def test_mutations_invalidate_their_page(self):
+        snapshot = self.account.snapshot()
+
+        self.account.renew(book("1236126093"))
+        self.assertIsNone(snapshot.age("checkouts"))
+        self.assertIsNotNone(snapshot.age("holds"))
+
+        self.account.cancelHold(book("7165420093"))
+        self.assertIsNone(snapshot.age("holds"))
+
+        self.account.renew(book("1859091093"))
+        self.assertEqual(len(self.server.requested("/checkedout")), 2)
+
+    def test_stale_pages_are_reloaded(self):
+        self.account.getHolds()
+
+        with mock.patch.object(Account, "SNAPSHOT_TTL", 0):
+            self.account.cancelHold(book("7165420093"))
+
+        self.assertEqual(
+            len(self.server.requested("/holds/index/not_yet_available")), 2
+        )
+
+    def test_get_methods_always_load_a_fresh_page(self):
+        self.account.getCheckouts()
+        self.account.getCheckouts()
+
+        self.assertEqual(len(self.server.requested("/checkedout")), 2)
+
+
+class TestAccountSummary(unittest.TestCase):
+    def setUp(self):
+        # Each page waits for the others, so loading them one at a time fails.
+        self.barrier = threading.Barrier(3, timeout=5)
+
+        def page(body):
+            def handler(request):
+                self.barrier.wait()
+                return 200, {}, body
+
+            return handler
+
+        ready = asset("holds.html").replace(
+            '"expiryDate":"2026-04-05"',
+            '"pickupByDate":"2025-05-14","expiryDate":"2026-04-05"',
+        )
+        routes = {
+            ("POST", "/user/login"): lambda request: json_response({"logged_in": True}),
+            ("GET", "/holds/index/not_yet_available"): page(asset("holds.html")),
+            ("GET", "/holds/index/ready_for_pickup"): page(ready),
+            ("GET", "/checkedout"): page(asset("checkouts.html")),
+        }
+        self.server = StubServer(routes).start()
+        self.client = Client(hosts=self.server.hosts, timeout=5)
+        self.account = Account("card", "1234", client=self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_pages_are_loaded_concurrently(self):
+        summary = self.account.getSummary(today=datetime.date(2025, 5, 10))
+
+        self.assertEqual(len(summary.holds), 8)
+        self.assertEqual(len(summary.checkouts), 9)
+        self.assertEqual(len(summary.ready), 8)
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_due_soon_and_ready_views(self):
+        summary = self.account.getSummary(
+            due_within=3, today=datetime.date(2025, 5, 10)
+        )
+
+        self.assertEqual(
+            [book._id for book in summary.dueSoon],
+            ["2622663093", "1859091093", "2355223093"],
+        )
+        self.assertEqual(summary.dueDates["1236126093"], datetime.date(2025, 5, 19))
+        self.assertEqual(summary.ready[0]._id, "7165420093")
+        self.assertEqual(
+            summary.pickupDates, {"7165420093": datetime.date(2025, 5, 14)}
+        )
+
+    def test_summary_refreshes_the_snapshot(self):
+        self.account.getSummary()
+        self.account.getSummary()
+
+        self.assertEqual(len(self.server.requested("/checkedout")), 2)
+        self.assertIsNotNone(self.account.snapshot().hold("7165420093"))
+        self.assertEqual(len(self.server.requested("/checkedout")), 2)
@@ -0,0 +1,314 @@
+import asyncio
+import threading
+import unittest
+
+from sfpl import exceptions
+from sfpl.sfpl import Book
+
+from .server import (
+    StubServer,
+    asset,
+    hours_page,
+    item_page,
+    json_response,
+    search_page,
+)
+
+try:
+    import aiohttp
+
+    from sfpl.aio import (
+        AsyncAccount,
+        AsyncAdvancedSearch,
+        AsyncBook,
+        AsyncBranch,
+        AsyncClient,
+        AsyncSearch,
+    )
+except ImportError:
+    aiohttp = None
+
+CHECKOUTS_TOKEN = '<input name="authenticity_token" value="page-token">'
+
+
+def logged_in(handler):
+    def check(request):
+        if request.cookies.get("session") != "abc":
+            return 302, {"Location": "/user/login"}, ""
+        return handler(request)
+
+    return check
+
+
+@unittest.skipUnless(aiohttp, "aiohttp is not installed")
+class TestAsyncAPI(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.release = threading.Event()
+
+        def search(request):
+            page = int(request.query["page"][0])
+            return 200, {}, search_page(page, 45)
+
+        def login(request):
+            if request.form.get("user_pin") != ["1234"]:
+                return json_response(
+                    {"logged_in": False, "messages": [{"key": "bad pin"}]}
+                )
+            status, headers, body = json_response({"logged_in": True})
+            headers["Set-Cookie"] = "session=abc; Path=/"
+            return status, headers, body
+
+        def slow(request):
+            cls.release.wait(5)
+            return 200, {}, item_page("slow")
+
+        # The first token issued for book 43 is rejected.
+        cls.issued = 0
+
+        def show_43(request):
+            cls.issued += 1
+            return 200, {}, item_page("43", f"t{cls.issued}")
+
+        def place_43(request):
+            if request.form["authenticity_token"] == ["t1"]:
+                return 422, {}, "invalid authenticity token"
+            return json_response({"logged_in": True, "success": True})
+
+        routes = {
+            ("GET", "/v2/search"): search,
+            ("GET", "/item/show/42"): lambda request: (200, {}, item_page("42")),
+            ("GET", "/item/show/slow"): slow,
+            ("GET", "/item/show/43"): logged_in(show_43),
+            ("POST", "/holds/place_single_click_hold/43"): logged_in(place_43),
+            ("GET", "/locations/west-portal"): lambda request: (
+                200,
+                {},
+                hours_page({"Sun": "1 - 5", "Mon": "10 - 6"}),
+            ),
+            ("GET", "/locations/anza"): lambda request: (404, {}, "missing"),
+            ("POST", "/user/login"): login,
+            ("GET", "/user_dashboard"): logged_in(
+                lambda request: (
+                    200,
+                    {},
+                    '<div class="cp_user_card" data-name="reader" data-id="7"></div>',
+                )
+            ),
+            ("GET", "/holds/index/not_yet_available"): logged_in(
+                lambda request: (200, {}, asset("holds.html"))
+            ),
+            ("GET", "/checkedout"): logged_in(
+                lambda request: (
+                    200,
+                    {},
+                    asset("checkouts.html").replace(
+                        "</body>", CHECKOUTS_TOKEN + "</body>"
+                    ),
+                )
+            ),
+            ("GET", "/checkedout/confirm/-543450662176820777"): logged_in(
+                lambda request: json_response(
+                    {
+                        "logged_in": True,
+                        "html": '<input name="authenticity_token" value="t2">'
+                        '<input id="items_" value="-543450662176820777">',
+                    }
+                )
+            ),
+            ("POST", "/checkedout/renew"): logged_in(
+                lambda request: json_response({"logged_in": True, "success": True})
+            ),
+            ("POST", "/holds/place_single_click_hold/42"): logged_in(
+                lambda request: json_response(
+                    {"logged_in": True, "success": False, "messages": [{"key": "no"}]}
+                )
+            ),
+        }
+        cls.server = StubServer(routes).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.release.set()
+        cls.server.stop()
+
+    async def asyncSetUp(self):
+        self.client = AsyncClient(hosts=self.server.hosts, timeout=5)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_search_pages_are_yielded_in_order(self):
+        search = AsyncSearch("python", client=self.client)
+
+        pages = [page async for page in search.getResults(pages="all", concurrency=3)]
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 10, 5])
+        self.assertEqual(pages[0][0].title, "Book 1")
+        self.assertEqual(pages[4][-1].title, "Book 45")
+        self.assertIsInstance(pages[0][0], AsyncBook)
+        self.assertIs(pages[0][0].client, self.client)
+
+    async def test_search_frame(self):
+        frame = await AsyncSearch("python", client=self.client).getFrame(
+            pages="all", concurrency=3
+        )
+
+        self.assertEqual(len(frame), 45)
+        self.assertEqual(frame.column("title")[44], "Book 45")
+
+    async def test_advanced_search_start_page(self):
+        search = AsyncAdvancedSearch(includeauthor="Author", client=self.client)
+
+        pages = [page async for page in search.getResults(pages=2, start_page=4)]
+
+        self.assertEqual([len(page) for page in pages], [10, 5])
+
+    async def test_book_details(self):
+        book = AsyncBook(
+            {"title": "", "author": "", "subtitle": "", "_id": "42"},
+            client=self.client,
+        )
+
+        details = await book.getDetails()
+
+        self.assertEqual(details["brief"]["title"], "Book 42")
+
+    async def test_details_many(self):
+        books = [
+            AsyncBook(
+                {"title": "", "author": "", "subtitle": "", "_id": _id},
+                client=self.client,
+            )
+            for _id in ("42", "missing", "42")
+        ]
+
+        outcomes = await AsyncBook.getDetailsMany(books, concurrency=2)
+
+        self.assertEqual([outcome.ok for outcome in outcomes], [True, False, True])
+        self.assertEqual(outcomes[0].value["brief"]["title"], "Book 42")
+        self.assertIsInstance(outcomes[1].error, exceptions.MissingScriptError)
+
+    async def test_branch_hours(self):
+        hours = await AsyncBranch("west portal", client=self.client).getHours()
+        self.assertEqual(hours, {"Sun": "1 - 5", "Mon": "10 - 6"})
+
+        with self.assertRaises(aiohttp.ClientResponseError):
+            await AsyncBranch("anza", client=self.client).getHours()
+
+    async def test_account(self):
+        async with await AsyncAccount.login(
+            "card", "1234", client=self.client
+        ) as account:
+            self.assertEqual((account.name, account._id), ("reader", "7"))
+
+            holds = await account.getHolds()
+            self.assertEqual(len(holds), 8)
+            self.assertEqual(holds[0].status, "IN_TRANSIT: IN TRANSIT")
+
+            checkouts = await account.getCheckouts()
+            self.assertEqual(len(checkouts), 9)
+
+            book = Book(
+                {
+                    "title": "Kolyma Tales",
+                    "author": "",
+                    "subtitle": "",
+                    "_id": "1236126093",
+                }
+            )
+            await account.renew(book)
+            renewal = self.server.requested("/checkedout/renew")[-1]
+            self.assertEqual(
+                renewal.form,
+                {"authenticity_token": ["t2"], "items[]": ["-543450662176820777"]},
+            )
+
+            with self.assertRaises(exceptions.NotCheckedOut):
+                await account.renew(
+                    Book({"title": "Other", "author": "", "subtitle": "", "_id": "2"})
+                )
+
+            with self.assertRaises(exceptions.HoldError):
+                await account.hold(
+                    Book({"title": "", "author": "", "subtitle": "", "_id": "42"}),
+                    AsyncBranch("west portal", client=self.client),
+                )
+
+    async def test_accounts_compare_by_id(self):
+        async with (
+            await AsyncAccount.login("card", "1234", client=self.client) as account,
+            await AsyncAccount.login("card", "1234", client=self.client) as again,
+        ):
+            self.assertEqual(account, again)
+            self.assertEqual(len({account, again}), 1)
+            self.assertNotEqual(account, "reader")
+
+    async def test_hold_refreshes_a_rejected_token(self):
+        async with await AsyncAccount.login(
+            "card", "1234", client=self.client
+        ) as account:
+            await account.hold(
+                Book({"title": "", "author": "", "subtitle": "", "_id": "43"}),
+                AsyncBranch("west portal", client=self.client),
+            )
+
+        placed = self.server.requested("/holds/place_single_click_hold/43")
+        self.assertEqual(
+            [request.form["authenticity_token"] for request in placed],
+            [["t1"], ["t2"]],
+        )
+
+    async def test_login_error(self):
+        with self.assertRaises(exceptions.LoginError):
+            await AsyncAccount.login("card", "0000", client=self.client)
+
+    async def test_cancellation(self):
+        book = AsyncBook(
+            {"title": "", "author": "", "subtitle": "", "_id": "slow"},
+            client=self.client,
+        )
+        task = asyncio.ensure_future(book.getDetails())
+        await asyncio.sleep(0.1)
+
+        task.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await asyncio.wait_for(task, 1)
+
+
+@unittest.skipUnless(aiohttp, "aiohttp is not installed")
+class TestAsyncClientLoops(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(
+            {("GET", "/ping"): lambda request: (200, {}, "pong")}
+        ).start()
+        self.addCleanup(self.server.stop)
+        self.client = AsyncClient(hosts=self.server.hosts)
+        self.url = "https://sfpl.bibliocommons.com/ping"
+
+    def test_client_is_reused_across_event_loops(self):
+        async def ping():
+            response = await self.client.request("GET", self.url)
+            return response.text, self.client._session, self.client._connector
+
+        first = asyncio.run(ping())
+
+        async def ping_and_close():
+            try:
+                return await ping()
+            finally:
+                await self.client.close()
+
+        second = asyncio.run(ping_and_close())
+
+        self.assertEqual((first[0], second[0]), ("pong", "pong"))
+        self.assertIsNot(first[2], second[2])
+        for pool in (first, second):
+            self.assertTrue(pool[1].closed)
+            self.assertTrue(pool[2].closed)
+        self.assertEqual(len(self.server.requested("/ping")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,8 +1,16 @@
 import codecs
+import datetime
 import os
+import threading
 import unittest
+from unittest import mock
 
 import sfpl
+from sfpl.client import Client
+from sfpl.memo import Memo
+from sfpl.sfpl import Book, Branch, _iter_pages
+
+from .server import StubServer, hours_page
 
 
 class TestScraper(unittest.TestCase):
@@ -147,5 +155,214 @@ class TestScraper(unittest.TestCase):
         self.assertGreater(len(first_page), 0)
 
 
+class TestPaging(unittest.TestCase):
+    def pages(self, last_page):
+        requested = []
+        lock = threading.Lock()
+
+        def get_page(page):
+            with lock:
+                requested.append(page)
+            return last_page, [page]
+
+        return requested, get_page
+
+    def test_concurrent_pages_are_yielded_in_order(self):
+        requested, get_page = self.pages(30)
+
+        results = list(_iter_pages(get_page, 30, 1, 8))
+
+        self.assertEqual(results, [[page] for page in range(1, 31)])
+        self.assertEqual(sorted(requested), list(range(1, 31)))
+
+    def test_stops_at_last_page(self):
+        for concurrency in (1, 4):
+            with self.subTest(concurrency=concurrency):
+                requested, get_page = self.pages(3)
+
+                results = list(_iter_pages(get_page, 10, 1, concurrency))
+
+                self.assertEqual(results, [[1], [2], [3]])
+                self.assertEqual(sorted(requested), [1, 2, 3])
+
+    def test_all_pages_from_start_page(self):
+        _, get_page = self.pages(5)
+
+        results = list(_iter_pages(get_page, "all", 3, 2))
+
+        self.assertEqual(results, [[3], [4], [5]])
+
+    def test_start_page_past_end(self):
+        _, get_page = self.pages(2)
+        self.assertEqual(list(_iter_pages(get_page, "all", 3, 2)), [])
+
+    def test_missing_result_count_ends_results(self):
+        self.assertEqual(list(_iter_pages(lambda page: (None, []), 5, 1, 4)), [])
+
+    def test_sequential_pages_are_fetched_on_demand(self):
+        requested, get_page = self.pages(10)
+
+        results = _iter_pages(get_page, 10, 1, 1)
+        next(results)
+        next(results)
+
+        self.assertEqual(requested, [1, 2])
+
+
+BIB = {
+    "id": "S93C4564247",
+    "briefInfo": {
+        "title": "Kolyma Tales",
+        "subtitle": "",
+        "authors": ["Shalamov, Varlam", "Glad, John"],
+    },
+}
+
+
+class TestModels(unittest.TestCase):
+    def test_models_are_slotted(self):
+        client = Client()
+        models = (
+            Book({"title": "", "author": "", "subtitle": "", "_id": "1"}),
+            sfpl.User("reader", "7", client=client),
+            Branch("anza", client=client),
+        )
+        for model in models:
+            with self.subTest(model=type(model).__name__):
+                self.assertFalse(hasattr(model, "__dict__"))
+
+    def test_models_hash_by_id(self):
+        first = Book({"title": "A", "author": "", "subtitle": "", "_id": "1"})
+        again = Book({"title": "B", "author": "", "subtitle": "", "_id": "1"})
+        other = Book({"title": "A", "author": "", "subtitle": "", "_id": "2"})
+
+        self.assertEqual(len({first, again, other}), 2)
+        self.assertEqual({first: 1}[again], 1)
+        self.assertNotEqual(first, sfpl.User("reader", "1"))
+        self.assertEqual(len({Branch("anza"), Branch("Anza"), Branch("park")}), 2)
+
+    def test_book_from_bib(self):
+        book = Book.fromBib(BIB, status="Due 2025-05-16")
+
+        self.assertEqual(
+            (book.title, book.author, book.subtitle, book._id, book.status),
+            (
+                "Kolyma Tales",
+                "Shalamov, Varlam",
+                "",
+                "4564247093",
+                "Due 2025-05-16",
+            ),
+        )
+        self.assertEqual(
+            Book.fromBib(BIB, all_authors=True).author,
+            "Shalamov, Varlam & Glad, John",
+        )
+        self.assertEqual(
+            Book.fromBib({"briefInfo": BIB["briefInfo"]}, metadata_id="S93C1")._id,
+            "1093",
+        )
+
+    def test_repeated_strings_are_shared(self):
+        first, second = (
+            Book.fromBib(BIB, status=f"IN_TRANSIT: {status}")
+            for status in ("IN TRANSIT", "IN TRANSIT")
+        )
+
+        self.assertIs(first.status, second.status)
+
+
+class StubBook(Book):
+    def __init__(self, _id, details=None, error=None):
+        super().__init__({"title": _id, "author": "", "subtitle": "", "_id": _id})
+        self.details = details
+        self.error = error
+
+    def getDetails(self):
+        if self.error:
+            raise self.error
+        return self.details
+
+
+class TestDetailsMany(unittest.TestCase):
+    def book(self, _id, details=None, error=None):
+        return StubBook(_id, details=details, error=error)
+
+    def test_outcomes_are_in_input_order(self):
+        books = [self.book(str(n), details={"n": n}) for n in range(12)]
+        books[3] = self.book("3", error=sfpl.exceptions.MissingScriptError())
+
+        outcomes = Book.getDetailsMany(books, concurrency=4)
+
+        self.assertEqual([outcome.book for outcome in outcomes], books)
+        self.assertEqual(
+            [outcome.ok for outcome in outcomes], [n != 3 for n in range(12)]
+        )
+        self.assertEqual(outcomes[5].value, {"n": 5})
+        self.assertIsInstance(outcomes[3].error, sfpl.exceptions.MissingScriptError)
+
+    def test_unexpected_errors_propagate(self):
+        with self.assertRaises(ZeroDivisionError):
+            Book.getDetailsMany([self.book("1", error=ZeroDivisionError())])
+
+
+class TestAllHours(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        routes = {}
+        for name in Branch.BRANCHES:
+            path = (
+                Branch(name, client=Client())
+                ._hoursUrl()
+                .replace("https://sfpl.org", "")
+            )
+            routes["GET", path] = lambda request, path=path: (
+                200,
+                {},
+                hours_page({"Sun": path}),
+            )
+        cls.server = StubServer(routes).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.client = Client(hosts=self.server.hosts, memo=Memo(), timeout=5)
+
+    def test_every_branch_is_fetched_once_per_page(self):
+        hours = Branch.getAllHours(client=self.client, concurrency=4)
+
+        self.assertEqual(list(hours), list(Branch.BRANCHES))
+        self.assertEqual(hours["park"], {"Sun": "/locations/park"})
+        self.assertIs(hours["chinatown children's"], hours["chinatown"])
+        self.assertEqual(len(self.server.requests), 28)
+        self.assertEqual(
+            Branch("anza", client=self.client).getHours(),
+            {"Sun": "/locations/anza"},
+        )
+        self.assertEqual(len(self.server.requests), 28)
+
+    @mock.patch("sfpl.sfpl.datetime")
+    def test_hours_are_kept_until_the_next_day(self, fake_datetime):
+        fake_datetime.date.today.return_value = datetime.date(2024, 10, 1)
+
+        first = Branch.getAllHours(client=self.client)
+        self.assertEqual(Branch.getAllHours(client=self.client), first)
+        self.assertEqual(len(self.server.requests), 28)
+
+        fake_datetime.date.today.return_value = datetime.date(2024, 10, 2)
+        Branch.getAllHours(client=self.client)
+        self.assertEqual(len(self.server.requests), 56)
+
+        Branch.getAllHours(client=self.client, refresh=True)
+        self.assertEqual(len(self.server.requests), 84)
+
+    def test_exact_names_win(self):
+        self.assertEqual(Branch("park").name, "park")
+        self.assertEqual(Branch("glen").name, "glen park")
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
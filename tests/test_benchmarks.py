@@ -0,0 +1,132 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks import suite
+
+
+def measured(ops_per_sec):
+    return {"ops_per_sec": ops_per_sec, "p50_us": 1.0, "p95_us": 1.0, "p99_us": 1.0}
+
+
+class TestRegressions(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {
+            suite.REFERENCE: measured(1000),
+            "parse": measured(100),
+            "render": measured(500),
+        }
+
+    def test_slowdown_past_the_threshold_is_a_regression(self):
+        results = {
+            suite.REFERENCE: measured(1000),
+            "parse": measured(70),
+            "render": measured(450),
+        }
+
+        found = suite.regressions(results, self.baseline, threshold=0.2)
+
+        self.assertEqual(list(found), ["parse"])
+        self.assertAlmostEqual(found["parse"], -0.3)
+
+    def test_slowdown_within_the_threshold_is_not(self):
+        results = {suite.REFERENCE: measured(1000), "parse": measured(85)}
+
+        self.assertEqual(suite.regressions(results, self.baseline, 0.2), {})
+        self.assertEqual(
+            list(suite.regressions(results, self.baseline, 0.1)), ["parse"]
+        )
+
+    def test_changes_are_relative_to_the_reference(self):
+        # A machine half as fast slows every case down alike.
+        slower = {
+            suite.REFERENCE: measured(500),
+            "parse": measured(50),
+            "render": measured(250),
+        }
+        self.assertEqual(suite.regressions(slower, self.baseline), {})
+
+        # A case that kept its speed while the reference sped up fell behind.
+        faster = {suite.REFERENCE: measured(2000), "parse": measured(100)}
+        self.assertEqual(list(suite.regressions(faster, self.baseline)), ["parse"])
+
+    def test_new_and_missing_cases_are_not_compared(self):
+        results = {suite.REFERENCE: measured(1000), "new": measured(1)}
+
+        self.assertIsNone(suite.change("new", results, self.baseline))
+        self.assertIsNone(suite.change("render", results, self.baseline))
+        self.assertEqual(suite.regressions(results, self.baseline), {})
+
+    def test_nothing_is_compared_without_a_reference(self):
+        results = {suite.REFERENCE: measured(1000), "parse": measured(1)}
+        baseline = {"parse": measured(100)}
+
+        self.assertEqual(suite.regressions(results, baseline), {})
+        self.assertEqual(suite.regressions({"parse": measured(1)}, self.baseline), {})
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, "baseline.json")
+        with open(self.baseline, "w") as baseline_file:
+            json.dump(
+                {suite.REFERENCE: measured(1000), "parse": measured(100)},
+                baseline_file,
+            )
+
+        self.speeds = {suite.REFERENCE: 1000, "parse": 100}
+        available = {name: name for name in self.speeds}
+        patches = [
+            mock.patch.object(suite, "cases", return_value=available),
+            mock.patch.object(
+                suite,
+                "measure",
+                side_effect=lambda name, duration: measured(self.speeds[name]),
+            ),
+            mock.patch("sys.stdout", io.StringIO()),
+        ]
+        self.stderr = io.StringIO()
+        patches.append(mock.patch("sys.stderr", self.stderr))
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_suite(self, *argv):
+        return suite.main(["--baseline", self.baseline, *argv])
+
+    def test_exits_zero_without_regressions(self):
+        self.speeds["parse"] = 90
+
+        self.assertEqual(self.run_suite(), 0)
+
+    def test_exits_one_on_a_regression(self):
+        self.speeds["parse"] = 50
+
+        self.assertEqual(self.run_suite(), 1)
+        self.assertIn("regression: parse is 50.0% slower", self.stderr.getvalue())
+
+    def test_always_measures_the_reference(self):
+        self.speeds["parse"] = 50
+
+        self.assertEqual(self.run_suite("parse"), 1)
+        self.assertEqual(suite.measure.call_args_list[0].args, (suite.REFERENCE,))
+
+    def test_saving_a_subset_keeps_other_cases_relative_to_the_reference(self):
+        self.speeds = {suite.REFERENCE: 2000, "parse": 200}
+
+        self.assertEqual(self.run_suite("--save", suite.REFERENCE), 0)
+        with open(self.baseline) as baseline_file:
+            saved = json.load(baseline_file)
+
+        self.assertEqual(saved[suite.REFERENCE]["ops_per_sec"], 2000)
+        self.assertEqual(saved["parse"]["ops_per_sec"], 200)
+        self.assertEqual(self.run_suite(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from sfpl.cache import ResponseCache, endpoint_for
+from sfpl.client import Client
+from sfpl.sfpl import Book, Branch
+
+from .server import StubServer, hours_page, item_page
+
+ITEM_URL = "https://sfpl.bibliocommons.com/item/show/42"
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.etag = '"v1"'
+
+        def item(request):
+            if request.headers.get("If-None-Match") == self.etag:
+                return 304, {"ETag": self.etag}, ""
+            return 200, {"ETag": self.etag}, item_page("42") + " " * 50000
+
+        routes = {
+            ("GET", "/item/show/42"): item,
+            ("GET", "/locations/west-portal"): lambda request: (
+                200,
+                {"Last-Modified": "Tue, 01 Oct 2024 00:00:00 GMT"},
+                hours_page({"Sun": "1 - 5"}),
+            ),
+            ("GET", "/user_dashboard"): lambda request: (200, {}, "dashboard"),
+            ("GET", "/item/show/private"): lambda request: (
+                200,
+                {"Cache-Control": "no-store"},
+                item_page("private"),
+            ),
+        }
+        self.server = StubServer(routes).start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.db")
+        self.cache = ResponseCache(self.path)
+        self.client = Client(hosts=self.server.hosts, cache=self.cache, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def book(self, _id="42"):
+        return Book(
+            {"title": "", "author": "", "subtitle": "", "_id": _id},
+            client=self.client,
+        )
+
+    def test_endpoint_classes(self):
+        self.assertEqual(
+            endpoint_for("https://sfpl.bibliocommons.com/item/show/42"), "item"
+        )
+        self.assertEqual(
+            endpoint_for("https://sfpl.bibliocommons.com/v2/search?query=x"), "search"
+        )
+        self.assertEqual(
+            endpoint_for("https://sfpl.bibliocommons.com/lists/show/7"), "user"
+        )
+        self.assertEqual(endpoint_for("https://sfpl.org/locations/anza"), "branch")
+        self.assertIsNone(endpoint_for("https://sfpl.bibliocommons.com/checkedout"))
+
+    def test_fresh_entries_are_served_from_disk(self):
+        first = self.book().getDetails()
+        second = self.book().getDetails()
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.requested("/item/show/42")), 1)
+        self.assertEqual(
+            self.cache.stats,
+            {"miss": {"item": 1}, "store": {"item": 1}, "hit": {"item": 1}},
+        )
+
+    def test_expired_entries_are_revalidated(self):
+        self.book().getDetails()
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("UPDATE responses SET expires_at = 0")
+
+        details = self.book().getDetails()
+
+        self.assertEqual(details["brief"]["title"], "Book 42")
+        revalidation = self.server.requested("/item/show/42")[-1]
+        self.assertEqual(revalidation.headers["If-None-Match"], '"v1"')
+        self.assertEqual(self.cache.stats["revalidated"], {"item": 1})
+        self.assertGreater(self.cache.get(ITEM_URL).expires_at, time.time())
+
+    def test_changed_entries_are_replaced(self):
+        self.book().getDetails()
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("UPDATE responses SET expires_at = 0")
+        self.etag = '"v2"'
+
+        self.book().getDetails()
+
+        self.assertEqual(self.cache.get(ITEM_URL).etag, '"v2"')
+        self.assertEqual(self.cache.stats["store"], {"item": 2})
+
+    def test_last_modified_is_used_for_revalidation(self):
+        branch = Branch("west portal", client=self.client)
+        branch.getHours()
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("UPDATE responses SET expires_at = 0")
+
+        self.assertEqual(branch.getHours(), {"Sun": "1 - 5"})
+
+        revalidation = self.server.requested("/locations/west-portal")[-1]
+        self.assertEqual(
+            revalidation.headers["If-Modified-Since"], "Tue, 01 Oct 2024 00:00:00 GMT"
+        )
+
+    def test_bodies_are_compressed(self):
+        self.book().getDetails()
+
+        with sqlite3.connect(self.path) as connection:
+            (size,) = connection.execute(
+                "SELECT length(body) FROM responses"
+            ).fetchone()
+
+        self.assertLess(size, 5000)
+
+    def test_session_and_unknown_requests_are_not_cached(self):
+        session = self.client.new_session()
+
+        self.client.get(ITEM_URL, session=session)
+        self.client.get("https://sfpl.bibliocommons.com/user_dashboard")
+        self.client.get("https://sfpl.bibliocommons.com/item/show/private")
+
+        with sqlite3.connect(self.path) as connection:
+            (count,) = connection.execute("SELECT count(*) FROM responses").fetchone()
+        self.assertEqual(count, 0)
+
+    def test_zero_ttl_disables_an_endpoint(self):
+        self.cache.ttls["item"] = 0
+
+        self.book().getDetails()
+        self.book().getDetails()
+
+        self.assertEqual(len(self.server.requested("/item/show/42")), 2)
+
+    def test_caches_on_one_file_share_entries_and_totals(self):
+        self.book().getDetails()
+        other = ResponseCache(self.path)
+        client = Client(hosts=self.server.hosts, cache=other, timeout=5)
+
+        def fetch():
+            Book(
+                {"title": "", "author": "", "subtitle": "", "_id": "42"},
+                client=client,
+            ).getDetails()
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.server.requested("/item/show/42")), 1)
+        self.assertEqual(other.totals()["hit"], {"item": 4})
+        client.close()
+
+    def test_hits_are_counted_in_memory_until_flushed(self):
+        self.book().getDetails()
+        for _ in range(3):
+            self.book().getDetails()
+
+        def saved_hits():
+            with sqlite3.connect(self.path) as connection:
+                return connection.execute(
+                    "SELECT count FROM stats WHERE event = 'hit'"
+                ).fetchall()
+
+        self.assertEqual(saved_hits(), [])
+        self.assertEqual(self.cache.totals()["hit"], {"item": 3})
+        self.assertEqual(saved_hits(), [(3,)])
+
+    def test_close_closes_every_thread_connection(self):
+        self.book().getDetails()
+        thread = threading.Thread(target=self.cache.get, args=(ITEM_URL,))
+        thread.start()
+        thread.join()
+        connections = list(self.cache._connections)
+
+        self.cache.close()
+
+        self.assertEqual(len(connections), 2)
+        for connection in connections:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                connection.execute("SELECT 1")
+        self.assertIsNotNone(self.cache.get(ITEM_URL))
+
+    def test_clear(self):
+        self.book().getDetails()
+
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get(ITEM_URL))
+        self.assertEqual(self.cache.totals(), {})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,232 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sfpl import exceptions
+from sfpl.cassette import Cassette, scrub_body
+from sfpl.cli import main
+from sfpl.client import Client
+from sfpl.sfpl import Account, Book, Search
+
+from .server import StubServer, asset, json_response, search_page
+
+CHECKOUTS_TOKEN = '<input name="authenticity_token" value="page-token">'
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        routes = {
+            ("GET", "/v2/search"): lambda request: (
+                200,
+                {},
+                search_page(int(request.query["page"][0]), 25),
+            ),
+            ("POST", "/user/login"): lambda request: json_response(
+                {"logged_in": True}, {"Set-Cookie": "session=abc; Path=/"}
+            ),
+            ("GET", "/user_dashboard"): lambda request: (
+                200,
+                {},
+                '<div class="cp_user_card" data-name="reader" data-id="7"></div>',
+            ),
+            ("GET", "/holds/index/not_yet_available"): lambda request: (
+                200,
+                {},
+                asset("holds.html"),
+            ),
+            ("GET", "/checkedout"): lambda request: (
+                200,
+                {},
+                asset("checkouts.html").replace("</body>", CHECKOUTS_TOKEN + "</body>"),
+            ),
+            ("GET", "/checkedout/confirm/-543450662176820777"): lambda request: (
+                json_response(
+                    {
+                        "logged_in": True,
+                        "html": '<input name="authenticity_token" value="t2">'
+                        '<input id="items_" value="-543450662176820777">',
+                    }
+                )
+            ),
+            ("POST", "/checkedout/renew"): lambda request: json_response(
+                {"logged_in": True, "success": True}
+            ),
+        }
+        self.server = StubServer(routes).start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "session.json")
+
+    def tearDown(self):
+        self.server.stop()
+        self.directory.cleanup()
+
+    def workflow(self, client):
+        search = Search("python", client=client)
+        titles = [book.title for page in search.getResults(pages=3) for book in page]
+        account = Account("card-barcode", "1234", client=client)
+        holds = account.getHolds()
+        account.renew(
+            Book(
+                {
+                    "title": "Kolyma Tales",
+                    "author": "",
+                    "subtitle": "",
+                    "_id": "1236126093",
+                },
+                client=client,
+            )
+        )
+        return titles, account.name, holds
+
+    def record(self):
+        with Client(
+            hosts=self.server.hosts,
+            timeout=5,
+            cassette=Cassette(self.path, mode="record"),
+        ) as client:
+            return self.workflow(client)
+
+    def test_recorded_workflows_replay_offline(self):
+        recorded = self.record()
+        self.server.stop()
+        self.server = StubServer().start()
+
+        with Client(
+            hosts={"sfpl.bibliocommons.com": "http://127.0.0.1:1"},
+            cassette=Cassette(self.path),
+        ) as client:
+            replayed = self.workflow(client)
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(len(recorded[0]), 25)
+
+    def test_credentials_are_scrubbed(self):
+        self.record()
+
+        with open(self.path) as cassette:
+            text = cassette.read()
+
+        self.assertNotIn("card-barcode", text)
+        self.assertNotIn("session=abc", text)
+        [login] = [
+            interaction["request"]
+            for interaction in json.loads(text)["interactions"]
+            if interaction["request"]["url"].endswith("/user/login")
+        ]
+        self.assertEqual(login["body"], "name=%5Bscrubbed%5D&user_pin=%5Bscrubbed%5D")
+
+    def test_scrub_body(self):
+        self.assertEqual(
+            scrub_body("authenticity_token=t2&items%5B%5D=77"),
+            "authenticity_token=%5Bscrubbed%5D&items%5B%5D=77",
+        )
+        self.assertEqual(scrub_body('{"pin": "1234"}'), '{"pin": "1234"}')
+        self.assertIsNone(scrub_body(None))
+
+    def test_custom_scrubbers_see_every_interaction(self):
+        def drop_bodies(interaction):
+            interaction["response"]["body"] = ""
+            return interaction
+
+        cassette = Cassette(self.path, mode="record", scrub=drop_bodies)
+        with Client(hosts=self.server.hosts, timeout=5, cassette=cassette) as client:
+            next(Search("python", client=client).getResults())
+
+        self.assertEqual(
+            [i["response"]["body"] for i in Cassette(self.path).interactions], [""]
+        )
+
+    def test_repeated_requests_replay_in_order_then_repeat(self):
+        cassette = Cassette(self.path, mode="record")
+        with Client(hosts=self.server.hosts, timeout=5, cassette=cassette) as client:
+            for total in (25, 35):
+                self.server.routes["GET", "/v2/search"] = lambda request, t=total: (
+                    200,
+                    {},
+                    search_page(1, t),
+                )
+                next(Search("python", client=client).getResults())
+
+        cassette = Cassette(self.path)
+        with Client(hosts=self.server.hosts, cassette=cassette) as client:
+            totals = [Search("python", client=client)._getPage(1)[0] for _ in range(3)]
+
+        self.assertEqual(totals, [3, 4, 4])
+
+    def test_unrecorded_requests_fail_like_network_errors(self):
+        self.record()
+
+        client = Client(hosts=self.server.hosts, cassette=Cassette(self.path))
+
+        with client, self.assertRaises(exceptions.UnrecordedRequest):
+            next(Search("java", client=client).getResults())
+
+    @mock.patch("sfpl.cassette.time.sleep")
+    def test_replay_latency(self, sleep):
+        self.record()
+
+        with Client(
+            hosts=self.server.hosts, cassette=Cassette(self.path, latency=0.25)
+        ) as client:
+            next(Search("python", client=client).getResults())
+        sleep.assert_called_once_with(0.25)
+
+        sleep.reset_mock()
+        with Client(
+            hosts=self.server.hosts, cassette=Cassette(self.path, latency="recorded")
+        ) as client:
+            next(Search("python", client=client).getResults())
+        [(delay,), _] = sleep.call_args
+        self.assertGreater(delay, 0)
+
+    def test_cli_records_and_replays(self):
+        stdout = io.StringIO()
+
+        with mock.patch("sfpl.cli.Client") as client_class:
+            client_class.side_effect = lambda **kwargs: Client(
+                hosts=self.server.hosts, timeout=5, **kwargs
+            )
+            status = main(
+                ["--record", self.path, "search", "python"],
+                stdout=stdout,
+                environ={},
+            )
+            self.assertEqual(status, 0)
+            self.server.stop()
+            self.server = StubServer().start()
+
+            replayed = io.StringIO()
+            status = main(
+                ["--replay", self.path, "search", "python"],
+                stdout=replayed,
+                environ={},
+            )
+
+        self.assertEqual(status, 0)
+        self.assertEqual(replayed.getvalue(), stdout.getvalue())
+        self.assertIn("Book 1", stdout.getvalue())
+
+    def test_cli_reports_missing_cassettes(self):
+        stderr = io.StringIO()
+
+        status = main(
+            [
+                "--replay",
+                os.path.join(self.directory.name, "missing.json"),
+                "search",
+                "x",
+            ],
+            stdout=io.StringIO(),
+            stderr=stderr,
+            environ={},
+        )
+
+        self.assertEqual(status, 2)
+        self.assertIn("cannot read cassette", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,13 +1,16 @@
 import io
+import json
 import os
 import subprocess
 import sys
+import tempfile
 import unittest
 from unittest import mock
 
 from sfpl import exceptions
+from sfpl.cache import ResponseCache
 from sfpl.cli import main
-from sfpl.sfpl import Book, List, User
+from sfpl.sfpl import Book, List, Outcome, User
 
 
 class NonInteractiveInput(io.StringIO):
@@ -88,9 +91,16 @@ class CLITest(unittest.TestCase):
         self.assertEqual(status, 0)
         self.assertEqual(stderr, "")
         search_class.assert_called_once_with(
-            "python", _type="title", format=None, sort=None, on_order=None
+            "python",
+            _type="title",
+            format=None,
+            sort=None,
+            on_order=None,
+            client=None,
+        )
+        search_class.return_value.getResults.assert_called_once_with(
+            pages=2, start_page=1, concurrency=4
         )
-        search_class.return_value.getResults.assert_called_once_with(pages=2)
         self.assertEqual(
             stdout,
             "First — Author\nSecond — Author (Due tomorrow)\n",
@@ -115,7 +125,12 @@ class CLITest(unittest.TestCase):
         self.assertEqual(status, 0)
         self.assertEqual(stderr, "")
         search_class.assert_called_once_with(
-            "music", _type="keyword", format="LP", sort="newly_acquired", on_order=True
+            "music",
+            _type="keyword",
+            format="LP",
+            sort="newly_acquired",
+            on_order=True,
+            client=None,
         )
         self.assertEqual(stdout, "Album — Author\n")
 
@@ -146,6 +161,98 @@ class CLITest(unittest.TestCase):
         self.assertEqual(stdout, "First — Author\n")
         self.assertEqual(stderr, "")
 
+    @mock.patch("sfpl.cli.Search")
+    def test_search_ndjson_writes_one_object_per_line(self, search_class):
+        search_class.return_value.getResults.return_value = iter(
+            [[book("First")], [book("Second", status="Due tomorrow")]]
+        )
+
+        status, stdout, stderr = self.invoke(
+            ["search", "python", "--pages", "2", "--output", "ndjson"]
+        )
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stderr, "")
+        lines = [json.loads(line) for line in stdout.splitlines()]
+        self.assertEqual([line["title"] for line in lines], ["First", "Second"])
+        self.assertEqual(
+            lines[1],
+            {
+                "type": "book",
+                "id": "123",
+                "title": "Second",
+                "subtitle": "",
+                "author": "Author",
+                "status": "Due tomorrow",
+            },
+        )
+
+    @mock.patch("sfpl.cli.Search")
+    def test_search_json_streams_one_array(self, search_class):
+        search_class.return_value.getResults.return_value = iter(
+            [[book("First")], [], [book("Second")]]
+        )
+
+        status, stdout, _ = self.invoke(["search", "python", "--output", "json"])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            [result["title"] for result in json.loads(stdout)], ["First", "Second"]
+        )
+
+        search_class.return_value.getResults.return_value = iter([])
+        status, stdout, _ = self.invoke(["search", "python", "--output", "json"])
+
+        self.assertEqual(json.loads(stdout), [])
+
+    @mock.patch("sfpl.cli.Search")
+    def test_search_writes_each_page_before_fetching_the_next(self, search_class):
+        stdout = io.StringIO()
+
+        def pages():
+            yield [book("First")]
+            self.assertEqual(stdout.getvalue(), "First — Author\n")
+            yield [book("Second")]
+
+        search_class.return_value.getResults.return_value = pages()
+
+        status = main(["search", "python"], stdout=stdout, environ={})
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stdout.getvalue(), "First — Author\nSecond — Author\n")
+
+    @mock.patch("sfpl.cli.Search")
+    def test_closed_pipe_stops_paging_quietly(self, search_class):
+        fetched = []
+        closed = []
+
+        def pages():
+            try:
+                for page in range(1, 5):
+                    fetched.append(page)
+                    yield [book(f"Page {page}")]
+            finally:
+                closed.append(True)
+
+        class ClosedPipe(io.StringIO):
+            def flush(self):
+                raise BrokenPipeError
+
+        search_class.return_value.getResults.return_value = pages()
+        stderr = io.StringIO()
+
+        status = main(
+            ["search", "python", "--pages", "4", "--output", "ndjson"],
+            stdout=ClosedPipe(),
+            stderr=stderr,
+            environ={},
+        )
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stderr.getvalue(), "")
+        self.assertEqual(fetched, [1])
+        self.assertEqual(closed, [True])
+
     @mock.patch("sfpl.cli.Search")
     def test_list_search_uses_text_output(self, search_class):
         result = List(
@@ -193,11 +300,14 @@ class CLITest(unittest.TestCase):
             format=None,
             sort=None,
             on_order=None,
+            client=None,
             includeauthor="J. K. Rowling",
             includekeyword="magic",
             excludetitle="Harry Potter",
         )
-        search_class.return_value.getResults.assert_called_once_with(pages=2)
+        search_class.return_value.getResults.assert_called_once_with(
+            pages=2, start_page=1, concurrency=4
+        )
 
     @mock.patch("sfpl.cli.AdvancedSearch")
     def test_advanced_search_with_format_and_sort(self, search_class):
@@ -222,6 +332,7 @@ class CLITest(unittest.TestCase):
             format="LP",
             sort="newly_acquired",
             on_order=None,
+            client=None,
             includeauthor="Miles Davis",
         )
 
@@ -265,9 +376,39 @@ class CLITest(unittest.TestCase):
 
         self.assertEqual(status, 0)
         self.assertEqual(stderr, "")
-        branch_class.assert_called_once_with("west portal")
+        branch_class.assert_called_once_with("west portal", client=None)
         self.assertEqual(stdout, "west portal\nSun: 1 - 5\nMon: 10 - 6\n")
 
+    @mock.patch("sfpl.cli.Branch.getAllHours")
+    def test_branch_hours_all(self, get_all_hours):
+        get_all_hours.return_value = {
+            "anza": {"Sun": "1 - 5"},
+            "main library": {"Sun": "12 - 6"},
+        }
+
+        status, stdout, stderr = self.invoke(["branch-hours", "--all"])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stderr, "")
+        get_all_hours.assert_called_once_with(client=None)
+        self.assertEqual(stdout, "anza\nSun: 1 - 5\n\nmain library\nSun: 12 - 6\n")
+
+    @mock.patch("sfpl.cli.Branch.getAllHours")
+    def test_branch_hours_all_json(self, get_all_hours):
+        get_all_hours.return_value = {"anza": {"Sun": "1 - 5"}}
+
+        status, stdout, _ = self.invoke(["branch-hours", "--all", "--output", "json"])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(stdout), {"branches": {"anza": {"Sun": "1 - 5"}}})
+
+    def test_branch_hours_needs_exactly_one_of_name_and_all(self):
+        for arguments in (["branch-hours"], ["branch-hours", "anza", "--all"]):
+            with self.subTest(arguments=arguments):
+                status, _, stderr = self.invoke(arguments)
+                self.assertEqual(status, 2)
+                self.assertIn("--all", stderr)
+
     @mock.patch("sfpl.cli.Account")
     def test_account_holds_uses_environment_credentials(self, account_class):
         account_class.return_value.getHolds.return_value = [
@@ -281,7 +422,9 @@ class CLITest(unittest.TestCase):
 
         self.assertEqual(status, 0)
         self.assertEqual(stderr, "")
-        account_class.assert_called_once_with("card", "secret")
+        account_class.assert_called_once_with(
+            "card", "secret", client=None, sessions=None
+        )
         self.assertEqual(stdout, "Reserved — Author (READY)\n")
         self.assertNotIn("secret", stdout)
 
@@ -294,9 +437,116 @@ class CLITest(unittest.TestCase):
         )
 
         self.assertEqual(status, 0)
-        account_class.assert_called_once_with("card", "1234")
+        account_class.assert_called_once_with(
+            "card", "1234", client=None, sessions=None
+        )
         self.assertIn("Borrowed", stdout)
 
+    @mock.patch("sfpl.cli.Account")
+    def test_account_renew_all_reports_each_book(self, account_class):
+        renewed, refused = book("Renewed"), book("Refused")
+        account_class.return_value.renewAll.return_value = [
+            Outcome(renewed, value=True),
+            Outcome(refused, error=exceptions.RenewError("too many renewals")),
+        ]
+
+        status, stdout, _ = self.invoke(
+            ["account", "renew", "--all"], {"SFPL_BARCODE": "card", "SFPL_PIN": "1"}
+        )
+
+        self.assertEqual(status, 1)
+        self.assertEqual(
+            stdout,
+            "Renewed: renewed\nRefused: not renewed: too many renewals\n",
+        )
+
+    @mock.patch("sfpl.cli.Account")
+    def test_account_renew_ids_as_json(self, account_class):
+        account_class.return_value.renewMany.side_effect = lambda books: [
+            Outcome(item, value=True) for item in books
+        ]
+
+        status, stdout, _ = self.invoke(
+            ["account", "renew", "42", "43", "--output", "ndjson"],
+            {"SFPL_BARCODE": "card", "SFPL_PIN": "1"},
+        )
+
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            [json.loads(line) for line in stdout.splitlines()],
+            [
+                {
+                    "type": "renewal",
+                    "id": book_id,
+                    "title": "",
+                    "renewed": True,
+                    "error": None,
+                }
+                for book_id in ("42", "43")
+            ],
+        )
+
+    @mock.patch("sfpl.cli.Account")
+    def test_account_summary_renders_each_view(self, account_class):
+        summary = account_class.return_value.getSummary.return_value
+        summary.ready = [book("Waiting", status="READY_FOR_PICKUP")]
+        summary.dueSoon = [book("Borrowed", status="Due 2025-05-12")]
+        summary.holds = []
+        summary.checkouts = summary.dueSoon
+
+        status, stdout, _ = self.invoke(
+            ["account", "summary", "--due-within", "5"],
+            {"SFPL_BARCODE": "card", "SFPL_PIN": "1"},
+        )
+
+        self.assertEqual(status, 0)
+        account_class.return_value.getSummary.assert_called_once_with(due_within=5)
+        self.assertEqual(
+            stdout,
+            "Ready for pickup (1):\n"
+            "  Waiting — Author (READY_FOR_PICKUP)\n"
+            "\n"
+            "Due soon (1):\n"
+            "  Borrowed — Author (Due 2025-05-12)\n"
+            "\n"
+            "On hold (0):\n"
+            "\n"
+            "Checked out (1):\n"
+            "  Borrowed — Author (Due 2025-05-12)\n",
+        )
+
+    @mock.patch("sfpl.cli.Account")
+    def test_account_summary_as_json(self, account_class):
+        summary = account_class.return_value.getSummary.return_value
+        summary.ready = summary.dueSoon = summary.holds = []
+        summary.checkouts = [book("Borrowed")]
+
+        status, stdout, _ = self.invoke(
+            ["account", "summary", "--output", "json"],
+            {"SFPL_BARCODE": "card", "SFPL_PIN": "1"},
+        )
+
+        self.assertEqual(status, 0)
+        document = json.loads(stdout)
+        self.assertEqual(list(document), ["ready", "due_soon", "holds", "checkouts"])
+        self.assertEqual(document["checkouts"][0]["title"], "Borrowed")
+
+    def test_account_summary_rejects_negative_days(self):
+        stderr = io.StringIO()
+
+        with mock.patch("sys.stderr", stderr), self.assertRaises(SystemExit) as exit:
+            self.invoke(["account", "summary", "--due-within", "-1"], {"SFPL_PIN": "1"})
+
+        self.assertEqual(exit.exception.code, 2)
+        self.assertIn("must not be negative", stderr.getvalue())
+
+    def test_account_renew_requires_books_or_all(self):
+        for argv in (["account", "renew"], ["account", "renew", "42", "--all"]):
+            with self.subTest(argv=argv):
+                status, _, stderr = self.invoke(argv, {"SFPL_PIN": "1"})
+                self.assertEqual(status, 2)
+                self.assertIn("--all", stderr)
+
     def test_noninteractive_account_requires_pin_without_echoing_credentials(self):
         status, _, stderr = self.invoke(["account", "holds", "--barcode", "card"], {})
         self.assertEqual(status, 2)
@@ -320,24 +570,26 @@ class CLITest(unittest.TestCase):
         self.assertEqual(status, 0)
         self.assertEqual(stderr, "")
         book_class.assert_called_once_with(
-            {"_id": "12345", "title": "", "subtitle": "", "author": ""}
+            {"_id": "12345", "title": "", "subtitle": "", "author": ""}, client=None
         )
         self.assertIn("Title: Python Programming", stdout)
         self.assertIn("Author: Guido van Rossum", stdout)
         self.assertIn("Description: A comprehensive python guide.", stdout)
 
-    @mock.patch("sfpl.cli.Search")
-    def test_search_with_details_flag(self, search_class):
-        b = book("Python")
-        b.getDetails = mock.MagicMock(
-            return_value={
-                "brief": {
-                    "title": "Python",
-                    "description": "Python book description",
-                }
+    @mock.patch.object(
+        Book,
+        "getDetails",
+        autospec=True,
+        return_value={
+            "brief": {
+                "title": "Python",
+                "description": "Python book description",
             }
-        )
-        search_class.return_value.getResults.return_value = iter([[b]])
+        },
+    )
+    @mock.patch("sfpl.cli.Search")
+    def test_search_with_details_flag(self, search_class, _get_details):
+        search_class.return_value.getResults.return_value = iter([[book("Python")]])
 
         status, stdout, stderr = self.invoke(["search", "python", "--details"])
         self.assertEqual(status, 0)
@@ -345,6 +597,101 @@ class CLITest(unittest.TestCase):
         self.assertIn("Python — Author", stdout)
         self.assertIn("Description: Python book description", stdout)
 
+    @mock.patch.object(Book, "getDetails", autospec=True)
+    @mock.patch("sfpl.cli.Search")
+    def test_search_details_are_fetched_per_page_in_order(
+        self, search_class, get_details
+    ):
+        def details(book):
+            if book.title == "Second":
+                raise exceptions.MissingScriptError()
+            return {"brief": {"description": f"{book.title} description"}}
+
+        get_details.side_effect = details
+        search_class.return_value.getResults.return_value = iter(
+            [[book("First"), book("Second")], [book("Third")]]
+        )
+
+        status, stdout, stderr = self.invoke(
+            ["search", "python", "--details", "--pages", "2"]
+        )
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stderr, "")
+        self.assertEqual(
+            stdout,
+            "First — Author\nDescription: First description\n"
+            "Second — Author\n"
+            "Third — Author\nDescription: Third description\n",
+        )
+
+    @mock.patch("sfpl.cli.Crawler")
+    def test_crawl_sweeps_each_query_by_format(self, crawler_class):
+        crawler = crawler_class.return_value
+        crawler.crawl.return_value = [
+            {"query": "q", "pages": 3, "books": 25, "page": 3, "done": True}
+        ]
+
+        status, stdout, stderr = self.invoke(
+            ["crawl", "mirror.db", "jazz", "blues", "--format", "LP", "--format", "CD"]
+        )
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stderr, "")
+        crawler_class.assert_called_once_with("mirror.db", concurrency=4, batch_size=10)
+        (searches,), kwargs = crawler.crawl.call_args
+        self.assertEqual(kwargs, {"refresh": False})
+        self.assertEqual(
+            [(search.term, search.format) for search in searches],
+            [("jazz", "LP"), ("jazz", "CD"), ("blues", "LP"), ("blues", "CD")],
+        )
+        crawler.close.assert_called_once_with()
+        self.assertEqual(stdout, "q: 3 pages, 25 books\n")
+
+    @mock.patch("sfpl.cli.Branch")
+    def test_cache_option_gives_commands_a_caching_client(self, branch_class):
+        branch_class.return_value.name = "anza"
+        branch_class.return_value.getHours.return_value = {}
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.db")
+            status, _, stderr = self.invoke(
+                ["branch-hours", "anza"], {"SFPL_CACHE": path}
+            )
+
+            self.assertEqual(status, 0, stderr)
+            client = branch_class.call_args.kwargs["client"]
+            self.assertEqual(client.cache.path, path)
+
+    def test_cache_stats(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.db")
+            cache = ResponseCache(path)
+            cache.record("https://sfpl.org/locations/anza", "hit")
+            cache.record("https://sfpl.org/locations/anza", "hit")
+            cache.record("https://sfpl.bibliocommons.com/item/show/1", "miss")
+            cache.close()
+
+            status, stdout, _ = self.invoke(["--cache", path, "cache", "stats"])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stdout, "hit branch: 2\nmiss item: 1\n")
+
+    def test_cache_commands_require_a_cache(self):
+        status, _, stderr = self.invoke(["cache", "clear"])
+        self.assertEqual(status, 2)
+        self.assertIn("no cache configured", stderr)
+
+    def test_cache_commands_require_a_cache_with_other_client_options(self):
+        for argv in (
+            ["--rate", "5", "cache", "stats"],
+            ["--retries", "2", "cache", "clear"],
+        ):
+            with self.subTest(argv=argv):
+                status, _, stderr = self.invoke(argv)
+                self.assertEqual(status, 2)
+                self.assertIn("no cache configured", stderr)
+
     @mock.patch("sfpl.cli.Branch", side_effect=exceptions.NoBranchFound("missing"))
     def test_domain_errors_are_concise(self, _branch_class):
         status, _, stderr = self.invoke(["branch-hours", "missing"])
@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+import sfpl
+from sfpl import client as client_module
+from sfpl.sfpl import Book, Branch, Search, _parse_search_page
+
+
+class TestClient(unittest.TestCase):
+    def test_sessions_share_the_connection_pool(self):
+        client = sfpl.Client(pool_size=4, headers={"User-Agent": "test"})
+        session = client.new_session()
+
+        self.assertIsNot(session, client.session)
+        self.assertIs(session.get_adapter("https://sfpl.org"), client.adapter)
+        self.assertIs(client.session.get_adapter("https://sfpl.org"), client.adapter)
+        self.assertEqual(session.headers["User-Agent"], "test")
+
+    def test_request_applies_default_timeout(self):
+        client = sfpl.Client(timeout=5)
+        session = mock.Mock()
+
+        client.get("https://sfpl.org", session=session)
+        client.post("https://sfpl.org", session=session, timeout=1)
+
+        session.request.assert_has_calls(
+            [
+                mock.call("GET", "https://sfpl.org", timeout=5),
+                mock.call("POST", "https://sfpl.org", timeout=1),
+            ]
+        )
+
+    def test_hosts_redirect_requests(self):
+        client = sfpl.Client(hosts={"sfpl.org": "http://127.0.0.1:8000/"})
+        session = mock.Mock()
+
+        client.get("https://sfpl.org/locations/anza?x=1", session=session)
+        client.get("https://sfpl.bibliocommons.com/v2/search", session=session)
+
+        session.request.assert_has_calls(
+            [
+                mock.call(
+                    "GET", "http://127.0.0.1:8000/locations/anza?x=1", timeout=30
+                ),
+                mock.call(
+                    "GET", "https://sfpl.bibliocommons.com/v2/search", timeout=30
+                ),
+            ]
+        )
+
+    def test_classes_default_to_shared_client(self):
+        shared = client_module.get_default_client()
+
+        self.assertIs(Branch("anza").client, shared)
+        self.assertIs(Search("Python").client, shared)
+        self.assertIs(client_module.get_default_client(), shared)
+
+    def test_set_default_client(self):
+        previous = client_module.get_default_client()
+        replacement = sfpl.Client()
+        try:
+            client_module.set_default_client(replacement)
+            self.assertIs(Branch("anza").client, replacement)
+        finally:
+            client_module.set_default_client(previous)
+
+    def test_client_is_passed_to_results(self):
+        client = sfpl.Client()
+        page = (
+            "<span>1 to 1 of 1 result</span>"
+            '<script type="application/json" data-iso-key="_0">'
+            '{"entities": {"bibs": {"S93C1236126": {"briefInfo": '
+            '{"title": "Kolyma Tales", "subtitle": "", "authors": []}}}}}'
+            "</script>"
+        )
+
+        total, books = _parse_search_page(page, client=client)
+
+        self.assertEqual(total, 1)
+        self.assertEqual(
+            books,
+            [Book({"title": "", "author": "", "subtitle": "", "_id": "1236126093"})],
+        )
+        self.assertIs(books[0].client, client)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import requests
+
+from sfpl.client import Client
+from sfpl.crawl import CatalogStore, Crawler, query_key, sweep
+from sfpl.sfpl import AdvancedSearch, Search
+
+from .server import StubServer, search_page
+
+
+class TestCrawler(unittest.TestCase):
+    def setUp(self):
+        self.failing_page = None
+        self.countless_page = None
+        self.total = 45
+
+        def search(request):
+            page = int(request.query["page"][0])
+            if page == self.failing_page:
+                return 500, {}, "server error"
+            if page == self.countless_page:
+                return 200, {}, "<html><body>Try again later</body></html>"
+            return 200, {}, search_page(page, self.total)
+
+        self.server = StubServer({("GET", "/v2/search"): search}).start()
+        self.client = Client(hosts=self.server.hosts, timeout=5)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "catalog.db")
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def search(self, term="python", **kwargs):
+        return Search(term, client=self.client, **kwargs)
+
+    def pages_requested(self):
+        return [int(r.query["page"][0]) for r in self.server.requested("/v2/search")]
+
+    def test_every_page_is_stored(self):
+        with CatalogStore(self.path) as store:
+            [result] = Crawler(store, concurrency=3, batch_size=2).crawl(
+                [self.search()]
+            )
+
+            self.assertEqual(len(store), 45)
+            self.assertEqual(store.get_book("45093").title, "Book 45")
+            self.assertIsNone(store.get_book("99"))
+
+        self.assertEqual(
+            result,
+            {
+                "query": query_key(self.search()),
+                "pages": 5,
+                "books": 45,
+                "page": 5,
+                "last_page": 5,
+                "done": True,
+            },
+        )
+
+    def test_failed_crawls_resume_after_the_last_stored_page(self):
+        self.failing_page = 4
+
+        with CatalogStore(self.path) as store, self.assertRaises(requests.HTTPError):
+            Crawler(store, concurrency=1, batch_size=2).crawl([self.search()])
+
+        with sqlite3.connect(self.path) as connection:
+            (count,) = connection.execute("SELECT count(*) FROM books").fetchone()
+        self.assertEqual(count, 30)
+
+        self.failing_page = None
+        self.server.requests.clear()
+
+        with CatalogStore(self.path) as store:
+            [result] = Crawler(store, concurrency=1).crawl([self.search()])
+
+            self.assertEqual(len(store), 45)
+
+        self.assertEqual(self.pages_requested(), [4, 5])
+        self.assertEqual(
+            (result["pages"], result["books"], result["done"]), (2, 15, True)
+        )
+
+    def test_pages_without_a_result_count_leave_the_crawl_resumable(self):
+        self.countless_page = 3
+
+        with CatalogStore(self.path) as store:
+            [result] = Crawler(store, concurrency=1).crawl([self.search()])
+
+            self.assertEqual((result["page"], result["done"]), (2, False))
+            self.assertFalse(store.progress()[result["query"]]["done"])
+
+        self.countless_page = None
+        self.server.requests.clear()
+
+        with CatalogStore(self.path) as store:
+            [result] = Crawler(store, concurrency=1).crawl([self.search()])
+
+            self.assertEqual(len(store), 45)
+
+        self.assertEqual(self.pages_requested(), [3, 4, 5])
+        self.assertTrue(result["done"])
+
+    def test_finished_crawls_are_skipped_unless_refreshed(self):
+        crawler = Crawler(self.path)
+        crawler.crawl([self.search()])
+        self.server.requests.clear()
+
+        [result] = crawler.crawl([self.search()])
+
+        self.assertEqual(self.pages_requested(), [])
+        self.assertEqual((result["pages"], result["done"]), (0, True))
+
+        self.total = 12
+        [result] = crawler.crawl([self.search()], refresh=True)
+
+        self.assertEqual(self.pages_requested(), [1, 2])
+        self.assertEqual(result["books"], 12)
+        self.assertEqual(len(crawler.store), 45)
+        crawler.close()
+
+    def test_books_are_upserted_by_id(self):
+        with CatalogStore(self.path) as store:
+            Crawler(store).crawl(
+                [
+                    self.search("python"),
+                    AdvancedSearch(includeauthor="x", client=self.client),
+                ]
+            )
+
+            self.assertEqual(len(store), 45)
+            self.assertEqual(len(store.progress()), 2)
+            self.assertEqual([_id for _id, _ in store.bibs()][:2], ["1093", "2093"])
+
+    def test_sweep_builds_a_search_per_facet(self):
+        searches = sweep(
+            "jazz", formats=("LP", "CD"), on_order=(True, False), client=self.client
+        )
+
+        self.assertEqual(
+            [(s.format, s.on_order) for s in searches],
+            [("LP", True), ("LP", False), ("CD", True), ("CD", False)],
+        )
+        self.assertEqual(len({query_key(s) for s in searches}), 4)
+
+    def test_list_searches_are_rejected(self):
+        crawler = Crawler(self.path)
+        with self.assertRaises(ValueError):
+            crawler.crawl([self.search(_type="list")])
+        crawler.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
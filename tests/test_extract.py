@@ -0,0 +1,56 @@
+import codecs
+import os
+import unittest
+
+from sfpl import exceptions
+from sfpl.extract import (
+    _soup_extract_data,
+    extract_data,
+    extract_json_island,
+    extract_result_count,
+)
+
+
+def fixture(name):
+    with codecs.open(
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), "assets", name),
+        encoding="utf-8",
+    ) as mockup:
+        return mockup.read()
+
+
+class TestExtract(unittest.TestCase):
+    def test_matches_soup_on_fixtures(self):
+        for name in ("holds.html", "checkouts.html"):
+            with self.subTest(name=name):
+                page = fixture(name)
+                self.assertEqual(extract_data(page), _soup_extract_data(page))
+
+    def test_skips_non_script_iso_key(self):
+        page = (
+            '<div data-iso-key="_0">{}</div>'
+            '<script data-iso-key="_0" type="application/json">{"a": 1}</script>'
+        )
+        self.assertEqual(extract_json_island(page), '{"a": 1}')
+        self.assertEqual(extract_data(page), {"a": 1})
+
+    def test_falls_back_to_soup(self):
+        # Unquoted attributes aren't matched by the fast scan.
+        page = '<script type=application/json data-iso-key=_0>{"a": 1}</script>'
+        self.assertIsNone(extract_json_island(page))
+        self.assertEqual(extract_data(page), {"a": 1})
+
+    def test_missing_script(self):
+        with self.assertRaises(exceptions.MissingScriptError):
+            extract_data(fixture("shelf.html"))
+
+    def test_result_count(self):
+        self.assertEqual(
+            extract_result_count("<span>1 to 10 of 1,234 results</span>"), 1234
+        )
+        self.assertEqual(extract_result_count("<span>1 to 1 of 1 result</span>"), 1)
+        self.assertIsNone(extract_result_count("<span>No results</span>"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
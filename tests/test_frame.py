@@ -0,0 +1,167 @@
+import unittest
+
+from sfpl.client import Client
+from sfpl.frame import BookFrame, numpy, pyarrow
+from sfpl.sfpl import Book, Search
+
+from .server import StubServer, search_page
+
+
+def bib(title, authors, subtitle=""):
+    return {"briefInfo": {"title": title, "subtitle": subtitle, "authors": authors}}
+
+
+BIBS = {
+    "S93C3": bib("Dune", ["Herbert, Frank"]),
+    "S93C1": bib("Emma", ["Austen, Jane"]),
+    "S93C2": bib("Persuasion", ["Austen, Jane", "Editor"]),
+    "S93C4": bib("Anonymous", []),
+}
+
+
+class TestBookFrame(unittest.TestCase):
+    def setUp(self):
+        self.frame = BookFrame.fromBibs(BIBS)
+
+    def test_columns_are_dictionary_encoded(self):
+        self.assertEqual(len(self.frame), 4)
+        self.assertEqual(list(self.frame.ids), [3093, 1093, 2093, 4093])
+        self.assertEqual(list(self.frame.codes["author"]), [0, 1, 1, 2])
+        self.assertEqual(
+            self.frame.categories["author"], ["Herbert, Frank", "Austen, Jane", None]
+        )
+        self.assertEqual(
+            self.frame.column("title"), ["Dune", "Emma", "Persuasion", "Anonymous"]
+        )
+        self.assertEqual(self.frame.column("id"), ["3093", "1093", "2093", "4093"])
+
+    def test_all_authors(self):
+        frame = BookFrame.fromBibs(BIBS, all_authors=True)
+        self.assertEqual(frame.column("author")[2], "Austen, Jane & Editor")
+
+    def test_filter(self):
+        austen = self.frame.filter(author="Austen, Jane")
+        self.assertEqual(austen.column("title"), ["Emma", "Persuasion"])
+
+        self.assertEqual(
+            self.frame.filter(author=["Herbert, Frank", None]).column("title"),
+            ["Dune", "Anonymous"],
+        )
+        self.assertEqual(
+            self.frame.filter(author="Austen, Jane", id="2093").column("title"),
+            ["Persuasion"],
+        )
+        self.assertEqual(
+            self.frame.filter(mask=[True, False, False, True]).column("id"),
+            ["3093", "4093"],
+        )
+        self.assertEqual(len(self.frame.filter(author="Nobody")), 0)
+
+    def test_sort(self):
+        self.assertEqual(
+            self.frame.sortBy("title").column("title"),
+            ["Anonymous", "Dune", "Emma", "Persuasion"],
+        )
+        self.assertEqual(
+            self.frame.sortBy("author").column("author"),
+            [None, "Austen, Jane", "Austen, Jane", "Herbert, Frank"],
+        )
+        self.assertEqual(
+            self.frame.sortBy("id", reverse=True).column("id"),
+            ["4093", "3093", "2093", "1093"],
+        )
+
+    def test_concat_and_unique(self):
+        other = BookFrame.fromBibs(
+            {"S93C1": BIBS["S93C1"], "S93C5": bib("Ulysses", [])}
+        )
+
+        joined = BookFrame.concat([self.frame, other])
+
+        self.assertEqual(len(joined), 6)
+        self.assertEqual(joined.column("author")[4:], ["Austen, Jane", None])
+        self.assertEqual(
+            joined.unique().column("title"),
+            ["Dune", "Emma", "Persuasion", "Anonymous", "Ulysses"],
+        )
+
+    def test_rows_and_books(self):
+        self.assertEqual(
+            next(self.frame.rows()),
+            {
+                "_id": "3093",
+                "title": "Dune",
+                "author": "Herbert, Frank",
+                "subtitle": "",
+            },
+        )
+
+        books = list(self.frame.toBooks())
+
+        self.assertIsInstance(books[0], Book)
+        self.assertEqual(books[1], Book.fromBib(BIBS["S93C1"], metadata_id="S93C1"))
+        self.assertEqual(
+            BookFrame.fromBooks(books).column("title"), self.frame.column("title")
+        )
+
+    @unittest.skipUnless(numpy, "numpy is not installed")
+    def test_to_numpy(self):
+        arrays = self.frame.toNumpy()
+
+        self.assertEqual(arrays["id"].tolist(), [3093, 1093, 2093, 4093])
+        self.assertTrue(
+            numpy.shares_memory(
+                arrays["id"], numpy.frombuffer(self.frame.ids, dtype=numpy.int64)
+            )
+        )
+        self.assertEqual(arrays["author"].tolist(), self.frame.column("author"))
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_to_arrow(self):
+        table = self.frame.toArrow()
+
+        self.assertEqual(table.column("id").to_pylist(), [3093, 1093, 2093, 4093])
+        self.assertEqual(
+            table.column("author").to_pylist(), self.frame.column("author")
+        )
+
+    @unittest.skipIf(numpy and pyarrow, "numpy and pyarrow are installed")
+    def test_exports_need_their_packages(self):
+        for export, package in (
+            (self.frame.toNumpy, numpy),
+            (self.frame.toArrow, pyarrow),
+        ):
+            if package is None:
+                with self.assertRaises(ImportError):
+                    export()
+
+
+class TestSearchFrame(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        def search(request):
+            return 200, {}, search_page(int(request.query["page"][0]), 25)
+
+        cls.server = StubServer({("GET", "/v2/search"): search}).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_get_frame(self):
+        search = Search("python", client=Client(hosts=self.server.hosts, timeout=5))
+
+        frame = search.getFrame(pages="all", concurrency=2)
+
+        self.assertEqual(len(frame), 25)
+        self.assertEqual(frame.column("title")[0], "Book 1")
+        self.assertEqual(frame.column("title")[-1], "Book 25")
+        self.assertEqual(frame.categories["author"], ["Author"])
+
+    def test_list_searches_have_no_frame(self):
+        with self.assertRaises(ValueError):
+            Search("python", _type="list").getFrame()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sfpl import exceptions
+from sfpl.client import Client
+from sfpl.crawl import CatalogStore, Crawler
+from sfpl.index import LocalIndex, LocalSearch, tokenize
+from sfpl.sfpl import Search
+
+from .server import StubServer, search_page
+
+
+def bib(title, authors=("Author",), subtitle=""):
+    return {
+        "briefInfo": {"title": title, "subtitle": subtitle, "authors": list(authors)}
+    }
+
+
+BIBS = {
+    "S93C1": bib(
+        "Fantastic Beasts and Where to Find Them", ["Rowling, J. K.", "Scamander"]
+    ),
+    "S93C2": bib("Animales fantásticos y dónde encontrarlos", ["Rowling, J. K."]),
+    "S93C3": bib("The Casual Vacancy", ["Rowling, J. K."]),
+    "S93C4": bib("Learning Python", ["Lutz, Mark"], subtitle="Powerful Programming"),
+    "S93C5": bib("Fluent Python", ["Ramalho, Luciano"]),
+}
+
+
+class TestLocalIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = CatalogStore(os.path.join(self.directory.name, "catalog.db"))
+        self.store.upsert(BIBS)
+        self.store.commit()
+        self.index = LocalIndex(self.store, client=Client())
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def titles(self, term, _type="keyword", **kwargs):
+        return [
+            [book.title for book in page]
+            for page in self.index.search(term, _type).getResults(**kwargs)
+        ]
+
+    def test_tokenize_folds_case_and_accents(self):
+        self.assertEqual(
+            tokenize("Animales Fantásticos, y dónde"),
+            ["animales", "fantasticos", "y", "donde"],
+        )
+        self.assertEqual(tokenize(None), [])
+
+    def test_searches_match_every_word_in_their_fields(self):
+        self.assertEqual(self.index.update(), 5)
+
+        self.assertEqual(self.titles("python"), [["Fluent Python", "Learning Python"]])
+        self.assertEqual(self.titles("programming python"), [["Learning Python"]])
+        self.assertEqual(self.titles("programming", "title"), [["Learning Python"]])
+        self.assertEqual(self.titles("scamander", "title"), [])
+        self.assertEqual(
+            self.titles("fantasticos", "title"),
+            [["Animales fantásticos y dónde encontrarlos"]],
+        )
+        self.assertEqual(
+            self.titles("ROWLING", "author"),
+            [
+                [
+                    "Animales fantásticos y dónde encontrarlos",
+                    "Fantastic Beasts and Where to Find Them",
+                    "The Casual Vacancy",
+                ]
+            ],
+        )
+        self.assertEqual(self.titles("3093"), [["The Casual Vacancy"]])
+        self.assertEqual(self.titles("  "), [])
+
+    def test_results_are_books_in_pages_of_ten(self):
+        self.store.upsert({f"S93C{n}": bib(f"Python {n:02}") for n in range(10, 35)})
+        self.index.update()
+        search = self.index.search("python")
+
+        with mock.patch.object(
+            LocalSearch, "count", autospec=True, side_effect=LocalSearch.count
+        ) as count:
+            pages = list(search.getResults(pages="all"))
+
+        self.assertEqual(count.call_count, 1)
+        self.assertEqual(search.count(), 27)
+        self.assertEqual([len(page) for page in pages], [10, 10, 7])
+        self.assertEqual(pages[0][0].title, "Fluent Python")
+        self.assertEqual(pages[0][0]._id, "5093")
+        self.assertIs(pages[0][0].client, self.index.client)
+        self.assertEqual(
+            [len(page) for page in search.getResults(pages=2, start_page=3)], [7]
+        )
+
+    def test_updates_only_index_new_and_changed_books(self):
+        self.index.update()
+
+        self.assertEqual(self.index.update(), 0)
+
+        self.store.upsert({"S93C3": bib("The Ickabog", ["Rowling, J. K."])})
+        self.store.upsert({"S93C6": bib("Python Crash Course")})
+        self.store.commit()
+
+        self.assertEqual(self.index.update(), 2)
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(self.titles("vacancy"), [])
+        self.assertEqual(self.titles("ickabog"), [["The Ickabog"]])
+
+    def test_invalid_search_type(self):
+        with self.assertRaises(exceptions.InvalidSearchType):
+            self.index.search("python", "subject")
+
+
+class TestCrawlerIndexing(unittest.TestCase):
+    def test_crawled_pages_are_indexed_as_they_are_stored(self):
+        server = StubServer(
+            {
+                ("GET", "/v2/search"): lambda request: (
+                    200,
+                    {},
+                    search_page(int(request.query["page"][0]), 15),
+                )
+            }
+        ).start()
+        client = Client(hosts=server.hosts, timeout=5)
+        directory = tempfile.TemporaryDirectory()
+
+        try:
+            store = CatalogStore(os.path.join(directory.name, "catalog.db"))
+            index = LocalIndex(store)
+            Crawler(store, index=index).crawl([Search("books", client=client)])
+
+            self.assertEqual(len(index), 15)
+            self.assertEqual(index.update(), 0)
+            [[book]] = index.search("book 12").getResults()
+            self.assertEqual(book.title, "Book 12")
+            index.close()
+        finally:
+            client.close()
+            server.stop()
+            directory.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
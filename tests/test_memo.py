@@ -0,0 +1,172 @@
+import threading
+import unittest
+from unittest import mock
+
+from sfpl import exceptions
+from sfpl.client import Client
+from sfpl.memo import Memo, MemoCache
+from sfpl.sfpl import Book, Branch, User
+
+from .server import StubServer, hours_page, item_page
+
+
+class TestMemoCache(unittest.TestCase):
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = MemoCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+
+        cache.put("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+
+    @mock.patch("sfpl.memo.time.monotonic")
+    def test_entries_expire(self, monotonic):
+        monotonic.return_value = 100.0
+        cache = MemoCache(ttl=10)
+        cache.put("a", 1)
+
+        monotonic.return_value = 109.0
+        self.assertEqual(cache.get("a"), 1)
+
+        monotonic.return_value = 110.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_hit_rate_and_clear(self):
+        cache = MemoCache()
+        self.assertEqual(cache.hit_rate, 0.0)
+
+        cache.get_or_compute("a", lambda: 1)
+        cache.get_or_compute("a", lambda: 2)
+        cache.get_or_compute("a", lambda: 3)
+        cache.get("b")
+
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assertEqual(cache.hit_rate, 0.5)
+        self.assertEqual(cache.get("a"), 1)
+
+        cache.clear()
+
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_invalidate(self):
+        cache = MemoCache()
+        cache.put("a", 1)
+
+        cache.invalidate("a")
+        cache.invalidate("missing")
+
+        self.assertNotIn("a", cache)
+
+    def test_failures_are_not_stored(self):
+        cache = MemoCache()
+
+        with self.assertRaises(ValueError):
+            cache.get_or_compute("a", mock.Mock(side_effect=ValueError))
+
+        self.assertEqual(cache.get_or_compute("a", lambda: 1), 1)
+
+    def test_concurrent_use_stays_bounded(self):
+        cache = MemoCache(maxsize=50)
+
+        def work(offset):
+            for n in range(1000):
+                cache.get_or_compute((offset + n) % 200, lambda n=n: n)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(cache), 50)
+        self.assertEqual(cache.hits + cache.misses, 8000)
+
+
+class TestMemoizedLookups(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StubServer(
+            {
+                ("GET", "/item/show/42"): lambda request: (200, {}, item_page("42")),
+                ("GET", "/locations/anza"): lambda request: (
+                    200,
+                    {},
+                    hours_page({"Sun": "1 - 5"}),
+                ),
+            }
+        ).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = Client(hosts=self.server.hosts, memo=Memo(), timeout=5)
+        self.server.requests.clear()
+
+    def book(self):
+        return Book(
+            {"title": "", "author": "", "subtitle": "", "_id": "42"},
+            client=self.client,
+        )
+
+    def test_details_are_memoized_by_id(self):
+        details = self.book().getDetails()
+
+        self.assertIs(self.book().getDetails(), details)
+        self.assertEqual(len(self.server.requested("/item/show/42")), 1)
+
+        self.client.memo.details.invalidate("42")
+        self.book().getDetails()
+
+        self.assertEqual(len(self.server.requested("/item/show/42")), 2)
+
+    def test_hours_are_memoized_by_branch(self):
+        Branch("anza", client=self.client).getHours()
+        Branch("Anza", client=self.client).getHours()
+
+        self.assertEqual(len(self.server.requested("/locations/anza")), 1)
+        self.assertEqual(
+            self.client.memo.stats["hours"],
+            {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1},
+        )
+
+    def test_users_are_memoized_by_name(self):
+        client = mock.Mock(memo=Memo())
+        client.get.return_value.url = "https://sfpl.bibliocommons.com/user_profile/7"
+
+        first = User("reader", client=client)
+        second = User("reader", client=client)
+
+        self.assertEqual((first._id, second._id), ("7", "7"))
+        client.get.assert_called_once()
+
+    def test_missing_users_are_not_memoized(self):
+        client = mock.Mock(memo=Memo())
+        client.get.return_value.url = "https://sfpl.bibliocommons.com/search"
+
+        for _ in range(2):
+            with self.assertRaises(exceptions.NoUserFound):
+                User("nobody", client=client)
+
+        self.assertEqual(client.get.call_count, 2)
+
+    def test_clients_without_a_memo_always_fetch(self):
+        client = Client(hosts=self.server.hosts, timeout=5)
+
+        for _ in range(2):
+            Book(
+                {"title": "", "author": "", "subtitle": "", "_id": "42"},
+                client=client,
+            ).getDetails()
+
+        self.assertEqual(len(self.server.requested("/item/show/42")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+from unittest import mock
+
+from sfpl.client import Client
+from sfpl.ratelimit import RateLimiter, retry_after
+
+from .server import response
+
+URL = "https://sfpl.bibliocommons.com/v2/search?query=python"
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(retry_after({"Retry-After": " 120 "}), 120.0)
+        self.assertEqual(retry_after({"Retry-After": "-5"}), 0.0)
+
+    def test_http_date(self):
+        when = datetime.now(UTC) + timedelta(seconds=60)
+        seconds = retry_after({"Retry-After": format_datetime(when, usegmt=True)})
+
+        self.assertAlmostEqual(seconds, 60, delta=2)
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(retry_after({}))
+        self.assertIsNone(retry_after({"Retry-After": "soon"}))
+
+
+@mock.patch("sfpl.ratelimit.time.sleep")
+@mock.patch("sfpl.ratelimit.time.monotonic", return_value=100.0)
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_rate(self, monotonic, sleep):
+        limiter = RateLimiter(rate=2, burst=2)
+
+        self.assertEqual(limiter.acquire(URL), 0)
+        self.assertEqual(limiter.acquire(URL), 0)
+        self.assertEqual(limiter.acquire(URL), 0.5)
+        self.assertEqual(limiter.acquire(URL), 1.0)
+        sleep.assert_has_calls([mock.call(0.5), mock.call(1.0)])
+
+        monotonic.return_value = 110.0
+        self.assertEqual(limiter.acquire(URL), 0)
+
+    def test_hosts_have_separate_budgets(self, monotonic, sleep):
+        limiter = RateLimiter(
+            rate=1, burst=1, hosts={"gateway.bibliocommons.com": (10, 5)}
+        )
+
+        limiter.acquire(URL)
+        for _ in range(5):
+            self.assertEqual(limiter.acquire("https://gateway.bibliocommons.com/"), 0)
+        self.assertEqual(limiter.acquire(URL), 1.0)
+
+    def test_retry_after_pauses_host(self, monotonic, sleep):
+        limiter = RateLimiter(rate=100, burst=100)
+
+        paused = limiter.observe(URL, response(429, {"Retry-After": "30"}))
+
+        self.assertEqual(paused, 30.0)
+        self.assertEqual(limiter.acquire(URL), 30.0)
+        self.assertEqual(limiter.acquire("https://sfpl.org/locations"), 0)
+
+    def test_unthrottled_responses_are_ignored(self, monotonic, sleep):
+        limiter = RateLimiter()
+
+        self.assertIsNone(limiter.observe(URL, response(200, {"Retry-After": "30"})))
+        self.assertIsNone(limiter.observe(URL, response(503)))
+        self.assertEqual(limiter.acquire(URL), 0)
+
+    def test_stats(self, monotonic, sleep):
+        limiter = RateLimiter(rate=1, burst=1)
+
+        limiter.acquire(URL)
+        limiter.acquire(URL)
+        limiter.observe(URL, response(503))
+
+        self.assertEqual(
+            limiter.stats(),
+            {
+                "sfpl.bibliocommons.com": {
+                    "requests": 2,
+                    "waited": 1.0,
+                    "throttled": 1,
+                }
+            },
+        )
+        self.assertEqual(limiter.waited, 1.0)
+
+    def test_acquire_async(self, monotonic, sleep):
+        limiter = RateLimiter(rate=1, burst=1)
+
+        async def acquire_twice():
+            with mock.patch("sfpl.ratelimit.asyncio.sleep") as async_sleep:
+                waits = [await limiter.acquire_async(URL) for _ in range(2)]
+            async_sleep.assert_awaited_once_with(1.0)
+            return waits
+
+        self.assertEqual(asyncio.run(acquire_twice()), [0, 1.0])
+        sleep.assert_not_called()
+
+    def test_invalid_budgets(self, monotonic, sleep):
+        with self.assertRaises(ValueError):
+            RateLimiter(rate=0)
+        with self.assertRaises(ValueError):
+            RateLimiter(hosts={"sfpl.org": (1, 0)})
+
+
+class TestClientRateLimit(unittest.TestCase):
+    def test_client_acquires_and_observes(self):
+        limiter = mock.Mock()
+        client = Client(rate_limiter=limiter)
+        session = mock.Mock()
+        session.request.return_value = throttled = response(429)
+
+        self.assertIs(client.get(URL, session=session), throttled)
+        limiter.acquire.assert_called_once_with(URL)
+        limiter.observe.assert_called_once_with(URL, throttled)
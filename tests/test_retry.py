@@ -0,0 +1,192 @@
+import io
+import unittest
+from unittest import mock
+
+import requests
+
+from sfpl import exceptions
+from sfpl.cli import main
+from sfpl.client import Client
+from sfpl.retry import CircuitBreaker, RetryPolicy
+from sfpl.sfpl import Search
+
+from .server import StubServer, response, search_page
+
+URL = "https://sfpl.bibliocommons.com/v2/search?query=python"
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_only_idempotent_methods_and_retry_statuses(self):
+        policy = RetryPolicy(attempts=3)
+
+        self.assertTrue(policy.retries("get", URL, 1))
+        self.assertTrue(policy.retries("GET", URL, 2, status=503))
+        self.assertFalse(policy.retries("GET", URL, 3, status=503))
+        self.assertFalse(policy.retries("GET", URL, 1, status=404))
+        self.assertFalse(policy.retries("POST", URL, 1))
+        self.assertEqual(
+            policy.stats(), {"sfpl.bibliocommons.com": {"retried": 2, "exhausted": 1}}
+        )
+
+    def test_exponential_backoff(self):
+        policy = RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+
+        self.assertEqual([policy.delay(n) for n in range(1, 5)], [1, 2, 4, 5])
+
+    @mock.patch("sfpl.retry.random.uniform", side_effect=lambda low, high: high / 2)
+    def test_jitter_and_retry_after(self, uniform):
+        policy = RetryPolicy(backoff=2)
+
+        self.assertEqual(policy.delay(2), 2.0)
+        self.assertEqual(policy.delay(1, response(429, {"Retry-After": "10"})), 10.0)
+        uniform.assert_called_with(0, 2)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            RetryPolicy(attempts=0)
+
+
+@mock.patch("sfpl.retry.time.monotonic", return_value=100.0)
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures(self, monotonic):
+        breaker = CircuitBreaker(threshold=2, reset=30)
+
+        breaker.failure(URL)
+        breaker.observe(URL, 200)
+        breaker.failure(URL)
+        breaker.before(URL)
+        breaker.observe(URL, 502)
+
+        self.assertEqual(breaker.state(URL), "open")
+        with self.assertRaises(exceptions.CircuitOpen) as raised:
+            breaker.before(URL)
+        self.assertEqual(raised.exception.retry_in, 30)
+        breaker.before("https://sfpl.org/locations")
+
+    def test_probe_closes_or_reopens(self, monotonic):
+        breaker = CircuitBreaker(threshold=1, reset=30)
+        breaker.failure(URL)
+
+        monotonic.return_value = 130.0
+        self.assertEqual(breaker.state(URL), "half-open")
+        breaker.before(URL)
+        with self.assertRaises(exceptions.CircuitOpen):
+            breaker.before(URL)
+        breaker.failure(URL)
+        self.assertEqual(breaker.state(URL), "open")
+
+        monotonic.return_value = 160.0
+        breaker.before(URL)
+        breaker.success(URL)
+        self.assertEqual(
+            breaker.stats(),
+            {
+                "sfpl.bibliocommons.com": {
+                    "state": "closed",
+                    "failures": 0,
+                    "trips": 2,
+                    "rejected": 1,
+                }
+            },
+        )
+
+
+@mock.patch("sfpl.client.time.sleep")
+class TestClientRetries(unittest.TestCase):
+    def test_get_is_retried_after_connection_error(self, sleep):
+        client = Client(retry=RetryPolicy(attempts=3, jitter=False))
+        session = mock.Mock()
+        ok = response()
+        session.request.side_effect = [requests.ConnectionError(), response(503), ok]
+
+        self.assertIs(client.get(URL, session=session), ok)
+        self.assertEqual(session.request.call_count, 3)
+        sleep.assert_has_calls([mock.call(0.5), mock.call(1.0)])
+
+    def test_post_is_never_retried(self, sleep):
+        client = Client(retry=RetryPolicy(attempts=3))
+        session = mock.Mock()
+        session.request.side_effect = requests.ConnectionError()
+
+        with self.assertRaises(requests.ConnectionError):
+            client.post(URL, session=session)
+        self.assertEqual(session.request.call_count, 1)
+
+    def test_last_response_is_returned_when_retries_run_out(self, sleep):
+        client = Client(retry=RetryPolicy(attempts=2, jitter=False))
+        session = mock.Mock()
+        session.request.side_effect = [response(500), response(500)]
+
+        self.assertEqual(client.get(URL, session=session).status_code, 500)
+        self.assertEqual(client.retry.stats()["sfpl.bibliocommons.com"]["exhausted"], 1)
+
+    def test_open_circuit_fails_fast(self, sleep):
+        client = Client(
+            retry=RetryPolicy(attempts=5, jitter=False),
+            breaker=CircuitBreaker(threshold=2),
+        )
+        session = mock.Mock()
+        session.request.side_effect = requests.Timeout()
+
+        with self.assertRaises(exceptions.CircuitOpen):
+            client.get(URL, session=session)
+        self.assertEqual(session.request.call_count, 2)
+
+    def test_only_connection_errors_and_timeouts_trip_the_circuit(self, sleep):
+        breaker = CircuitBreaker(threshold=2)
+        client = Client(breaker=breaker)
+        session = mock.Mock()
+        session.request.side_effect = [
+            exceptions.UnrecordedRequest("GET", URL),
+            requests.exceptions.InvalidURL(),
+            exceptions.UnrecordedRequest("GET", URL),
+        ]
+
+        for _ in range(3):
+            with self.assertRaises(requests.RequestException):
+                client.get(URL, session=session)
+
+        self.assertEqual(breaker.state(URL), "closed")
+        self.assertEqual(session.request.call_count, 3)
+
+
+class TestRetriesEndToEnd(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+
+        def search(request):
+            self.calls += 1
+            if self.calls == 1:
+                return 502, {}, "bad gateway"
+            return 200, {}, search_page(int(request.query["page"][0]), 25)
+
+        self.server = StubServer({("GET", "/v2/search"): search})
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.hosts = self.server.hosts
+
+    @mock.patch("sfpl.client.time.sleep")
+    def test_search_survives_a_server_error(self, sleep):
+        client = Client(hosts=self.hosts, retry=RetryPolicy())
+
+        pages = list(Search("Python", client=client).getResults(pages=3))
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(client.retry.stats()["sfpl.bibliocommons.com"]["retried"], 1)
+
+    def test_cli_retries_option(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        def stub_client(**kwargs):
+            return Client(hosts=self.hosts, **kwargs)
+
+        with (
+            mock.patch("sfpl.client.time.sleep"),
+            mock.patch("sfpl.cli.Client", side_effect=stub_client),
+        ):
+            status = main(
+                ["--retries", "2", "search", "Python"], stdout=stdout, stderr=stderr
+            )
+
+        self.assertEqual(status, 0, stderr.getvalue())
+        self.assertEqual(self.calls, 2)
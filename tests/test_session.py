@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from sfpl.client import Client
+from sfpl.session import SessionStore
+from sfpl.sfpl import Account
+
+from .server import StubServer, asset
+
+DASHBOARD = '<div class="cp_user_card" data-name="reader" data-id="7"></div>'
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.logins = 0
+        self.valid = {"s1"}
+
+        def login(request):
+            self.logins += 1
+            token = f"s{self.logins}"
+            self.valid.add(token)
+            return (
+                200,
+                {
+                    "Content-Type": "application/json",
+                    "Set-Cookie": f"session={token}; Path=/",
+                },
+                json.dumps({"logged_in": True}),
+            )
+
+        def dashboard(request):
+            if request.cookies.get("session") not in self.valid:
+                return 302, {"Location": "/user/login"}, ""
+            return 200, {}, DASHBOARD
+
+        def checkouts(request):
+            if request.cookies.get("session") not in self.valid:
+                return 302, {"Location": "/user/login"}, ""
+            return 200, {}, asset("checkouts.html")
+
+        routes = {
+            ("POST", "/user/login"): login,
+            ("GET", "/user_dashboard"): dashboard,
+            ("GET", "/checkedout"): checkouts,
+            ("GET", "/user/login"): lambda request: (200, {}, "log in"),
+            ("GET", "/user/logout"): lambda request: (200, {}, ""),
+        }
+        self.server = StubServer(routes).start()
+        self.client = Client(hosts=self.server.hosts, timeout=5)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "sessions", "store.json")
+        self.store = SessionStore(self.path)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_saved_session_skips_login(self):
+        Account("card", "1234", client=self.client, sessions=self.store)
+        account = Account("card", "1234", client=self.client, sessions=self.store)
+
+        self.assertEqual(self.logins, 1)
+        self.assertEqual((account.name, account._id), ("reader", "7"))
+        self.assertEqual(account.session.cookies["session"], "s1")
+
+    def test_resuming_sends_no_requests(self):
+        first = Account("card", "1234", client=self.client, sessions=self.store)
+        self.assertEqual(first.name, "reader")
+        self.server.requests.clear()
+
+        account = Account("card", "1234", client=self.client, sessions=self.store)
+
+        self.assertEqual(account.name, "reader")
+        self.assertEqual(len(self.server.requests), 0)
+
+    def test_identity_is_saved_once_fetched(self):
+        first = Account("card", "1234", client=self.client, sessions=self.store)
+        self.assertIsNone(self.store.load("card", "1234").card)
+
+        self.assertEqual(first.name, "reader")
+        self.assertEqual(self.store.load("card", "1234").card, ("reader", "7"))
+
+    def test_store_is_private_and_holds_no_credentials(self):
+        Account("21223000012345", "1234", client=self.client, sessions=self.store)
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        with open(self.path) as file:
+            contents = file.read()
+        self.assertNotIn("21223000012345", contents)
+        self.assertNotIn("1234", contents)
+
+    def test_keys_are_salted_per_store(self):
+        Account("card", "1234", client=self.client, sessions=self.store)
+        other = SessionStore(os.path.join(self.directory.name, "other.json"))
+        Account("card", "1234", client=self.client, sessions=other)
+
+        stores = []
+        for path in (self.path, other.path):
+            with open(path) as file:
+                stores.append(json.load(file))
+
+        [first], [second] = (list(store["sessions"]) for store in stores)
+        self.assertNotEqual(stores[0]["salt"], stores[1]["salt"])
+        self.assertNotEqual(first, second)
+        self.assertNotEqual(first, hashlib.sha256(b"card\x001234").hexdigest())
+        self.assertEqual(first, SessionStore.key("card", "1234", stores[0]["salt"]))
+
+    def test_unsalted_store_is_ignored(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as file:
+            json.dump({hashlib.sha256(b"card\x001234").hexdigest(): {}}, file)
+
+        self.assertIsNone(self.store.load("card", "1234"))
+        Account("card", "1234", client=self.client, sessions=self.store)
+
+        with open(self.path) as file:
+            self.assertEqual(len(json.load(file)["sessions"]), 1)
+
+    def test_expired_session_logs_in_again(self):
+        Account("card", "1234", client=self.client, sessions=self.store)
+        self.valid.clear()
+
+        account = Account("card", "1234", client=self.client, sessions=self.store)
+        self.assertEqual(self.logins, 1)
+
+        self.assertEqual(account.name, "reader")
+        self.assertEqual(self.logins, 2)
+        self.assertEqual(account.session.cookies["session"], "s2")
+        self.assertEqual(self.store.load("card", "1234").cookies[0]["value"], "s2")
+
+    def test_expired_session_is_replaced_when_a_page_redirects(self):
+        Account("card", "1234", client=self.client, sessions=self.store)
+        self.valid.clear()
+        account = Account("card", "1234", client=self.client, sessions=self.store)
+
+        self.assertEqual(len(account.getCheckouts()), 9)
+        self.assertEqual(self.logins, 2)
+        self.assertEqual(len(self.server.requested("/checkedout")), 2)
+
+    def test_sessions_are_per_credentials(self):
+        Account("card", "1234", client=self.client, sessions=self.store)
+        Account("card", "9999", client=self.client, sessions=self.store)
+
+        self.assertEqual(self.logins, 2)
+
+    def test_old_sessions_are_ignored(self):
+        Account("card", "1234", client=self.client, sessions=self.store)
+
+        with mock.patch("sfpl.session.time.time", return_value=4e9):
+            self.assertIsNone(self.store.load("card", "1234"))
+        self.assertIsNotNone(SessionStore(self.path, max_age=None).load("card", "1234"))
+
+    def test_logout_forgets_session(self):
+        account = Account("card", "1234", client=self.client, sessions=self.store)
+
+        account.logout()
+
+        self.assertIsNone(self.store.load("card", "1234"))
+        self.assertFalse(self.store.delete("card", "1234"))
+
+    def test_corrupt_store_is_replaced(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as file:
+            file.write("{not json")
+
+        Account("card", "1234", client=self.client, sessions=self.store)
+
+        self.assertIsNotNone(self.store.load("card", "1234"))
+        self.store.clear()
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,168 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sfpl import trace
+from sfpl.cli import main
+from sfpl.client import Client
+from sfpl.sfpl import Account, Search
+from sfpl.trace import Tracer, url_template
+
+from .server import StubServer, asset, search_page
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        routes = {
+            ("GET", "/v2/search"): lambda request: (
+                200,
+                {},
+                search_page(int(request.query["page"][0]), 25),
+            ),
+            ("POST", "/user/login"): lambda request: (
+                200,
+                {"Content-Type": "application/json"},
+                json.dumps({"logged_in": True}),
+            ),
+            ("GET", "/user_dashboard"): lambda request: (
+                200,
+                {},
+                '<div class="cp_user_card" data-name="reader" data-id="7"></div>',
+            ),
+            ("GET", "/holds/index/not_yet_available"): lambda request: (
+                200,
+                {},
+                asset("holds.html"),
+            ),
+        }
+        self.server = StubServer(routes).start()
+        self.client = Client(hosts=self.server.hosts, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_url_template(self):
+        self.assertEqual(
+            url_template("https://sfpl.bibliocommons.com/item/show/3093C1"),
+            "/item/show/3093C1",
+        )
+        self.assertEqual(
+            url_template("https://sfpl.bibliocommons.com/checkedout/confirm/77"),
+            "/checkedout/confirm/{id}",
+        )
+        self.assertEqual(
+            url_template("https://x/v2/search?query=python&page=2&page=3"),
+            "/v2/search?query&page",
+        )
+
+    def test_requests_and_parse_stages_are_spans(self):
+        with Tracer() as tracer:
+            account = Account("card", "1234", client=self.client)
+            account.getHolds()
+            self.assertEqual(account.name, "reader")
+
+        self.assertIsNone(trace.active())
+        names = [span.name for span in tracer.spans]
+        for stage in (
+            "POST /user/login",
+            "GET /user_dashboard",
+            "GET /holds/index/not_yet_available",
+            "parse user card",
+            "parse holds",
+            "extract island",
+            "json decode",
+            "soup",
+        ):
+            self.assertIn(stage, names)
+
+        [holds] = [
+            span
+            for span in tracer.spans
+            if span.name == "GET /holds/index/not_yet_available"
+        ]
+        self.assertEqual(holds.category, "http")
+        self.assertEqual(holds.attributes["method"], "GET")
+        self.assertEqual(holds.attributes["status"], 200)
+        self.assertEqual(holds.attributes["bytes"], len(asset("holds.html").encode()))
+        self.assertGreater(holds.attributes["ttfb"], 0)
+        self.assertLessEqual(holds.attributes["ttfb"], holds.duration)
+
+    def test_login_defers_dashboard_until_identity_is_used(self):
+        with Tracer() as tracer:
+            account = Account("card", "1234", client=self.client)
+            account.getHolds()
+
+        names = [span.name for span in tracer.spans]
+        self.assertNotIn("GET /user_dashboard", names)
+        self.assertNotIn("parse user card", names)
+        self.assertEqual((account.name, account._id), ("reader", "7"))
+        self.assertEqual(len(self.server.requested("/user_dashboard")), 1)
+
+    def test_hooks_and_summary(self):
+        finished = []
+
+        with Tracer(hooks=[finished.append]) as tracer:
+            search = Search("python", client=self.client)
+            list(search.getResults(pages=3))
+
+        self.assertEqual(finished, tracer.spans)
+        summary = tracer.summary()
+        [pages] = [stage for stage in summary.values() if stage["category"] == "http"]
+        self.assertEqual(pages["calls"], 3)
+        self.assertGreater(pages["bytes"], 0)
+        self.assertAlmostEqual(pages["mean"], pages["total"] / 3)
+        self.assertEqual(summary["parse search page"]["calls"], 3)
+        self.assertNotIn("bytes", summary["parse search page"])
+
+        table = tracer.format_table().splitlines()
+        self.assertTrue(table[0].startswith("stage"))
+        self.assertEqual(len(table), len(summary) + 1)
+
+    def test_chrome_trace(self):
+        with Tracer() as tracer:
+            next(Search("python", client=self.client).getResults())
+
+        events = tracer.chrome_trace()["traceEvents"]
+
+        self.assertEqual(len(events), len(tracer.spans))
+        self.assertEqual({event["ph"] for event in events}, {"X"})
+        [request] = [event for event in events if event["cat"] == "http"]
+        self.assertEqual(request["args"]["status"], 200)
+        self.assertGreaterEqual(request["ts"], 0)
+
+    def test_nothing_is_recorded_without_an_active_tracer(self):
+        tracer = Tracer()
+
+        next(Search("python", client=self.client).getResults())
+
+        self.assertEqual(tracer.spans, [])
+
+    def test_cli_trace(self):
+        stderr = io.StringIO()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            with mock.patch("sfpl.cli._client", return_value=self.client):
+                status = main(
+                    ["--trace", "--trace-json", path, "search", "python"],
+                    stdout=io.StringIO(),
+                    stderr=stderr,
+                    environ={},
+                )
+
+            with open(path) as trace_file:
+                events = json.load(trace_file)["traceEvents"]
+
+        self.assertEqual(status, 0)
+        self.assertIsNone(trace.active())
+        self.assertTrue(stderr.getvalue().startswith("stage"))
+        self.assertIn("GET /v2/search", stderr.getvalue())
+        self.assertIn("parse search page", [event["name"] for event in events])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)